@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Time inline formatting of marked-up prose, before and after.
+
+"legacy" is the formatter build_markdown.py used before the single inline scanner:
+four re.sub passes (code, links, bold, italic), each over the previous pass's
+output. It is kept here only as the baseline; "scanner" is the current
+format_inline. Both run over synthetic inline-heavy paragraphs (several code,
+link, bold and italic spans per line, some nested) and the plain prose of
+markdown/, and their output is checked to be identical before timing.
+
+Usage: python3 bench/inline.py [--lines N] [--repeat N]
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+import random
+import re
+import sys
+import timeit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import build_markdown as bm  # noqa: E402
+
+WORDS = (
+    "field notes ink graphite signal paper static garden loop tape drift layer "
+    "texture edge scan noise study series sketch chord render archive build"
+).split()
+
+INLINE_CODE_RE = re.compile(r"`([^`]+)`")
+LINK_RE = re.compile(r"\[([^\]]+)\]\(([^)]+)\)")
+BOLD_RE = re.compile(r"\*\*([^*]+)\*\*")
+ITALIC_RE = re.compile(r"(?<!\*)\*([^*]+)\*(?!\*)")
+
+
+def legacy_format_inline(text: str) -> str:
+    text = INLINE_CODE_RE.sub(lambda m: f"<code>{m.group(1)}</code>", text)
+    text = LINK_RE.sub(lambda m: f'<a href="{m.group(2)}">{m.group(1)}</a>', text)
+    text = BOLD_RE.sub(r"<strong>\1</strong>", text)
+    return ITALIC_RE.sub(r"<em>\1</em>", text)
+
+
+def marked_up_line(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(10, 25))]
+    for index in rng.sample(range(len(words)), 4):
+        word = words[index]
+        words[index] = rng.choice([
+            f"**{word}**",
+            f"*{word}*",
+            f"`{word}`",
+            f"[{word}](https://example.com/{word})",
+            f"*a **{word}** b*",
+            f"***{word}***",
+            f"[the `{word}`](https://example.com/{word})",
+        ])
+    return " ".join(words)
+
+
+def corpus_lines() -> list[str]:
+    lines = []
+    for md_path in sorted(bm.MARKDOWN_DIR.glob("*.md")):
+        _, body = bm.split_source(md_path.read_text(), md_path)
+        lines += [line.strip() for line in body if line.strip() and not line.lstrip().startswith(("#", "!", "<", "`"))]
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=5000, help="Synthetic marked-up lines")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per formatter; the fastest is kept")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    cases = {
+        "marked-up prose": [marked_up_line(rng) for _ in range(args.lines)],
+        "markdown/ prose": corpus_lines(),
+    }
+    print(f"{'case':18} {'lines':>6} {'legacy':>12} {'scanner':>12} {'speedup':>8}")
+    for name, lines in cases.items():
+        for line in lines:
+            if bm.format_inline(line) != legacy_format_inline(line):
+                raise SystemExit(f"Output differs for {line!r}")
+        timings = {}
+        for label, formatter in (("legacy", legacy_format_inline), ("scanner", bm.format_inline)):
+            runs = timeit.repeat(lambda: [formatter(line) for line in lines], number=1, repeat=args.repeat)  # noqa: B023
+            timings[label] = min(runs)
+        print(
+            f"{name:18} {len(lines):6} {timings['legacy'] * 1e3:9.1f} ms {timings['scanner'] * 1e3:9.1f} ms"
+            f" {timings['legacy'] / timings['scanner']:7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
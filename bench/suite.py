@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""Benchmark the site generator stages on synthetic markdown corpora.
+
+Generates N posts (mixed single/gallery, long code blocks, image runs, lists) into a
+scratch directory and times each stage separately: parse_front_matter,
+markdown_to_html, build_post, rebuild_section_lists, build.py's section
+substitution and build_all, a full forced build with its section lists and
+manifest. Peak traced memory is measured in a second pass per stage.
+
+Usage:
+  python3 bench/suite.py [--sizes 100,1000,10000] [--output results.json]
+  python3 bench/suite.py --compare baseline.json [--budgets bench/budgets.json]
+
+With --compare, exits non-zero when any stage is slower than the baseline by more
+than its budget ratio, or when a stage listed under "flat_peak" in the budgets
+needs more peak memory at a larger size than its ratio over the smallest size's.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import os
+from pathlib import Path
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+import build  # noqa: E402
+import build_markdown as bm  # noqa: E402
+
+DEFAULT_SIZES = (100, 1000, 10000)
+DEFAULT_BUDGETS = BENCH_DIR / "budgets.json"
+SECTIONS = ("art", "music", "projects", "field-notes")
+WORDS = (
+    "field notes ink graphite signal paper static garden loop tape drift layer "
+    "texture edge scan noise study series sketch chord render archive build"
+).split()
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    picked = [rng.choice(WORDS) for _ in range(words)]
+    if rng.random() < 0.3:
+        picked[rng.randrange(words)] = f"**{rng.choice(WORDS)}**"
+    if rng.random() < 0.3:
+        picked[rng.randrange(words)] = f"`{rng.choice(WORDS)}`"
+    if rng.random() < 0.2:
+        picked[rng.randrange(words)] = f"[{rng.choice(WORDS)}](https://example.com/{rng.choice(WORDS)})"
+    if rng.random() < 0.2:
+        picked[rng.randrange(words)] = f"*{rng.choice(WORDS)}*"
+    return " ".join(picked).capitalize() + "."
+
+
+def synthetic_post(rng: random.Random, index: int) -> str:
+    post_type = "gallery" if rng.random() < 0.3 else "single"
+    title = f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} {index}"
+    date = f"20{rng.randint(20, 26)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+    lines = [
+        f"title: {title}",
+        f"date: {date}",
+        f"section: {rng.choice(SECTIONS)}",
+        f"type: {post_type}",
+        "post-to-site: true",
+        "",
+        f"# {title}",
+        "",
+    ]
+    if post_type == "gallery":
+        lines += [f"![{title} {n}](bench-{index}-{n}.png)" for n in range(rng.randint(3, 8))]
+        lines.append("")
+
+    for _ in range(rng.randint(3, 8)):
+        block = rng.random()
+        if block < 0.4:
+            lines += [sentence(rng, rng.randint(8, 30)) for _ in range(rng.randint(1, 4))]
+        elif block < 0.55:
+            lines.append(f"## {sentence(rng, 3)}")
+        elif block < 0.7:
+            marker = "1." if rng.random() < 0.5 else "-"
+            lines += [f"{marker} {sentence(rng, rng.randint(3, 10))}" for _ in range(rng.randint(2, 6))]
+        elif block < 0.85:
+            lines.append("```")
+            lines += [f"    step {n}: {sentence(rng, 6)}" for n in range(rng.randint(40, 200))]
+            lines.append("```")
+        else:
+            lines += [f"![inline {n}](bench-inline-{index}-{n}.png)" for n in range(rng.randint(1, 4))]
+        lines.append("")
+    return "\n".join(lines)
+
+
+def generate_corpus(directory: Path, count: int, seed: int) -> list[Path]:
+    rng = random.Random(seed)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for index in range(count):
+        path = directory / f"bench-{index:05d}.md"
+        path.write_text(synthetic_post(rng, index))
+        paths.append(path)
+    return paths
+
+
+def measure(fn: Callable[[], Any], repeat: int, memory: bool) -> dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    # The fastest run is the least disturbed by the rest of the machine.
+    result = {"seconds": min(timings)}
+    if memory:
+        tracemalloc.start()
+        fn()
+        result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+
+def run_size(count: int, seed: int, repeat: int, memory: bool) -> dict[str, dict[str, float]]:
+    with tempfile.TemporaryDirectory(prefix="zid-bench-") as scratch:
+        scratch_dir = Path(scratch)
+        sources = generate_corpus(scratch_dir / "markdown", count, seed)
+        shutil.copytree(build.sections_dir, scratch_dir / "sections")
+        bm.ROOT = scratch_dir
+        bm.MARKDOWN_DIR = scratch_dir / "markdown"
+        bm.OUTPUT_DIR = scratch_dir / "posts"
+        bm.SECTIONS_DIR = scratch_dir / "sections"
+        bm.MANIFEST_PATH = scratch_dir / ".build-manifest.jsonl"
+        bm.image_info.CACHE_PATH = scratch_dir / ".image-cache.json"
+
+        texts = [(path, path.read_text()) for path in sources]
+        parsed = [bm.split_source(text, path) for path, text in texts]
+        bodies = [bm.split_gallery_and_body(body, fm.type == "gallery")[1] for fm, body in parsed]
+        entries = [(fm, bm.output_path(fm), bm.extract_summary(body)) for fm, body in parsed]
+        template_html = build.template_path.read_text()
+
+        def parse() -> None:
+            for path, text in texts:
+                bm.split_source(text, path)
+
+        def render() -> None:
+            for body in bodies:
+                bm.markdown_to_html(body)
+
+        def build_posts() -> None:
+            for fm, body in parsed:
+                bm.build_post(fm, body)
+
+        def section_lists() -> None:
+            spool = bm.EntrySpool()
+            for entry in entries:
+                spool.add(*entry)
+            bm.rebuild_section_lists(spool)
+
+        def build_archive() -> None:
+            manifest, spool, _ = bm.build_all(force=True)
+            bm.rebuild_section_lists(spool)
+            bm.save_manifest(manifest)
+
+        def index() -> None:
+            build.render_index(template_html, {p.stem: p.read_text() for p in bm.SECTIONS_DIR.glob("*.html")})
+
+        stages = {
+            "parse_front_matter": parse,
+            "markdown_to_html": render,
+            "build_post": build_posts,
+            "rebuild_section_lists": section_lists,
+            "build_index": index,
+            "build_all": build_archive,
+        }
+        # The build functions print a line per file written; keep the report readable.
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            return {name: measure(fn, repeat, memory) for name, fn in stages.items()}
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any], budgets: dict[str, Any]) -> list[str]:
+    default_ratio = float(budgets.get("default", 1.2))
+    stage_ratios = budgets.get("stages", {})
+    # Differences smaller than this are timer noise, whatever the ratio.
+    min_delta = {
+        "seconds": float(budgets.get("min_delta_seconds", 0.01)),
+        "peak_bytes": float(budgets.get("min_delta_bytes", 65536)),
+    }
+    failures = []
+    for size, stages in current["results"].items():
+        for stage, numbers in stages.items():
+            base = baseline.get("results", {}).get(size, {}).get(stage)
+            if not base:
+                continue
+            ratio = float(stage_ratios.get(stage, default_ratio))
+            for metric in ("seconds", "peak_bytes"):
+                if metric not in numbers or metric not in base or not base[metric]:
+                    continue
+                change = numbers[metric] / base[metric]
+                failed = change > ratio and numbers[metric] - base[metric] > min_delta[metric]
+                print(f"{'FAIL' if failed else 'ok':4} {size:>6} {stage:22} {metric:10} {change:6.2f}x (budget {ratio:.2f}x)")
+                if failed:
+                    failures.append(f"{stage} {metric} at {size} posts: {change:.2f}x > {ratio:.2f}x")
+    return failures
+
+
+def check_flat(current: dict[str, Any], budgets: dict[str, Any]) -> list[str]:
+    """Check that the "flat_peak" stages' peak memory stops growing with the post count.
+
+    Each budget gives a size "from" which the peak should be flat (below it, buffers
+    like EntrySpool's are still filling) and the "ratio" any larger size's peak may
+    reach over the peak at the first size measured from there.
+    """
+    failures = []
+    for stage, budget in budgets.get("flat_peak", {}).items():
+        sizes = sorted((size for size in current["results"] if int(size) >= int(budget["from"])), key=int)
+        peaks = [(size, current["results"][size].get(stage, {}).get("peak_bytes")) for size in sizes]
+        peaks = [(size, peak) for size, peak in peaks if peak]
+        if len(peaks) < 2:
+            continue
+        ratio = float(budget["ratio"])
+        first, base = peaks[0]
+        for size, peak in peaks[1:]:
+            change = peak / base
+            failed = change > ratio
+            print(f"{'FAIL' if failed else 'ok':4} {size:>6} {stage:22} {'flat peak':10} {change:6.2f}x (budget {ratio:.2f}x of {first})")
+            if failed:
+                failures.append(f"{stage} peak_bytes at {size} posts: {change:.2f}x of {first} posts > {ratio:.2f}x")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark site generator stages.")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage; the fastest is kept")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass")
+    parser.add_argument("--output", type=Path, help="Write results JSON here instead of stdout")
+    parser.add_argument("--compare", type=Path, help="Baseline results JSON to check against")
+    parser.add_argument("--budgets", type=Path, default=DEFAULT_BUDGETS)
+    args = parser.parse_args()
+
+    results = {}
+    for size in (int(value) for value in args.sizes.split(",")):
+        print(f"Benchmarking {size} posts...", file=sys.stderr)
+        results[str(size)] = run_size(size, args.seed, args.repeat, not args.no_memory)
+
+    report = {"python": platform.python_version(), "seed": args.seed, "repeat": args.repeat, "results": results}
+    text = json.dumps(report, indent=2) + "\n"
+    if args.output:
+        args.output.write_text(text)
+        print(f"Wrote {args.output}", file=sys.stderr)
+    elif not args.compare:
+        print(text, end="")
+
+    if args.compare:
+        budgets = json.loads(args.budgets.read_text()) if args.budgets.exists() else {}
+        failures = compare(report, json.loads(args.compare.read_text()), budgets) + check_flat(report, budgets)
+        if failures:
+            raise SystemExit("Performance budget exceeded:\n  " + "\n  ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
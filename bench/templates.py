@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Time template application per post for the markdown corpus, before and after.
+
+"legacy" is the renderer build_markdown.py used before precompiled slot templates:
+chained str.replace and re.sub scans over the whole template for every post. It is
+kept here only as the baseline; "compiled" is the current build_gallery_html /
+build_single_html. The compiled renderer also emits image sizes, srcset and the gallery
+preload; the image lookups behind them are memoized while timing, so both columns
+measure template application rather than file stats.
+
+Usage: python3 bench/templates.py [--number N]
+"""
+from __future__ import annotations
+
+import argparse
+from functools import cache
+from pathlib import Path
+import re
+import sys
+import timeit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import build_markdown as bm  # noqa: E402
+
+
+def legacy_gallery_html(fm: bm.FrontMatter, images: list[tuple[str, str]]) -> str:
+    html = bm.GALLERY_TEMPLATE
+    section_label = fm.section.replace("-", " ").title()
+
+    html = html.replace("Art Series Title · Zach Isn't Dead", f"{fm.title} · Zach Isn't Dead")
+    html = html.replace("Art Series Title", fm.title)
+    html = html.replace("YYYY-MM-DD · Art", f"{fm.date} · {section_label}")
+
+    main_alt, main_path = images[0]
+    main_block = f'<img src="{bm.normalize_image_path(main_path)}" alt="{main_alt}" />'
+    html = re.sub(
+        r"<div class=\"gallery-main\">[\s\S]*?</div>",
+        f"<div class=\"gallery-main\">\n            {main_block}\n          </div>",
+        html,
+    )
+
+    thumbs = []
+    for idx, (alt, path) in enumerate(images, start=1):
+        full_src = bm.normalize_image_path(path)
+        thumb_src = bm.normalize_image_path(bm.image_info.thumb_for(path))
+        thumbs.append(
+            f'            <button class="gallery-thumb" type="button" data-full="{full_src}" '
+            f'data-alt="{alt or f"Image {idx}"}" data-caption="">\n'
+            f'              <img src="{thumb_src}" alt="Thumbnail {idx}." />\n'
+            f'            </button>'
+        )
+    thumbs_html = "\n".join(thumbs)
+    return re.sub(
+        r"<div class=\"gallery-thumbs\">[\s\S]*?</div>",
+        f"<div class=\"gallery-thumbs\">\n{thumbs_html}\n          </div>",
+        html,
+    )
+
+
+def legacy_single_html(fm: bm.FrontMatter, images: list[tuple[str, str]]) -> str:
+    section_label = fm.section.replace("-", " ").title()
+    if fm.section != "art":
+        html = bm.GENERIC_TEMPLATE
+        html = html.replace("Post Title · Zach Isn't Dead", f"{fm.title} · Zach Isn't Dead")
+        html = html.replace("Post Title", fm.title)
+        return html.replace("YYYY-MM-DD · Category", f"{fm.date} · {section_label}")
+
+    html = bm.SINGLE_TEMPLATE
+    html = html.replace("Art Title · Zach Isn't Dead", f"{fm.title} · Zach Isn't Dead")
+    html = html.replace("Art Title", fm.title)
+    html = html.replace("YYYY-MM-DD · Art", f"{fm.date} · {section_label}")
+    image_path = images[0][1] if images else "your-image.jpg"
+    return html.replace("../../assets/your-image.jpg", bm.normalize_image_path(image_path))
+
+
+def legacy_render(fm: bm.FrontMatter, images: list[tuple[str, str]], content_html: str) -> str:
+    html = legacy_gallery_html(fm, images) if fm.type == "gallery" else legacy_single_html(fm, images)
+    section_label = fm.section.replace("-", " ").title()
+    return re.sub(
+        r"<section class=\"article\">[\s\S]*?</section>",
+        f"<section class=\"article\">\n{content_html}\n        <a class=\"back-link\" href=\"../../index.html#{fm.section}\">"
+        f"← Back to {section_label}</a>\n      </section>",
+        html,
+        count=1,
+    )
+
+
+def compiled_render(fm: bm.FrontMatter, images: list[tuple[str, str]], content_html: str) -> str:
+    if fm.type == "gallery":
+        return bm.build_gallery_html(fm, images, content_html)
+    return bm.build_single_html(fm, images, content_html)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=5000, help="Renders per post")
+    args = parser.parse_args()
+
+    bm.image_attrs = cache(bm.image_attrs)
+    bm.image_srcset = cache(bm.image_srcset)
+    bm.image_file = cache(bm.image_file)
+    bm.image_info.lookup = cache(bm.image_info.lookup)
+    print(f"{'post':28} {'type':8} {'legacy':>12} {'compiled':>12} {'speedup':>8}")
+    for md_path in sorted(bm.MARKDOWN_DIR.glob("*.md")):
+        lines = md_path.read_text().split("\n")
+        blank_index = lines.index("")
+        fm = bm.parse_front_matter(lines[:blank_index], md_path)
+        images, _ = bm.split_gallery_and_body(lines[blank_index + 1 :], fm.type == "gallery")
+
+        timings = {}
+        for name, render in (("legacy", legacy_render), ("compiled", compiled_render)):
+            seconds = timeit.timeit(lambda: render(fm, images, "X"), number=args.number)  # noqa: B023
+            timings[name] = seconds / args.number
+        print(
+            f"{md_path.name:28} {fm.type:8} {timings['legacy'] * 1e6:9.1f} us {timings['compiled'] * 1e6:9.1f} us"
+            f" {timings['legacy'] / timings['compiled']:7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
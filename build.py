@@ -1,6 +1,16 @@
 #!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
 from pathlib import Path
 import re
+from typing import Iterable, Mapping
+
+from build_assets import load_asset_urls, rewrite_asset_refs
+from build_markdown import iter_manifest
+from feeds import update_feeds
+import outputs
+import profiling
 
 root = Path(__file__).resolve().parent
 sections_dir = root / "sections"
@@ -8,20 +18,132 @@ template_path = root / "index.template.html"
 output_path = root / "index.html"
 build_log_source = sections_dir / "build-log.html"
 build_log_output = root / "build-log.html"
-
-html = template_path.read_text()
+fragments_dir = root / "fragments"
 
 pattern = re.compile(r"\{\{section:([a-zA-Z0-9_-]+)\}\}")
+section_tag = re.compile(r"<section\b([^>]*)>")
+
+# With --lazy, only these sections stay in index.html; the rest load from fragments/.
+DEFAULT_INLINE_SECTIONS = ("home",)
+FRAGMENT_SCRIPT = '<script src="fragments.js" defer></script>'
+
+
+def read_sections() -> dict[str, str]:
+    sections = {path.stem: path.read_text() for path in sections_dir.glob("*.html")}
+    profiling.count(read=sum(len(html) for html in sections.values()))
+    return sections
+
+
+def render_index(template_html: str, sections: Mapping[str, str]) -> str:
+    def replace(match):
+        section_id = match.group(1)
+        if section_id not in sections:
+            raise SystemExit(f"Missing section file: {sections_dir / f'{section_id}.html'}")
+        return sections[section_id].rstrip()
+
+    return pattern.sub(replace, template_html)
+
+
+def fragment_placeholder(section_id: str, section_html: str) -> str:
+    """Empty stand-in for a deferred section: same <section> tag, plus a link that works without JS."""
+    match = section_tag.search(section_html)
+    attrs = match.group(1) if match else f' id="{section_id}"'
+    href = f"{fragments_dir.name}/{section_id}.html"
+    label = section_id.replace("-", " ").title()
+    return (
+        f'<section{attrs} data-fragment="{href}">\n'
+        f'  <a class="fragment-fallback content-link" href="{href}">{label} →</a>\n'
+        "</section>"
+    )
+
+
+def render_lazy_index(
+    template_html: str, sections: Mapping[str, str], inline: set[str]
+) -> tuple[str, dict[str, str]]:
+    """Render index.html with only `inline` sections in place; return it and {section id: fragment page}.
+
+    Each fragment is the index page with just that section filled in, so it doubles as
+    the no-JS fallback; fragments.js pulls the section out of it.
+    """
+    deferred = [section_id for section_id in pattern.findall(template_html) if section_id not in inline]
+    index_sections = dict(sections)
+    fragments: dict[str, str] = {}
+    for section_id in deferred:
+        if section_id not in sections:
+            # Let render_index report it.
+            continue
+        index_sections[section_id] = fragment_placeholder(section_id, sections[section_id])
+        only = {key: value if key == section_id else "" for key, value in sections.items()}
+        page = render_index(template_html, only)
+        fragments[section_id] = page.replace("<head>", '<head>\n  <base href="../">', 1)
+
+    html = render_index(template_html, index_sections)
+    if fragments:
+        html = html.replace("</head>", f"  {FRAGMENT_SCRIPT}\n</head>", 1)
+    return html, fragments
+
+
+def write_fragments(fragments: Mapping[str, str]) -> None:
+    """Write changed fragment pages and remove ones for sections that are no longer deferred."""
+    for section_id, html in fragments.items():
+        outputs.write_output(fragments_dir / f"{section_id}.html", html)
+    for stale in fragments_dir.glob("*.html"):
+        if stale.stem not in fragments:
+            outputs.remove_output(stale)
+
+
+def build_index(
+    sections: Mapping[str, str],
+    *,
+    lazy: bool = False,
+    inline: Iterable[str] = DEFAULT_INLINE_SECTIONS,
+    asset_urls: dict[str, str] | None = None,
+) -> None:
+    """Write index.html (plus fragments/ with `lazy`) and build-log.html from section html."""
+    if asset_urls is None:
+        asset_urls = load_asset_urls()
+    template_html = template_path.read_text()
+    if lazy:
+        html, fragments = render_lazy_index(template_html, sections, set(inline))
+        write_fragments({key: rewrite_asset_refs(page, asset_urls) for key, page in fragments.items()})
+    else:
+        html = render_index(template_html, sections)
+        write_fragments({})
+    outputs.write_output(output_path, rewrite_asset_refs(html, asset_urls))
+    build_log = sections.get(build_log_source.stem)
+    if build_log is not None:
+        outputs.write_output(build_log_output, rewrite_asset_refs(build_log, asset_urls))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Assemble index.html from index.template.html and sections/.")
+    parser.add_argument(
+        "--lazy",
+        action="store_true",
+        help="Keep only the --inline sections in index.html and load the rest from fragments/ on demand",
+    )
+    parser.add_argument(
+        "--inline",
+        default=",".join(DEFAULT_INLINE_SECTIONS),
+        help="Comma-separated section ids to keep inline with --lazy (default: %(default)s)",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Report which files would change without writing them")
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+
+    outputs.set_dry_run(args.dry_run)
+    profiling.enable(args.profile is not None)
+    with profiling.span("sections"):
+        sections = read_sections()
+    with profiling.span("index"):
+        build_index(sections, lazy=args.lazy, inline=filter(None, args.inline.split(",")))
+    with profiling.span("feeds"):
+        # index.html feeds the sitemap's lastmod for the site root.
+        update_feeds(record for _, record in iter_manifest())
+    if args.dry_run:
+        outputs.report()
+    profiling.finish(args.profile)
+
 
-def replace(match):
-    section_id = match.group(1)
-    section_file = sections_dir / f"{section_id}.html"
-    if not section_file.exists():
-        raise SystemExit(f"Missing section file: {section_file}")
-    return section_file.read_text().rstrip()
-
-html = pattern.sub(replace, html)
-output_path.write_text(html)
-if build_log_source.exists():
-    build_log_output.write_text(build_log_source.read_text())
-print(f"Wrote {output_path}")
+if __name__ == "__main__":
+    main()
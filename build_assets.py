@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""Minify the site's CSS/JS and publish them under content-hashed names.
+
+Each file in ASSETS is minified and written to assets/dist/<stem>.<hash>.<ext>, where
+the hash is taken from the minified bytes, so the name only changes when the content
+does and the files can be cached forever. assets/dist/manifest.json maps each source
+name to its published path.
+
+Pages pick the hashed names up through rewrite_asset_refs(): build_markdown.py and
+build.py apply it to what they write, and this script applies it in place to the
+hand-maintained pages (about.html, old posts/*.html) and to every built page, so a
+changed asset is re-linked even where nothing else was rebuilt. Rewriting is
+idempotent: a page that already points at the current names is left untouched.
+
+Usage: python3 build_assets.py [--dry-run]
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+from pathlib import Path
+import re
+from typing import Iterable
+
+import outputs
+
+ROOT = Path(__file__).resolve().parent
+DIST_DIR = ROOT / "assets" / "dist"
+ASSET_MANIFEST_PATH = DIST_DIR / "manifest.json"
+ASSETS = ("styles.css", "theme.js", "status.js", "gallery.js", "fragments.js")
+HASH_LENGTH = 12
+
+# Published files sit two levels below the site root.
+DIST_PREFIX = DIST_DIR.relative_to(ROOT).as_posix() + "/"
+CSS_URL_RE = re.compile(r"url\((['\"]?)(?!data:|https?:|/|#)([^'\")]+)\1\)")
+
+
+def _scan(text: str, start: int, quote: str) -> int:
+    """Return the index just past the string or template literal starting at `start`."""
+    pos = start + 1
+    while pos < len(text):
+        char = text[pos]
+        if char == "\\":
+            pos += 2
+        elif char == quote:
+            return pos + 1
+        elif quote == "`" and text.startswith("${", pos):
+            pos = _scan_braces(text, pos + 2)
+        else:
+            pos += 1
+    return pos
+
+
+def _scan_braces(text: str, pos: int) -> int:
+    """Return the index just past the "}" closing a template ${...} expression."""
+    depth = 1
+    while pos < len(text):
+        char = text[pos]
+        if char in "'\"`":
+            pos = _scan(text, pos, char)
+            continue
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if not depth:
+                return pos + 1
+        pos += 1
+    return pos
+
+
+# After one of these (or at the start) a "/" begins a regex literal, not a division.
+REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^")
+REGEX_KEYWORDS = ("return", "typeof", "case", "do", "else", "in", "of", "void", "yield")
+
+
+def _starts_regex(out: list[str]) -> bool:
+    before = "".join(out[-12:]).rstrip()
+    if not before or before[-1] in REGEX_PRECEDERS:
+        return True
+    return any(before.endswith(word) and not (before[: -len(word)][-1:].isalnum()) for word in REGEX_KEYWORDS)
+
+
+def minify_js(text: str) -> str:
+    """Conservative minifier: drops comments, indentation and blank lines.
+
+    Line breaks are kept (collapsed to one) so automatic semicolon insertion behaves
+    exactly as in the source; strings, templates and regex literals are copied verbatim.
+    """
+    out: list[str] = []
+    pos = 0
+    while pos < len(text):
+        char = text[pos]
+        if char in "'\"`":
+            end = _scan(text, pos, char)
+            out.append(text[pos:end])
+            pos = end
+        elif text.startswith("//", pos):
+            pos = text.find("\n", pos)
+            pos = len(text) if pos < 0 else pos
+        elif text.startswith("/*", pos):
+            end = text.find("*/", pos + 2)
+            pos = len(text) if end < 0 else end + 2
+        elif char == "/" and _starts_regex(out):
+            end = pos + 1
+            in_class = False
+            while end < len(text) and (text[end] != "/" or in_class):
+                if text[end] == "\\":
+                    end += 1
+                elif text[end] == "[":
+                    in_class = True
+                elif text[end] == "]":
+                    in_class = False
+                end += 1
+            end += 1
+            while end < len(text) and text[end].isalpha():
+                end += 1
+            out.append(text[pos:end])
+            pos = end
+        elif char.isspace():
+            end = pos
+            while end < len(text) and text[end].isspace():
+                end += 1
+            run = text[pos:end]
+            out.append("\n" if "\n" in run else " ")
+            pos = end
+        else:
+            out.append(char)
+            pos += 1
+
+    lines = (line.strip() for line in "".join(out).split("\n"))
+    return "\n".join(line for line in lines if line) + "\n"
+
+
+CSS_TIGHT_BEFORE = set("{};,>")
+CSS_TIGHT_AFTER = set("{};:,>")
+
+
+def minify_css(text: str, rebase: str = "") -> str:
+    """Drop comments and redundant whitespace; strings are copied verbatim.
+
+    Whitespace is only removed next to characters where it can't matter, which never
+    includes "(" (`and (` in media queries) or ":" on its left (`.a :hover`).
+    Relative url()s are prefixed with `rebase` so they still resolve from DIST_DIR.
+    """
+    out: list[str] = []
+    pos = 0
+    while pos < len(text):
+        char = text[pos]
+        if char in "'\"":
+            end = _scan(text, pos, char)
+            out.append(text[pos:end])
+            pos = end
+        elif text.startswith("/*", pos):
+            end = text.find("*/", pos + 2)
+            pos = len(text) if end < 0 else end + 2
+        elif char.isspace():
+            end = pos
+            while end < len(text) and text[end].isspace():
+                end += 1
+            previous = out[-1][-1:] if out else ""
+            following = text[end : end + 1]
+            if previous and following and previous not in CSS_TIGHT_AFTER and following not in CSS_TIGHT_BEFORE:
+                out.append(" ")
+            pos = end
+        else:
+            if char == "}" and out and out[-1] == ";":
+                out.pop()
+            out.append(char)
+            pos += 1
+
+    css = "".join(out)
+    if rebase:
+        css = CSS_URL_RE.sub(lambda m: f"url({m.group(1)}{rebase}{m.group(2)}{m.group(1)})", css)
+    return css + "\n"
+
+
+def minify(name: str, text: str) -> str:
+    if name.endswith(".css"):
+        return minify_css(text, rebase="../" * DIST_PREFIX.count("/"))
+    return minify_js(text)
+
+
+def hashed_name(name: str, data: bytes) -> str:
+    stem, ext = name.rsplit(".", 1)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}.{ext}"
+
+
+def load_asset_urls() -> dict[str, str]:
+    """Source name -> published path (relative to the site root); empty until this script has run."""
+    if not ASSET_MANIFEST_PATH.exists():
+        return {}
+    return json.loads(ASSET_MANIFEST_PATH.read_text()).get("assets", {})
+
+
+def asset_ref_pattern(names: list[str]) -> re.Pattern[str]:
+    alternatives = "|".join(
+        rf"(?:{re.escape(DIST_PREFIX)})?{re.escape(stem)}(?:\.[0-9a-f]{{{HASH_LENGTH}}})?\.{re.escape(ext)}"
+        for stem, ext in (name.rsplit(".", 1) for name in names)
+    )
+    return re.compile(rf"((?:src|href)=\")((?:\.\./)*)({alternatives})\"")
+
+
+def rewrite_asset_refs(html: str, urls: dict[str, str]) -> str:
+    """Point src/href attributes for the files in `urls` at their hashed names.
+
+    Matches the plain name or any earlier hashed name, at any ../ depth, so running it
+    again over its own output changes nothing.
+    """
+    if not urls:
+        return html
+    pattern = asset_ref_pattern(list(urls))
+    by_stem = {name.rsplit(".", 1)[0]: url for name, url in urls.items()}
+
+    def replace(match: re.Match[str]) -> str:
+        filename = match.group(3).rsplit("/", 1)[-1]
+        return f'{match.group(1)}{match.group(2)}{by_stem[filename.split(".", 1)[0]]}"'
+
+    return pattern.sub(replace, html)
+
+
+def hand_maintained_pages(generated: Iterable[Path] = ()) -> list[Path]:
+    """about.html and the posts/ pages, minus archive pages and the `generated` ones.
+
+    Hand-written posts sit both directly in posts/ and next to generated ones in
+    posts/<section>/; only this script re-links them.
+    """
+    skip = set(generated)
+    pages = [ROOT / "about.html"]
+    # Templates keep plain names; build_markdown.py rewrites what it renders from them.
+    pages += sorted(
+        path
+        for path in (ROOT / "posts").glob("**/*.html")
+        if not path.name.startswith("_") and path.parent.name != "page" and path not in skip
+    )
+    return [path for path in pages if path.is_file()]
+
+
+def pages_to_rewrite() -> list[Path]:
+    pages = [ROOT / "index.html", ROOT / "build-log.html"]
+    pages += sorted((ROOT / "fragments").glob("*.html"))
+    pages += sorted((ROOT / "posts").glob("*/page/*.html"))
+    return hand_maintained_pages() + [path for path in pages if path.is_file()]
+
+
+def publish_assets() -> dict[str, str]:
+    """Minify and write every asset under its hashed name; return and save the manifest."""
+    urls: dict[str, str] = {}
+    for name in ASSETS:
+        source = ROOT / name
+        original = source.read_text()
+        data = minify(name, original).encode()
+        published = DIST_DIR / hashed_name(name, data)
+        urls[name] = published.relative_to(ROOT).as_posix()
+        # The name is the content hash, so an existing file is already current.
+        if published.exists() or not outputs.write_output(published, data, quiet=True):
+            continue
+        if not outputs.DRY_RUN:
+            saved = 1 - len(data) / max(1, len(original.encode()))
+            print(f"Wrote {published.relative_to(ROOT)} ({len(original.encode()):,} -> {len(data):,} bytes, -{saved:.0%})")
+
+    current = {Path(url).name for url in urls.values()} | {ASSET_MANIFEST_PATH.name}
+    for stale in DIST_DIR.glob("*"):
+        # compress_outputs.py's .gz/.br siblings live and die with their asset.
+        if stale.name.removesuffix(".gz").removesuffix(".br") not in current:
+            outputs.remove_output(stale)
+    outputs.write_output(ASSET_MANIFEST_PATH, json.dumps({"assets": urls}, indent=2) + "\n", quiet=True)
+    return urls
+
+
+def rewrite_pages(pages: list[Path], urls: dict[str, str]) -> int:
+    """Re-link `pages` in place; return how many changed."""
+    rewritten = 0
+    for page in pages:
+        rewritten += outputs.write_output(page, rewrite_asset_refs(page.read_text(), urls), quiet=True)
+    return rewritten
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Publish hashed CSS/JS and re-link the pages that use them.")
+    parser.add_argument("--dry-run", action="store_true", help="Report which files would change without writing them")
+    args = parser.parse_args()
+
+    outputs.set_dry_run(args.dry_run)
+    rewritten = rewrite_pages(pages_to_rewrite(), publish_assets())
+    if args.dry_run:
+        outputs.report()
+    else:
+        print(f"Rewrote asset references in {rewritten} page(s)")
+
+
+if __name__ == "__main__":
+    main()
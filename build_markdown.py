@@ -1,22 +1,47 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
+import hashlib
+import heapq
+from itertools import chain, groupby, islice
+import json
+from operator import attrgetter
+import os
 from pathlib import Path
 import re
+import tempfile
+import threading
+from typing import IO, Any, Iterable, Iterator, Mapping
+import weakref
+
+from build_assets import load_asset_urls, rewrite_asset_refs
+from feeds import update_feeds
+import image_info
+import outputs
+import profiling
 
 ROOT = Path(__file__).resolve().parent
 MARKDOWN_DIR = ROOT / "markdown"
 OUTPUT_DIR = ROOT / "posts"
+MANIFEST_PATH = ROOT / ".build-manifest.jsonl"
+
+# Bump when a change to this script alters generated HTML, so cached posts get rebuilt.
+GENERATOR_VERSION = "8"
 
-SINGLE_TEMPLATE = (ROOT / "posts" / "art" / "_single-template.html").read_text()
-GALLERY_TEMPLATE = (ROOT / "posts" / "art" / "_gallery-template.html").read_text()
-GENERIC_TEMPLATE = (ROOT / "posts" / "_md-template.html").read_text()
+TEMPLATE_PATHS = {
+    "single": ROOT / "posts" / "art" / "_single-template.html",
+    "gallery": ROOT / "posts" / "art" / "_gallery-template.html",
+    "generic": ROOT / "posts" / "_md-template.html",
+}
+SINGLE_TEMPLATE = TEMPLATE_PATHS["single"].read_text()
+GALLERY_TEMPLATE = TEMPLATE_PATHS["gallery"].read_text()
+GENERIC_TEMPLATE = TEMPLATE_PATHS["generic"].read_text()
 
 IMAGE_RE = re.compile(r"^!\[(.*?)\]\((.*?)\)\s*$")
-INLINE_CODE_RE = re.compile(r"`([^`]+)`")
-ORDERED_LIST_RE = re.compile(r"^\s*\d+\.\s+(.*)$")
-UNORDERED_LIST_RE = re.compile(r"^\s*[-*]\s+(.*)$")
 
 
 @dataclass
@@ -51,12 +76,107 @@ def parse_front_matter(lines: list[str], source: Path) -> FrontMatter:
     )
 
 
+def content_hash(data: str | bytes) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def template_hashes(asset_urls: dict[str, str]) -> dict[str, str]:
+    # Posts link the hashed assets, so a new asset hash has to invalidate them like a template edit.
+    asset_key = json.dumps(asset_urls, sort_keys=True) if asset_urls else ""
+    # Placeholders depend on Pillow being importable; see image_info.
+    if image_info.PLACEHOLDERS:
+        asset_key += "+placeholders"
+    return {
+        "single": content_hash(SINGLE_TEMPLATE + asset_key),
+        "gallery": content_hash(GALLERY_TEMPLATE + asset_key),
+        "generic": content_hash(GENERIC_TEMPLATE + asset_key),
+    }
+
+
+# Published (content-hashed) CSS/JS names from build_assets.py; written pages link to these.
+ASSET_URLS = load_asset_urls()
+TEMPLATE_HASHES = template_hashes(ASSET_URLS)
+
+
+def use_asset_urls(urls: dict[str, str]) -> None:
+    """Switch to freshly published asset names (build_site.py runs build_assets in-process)."""
+    global ASSET_URLS, TEMPLATE_HASHES
+    ASSET_URLS = urls
+    TEMPLATE_HASHES = template_hashes(urls)
+
+
+def template_name(fm: FrontMatter) -> str:
+    if fm.type == "gallery":
+        return "gallery"
+    return "single" if fm.section == "art" else "generic"
+
+
+def split_source(text: str, source: Path) -> tuple[FrontMatter, list[str]]:
+    lines = text.split("\n")
+    try:
+        blank_index = lines.index("")
+    except ValueError:
+        raise SystemExit(f"Missing blank line after front matter in {source}")
+    return parse_front_matter(lines[:blank_index], source), lines[blank_index + 1 :]
+
+
+def source_lines(md_path: Path, digest: Any = None) -> Iterator[str]:
+    """The lines of a source like `read_text().split("\n")`, read lazily.
+
+    With `digest` (a hashlib object), the text is hashed as it streams past.
+    """
+    with md_path.open() as source:
+        raw = "\n"
+        for raw in source:
+            if digest is not None:
+                digest.update(raw.encode("utf-8"))
+            profiling.count(read=len(raw))
+            yield raw.removesuffix("\n")
+        # Like str.split("\n"): a trailing newline ends with an empty line.
+        if raw.endswith("\n"):
+            yield ""
+
+
+def take_front_matter(lines: Iterator[str], source: Path) -> FrontMatter:
+    """Parse the front matter off `lines`, leaving them at the first body line."""
+    front: list[str] = []
+    for line in lines:
+        if line == "":
+            return parse_front_matter(front, source)
+        front.append(line)
+    raise SystemExit(f"Missing blank line after front matter in {source}")
+
+
+def scan_source(md_path: Path) -> tuple[FrontMatter, str, str]:
+    """Front matter, list summary and content_hash() of a source, in one streaming pass.
+
+    No body lines are kept: a post that needs rendering reads them again with
+    body_lines(), so an unchanged post costs one line at a time.
+    """
+    digest = hashlib.sha256()
+    lines = source_lines(md_path, digest)
+    fm = take_front_matter(lines, md_path)
+    summary = fm.summary or extract_summary(lines)
+    # Hash the rest.
+    deque(lines, maxlen=0)
+    return fm, summary, digest.hexdigest()
+
+
+def body_lines(md_path: Path) -> Iterator[str]:
+    """The lines after a source's front matter, read lazily."""
+    lines = source_lines(md_path)
+    take_front_matter(lines, md_path)
+    yield from lines
+
+
 def slugify(title: str) -> str:
     slug = re.sub(r"[^a-zA-Z0-9]+", "-", title.strip().lower())
     return slug.strip("-") or "post"
 
 
-def extract_summary(lines: list[str]) -> str:
+def extract_summary(lines: Iterable[str]) -> str:
     for raw in lines:
         line = raw.strip()
         if not line or line.startswith("#") or IMAGE_RE.match(line):
@@ -77,79 +197,233 @@ def normalize_image_path(path: str) -> str:
     return f"../../assets/optimized/{path}"
 
 
-def thumb_for(path: str) -> str:
-    if path.startswith("http://") or path.startswith("https://"):
-        return path
-    if path.endswith("-thumb.png") or path.endswith("-thumb.jpg") or path.endswith("-thumb.jpeg"):
-        return path
-    if "." not in path:
-        return path
-    base, ext = path.rsplit(".", 1)
-    return f"{base}-thumb.{ext}"
+# Generated posts sit at posts/<section>/, so image srcs resolve the same from any section.
+IMAGE_BASE_DIR = OUTPUT_DIR / "section"
+IMAGE_REF_RE = re.compile(r"(?:src|data-full)=\"([^\"]+)\"")
+# Images are shown at most the width of the content column (styles.css).
+IMAGE_SIZES = "(max-width: 980px) 100vw, 980px"
+
+
+def image_file(src: str) -> Path | None:
+    """The file a post's image src points at, or None for remote images."""
+    if src.startswith(("http://", "https://", "data:")):
+        return None
+    if src.startswith("/"):
+        return ROOT / src.lstrip("/")
+    return Path(os.path.normpath(IMAGE_BASE_DIR / src))
+
+
+def image_srcset(src: str) -> str:
+    """srcset listing the optimize_images.py width variants of `src` that exist, or "" if there are none."""
+    path = image_file(src)
+    info = image_info.lookup(path) if path else None
+    if not info:
+        return ""
+    candidates = [
+        f"{image_info.width_variant(src, width)} {width}w"
+        for width in image_info.SRCSET_WIDTHS
+        if width < info.width and image_file(image_info.width_variant(src, width)).is_file()
+    ]
+    return ", ".join([*candidates, f"{src} {info.width}w"]) if candidates else ""
+
+
+def image_attrs(src: str, lazy: bool = True, placeholder: bool = True) -> str:
+    """width/height, srcset, loading and decoding attributes (plus a placeholder style) for an <img>."""
+    path = image_file(src)
+    info = image_info.lookup(path) if path else None
+    attrs = f' width="{info.width}" height="{info.height}"' if info else ""
+    srcset = image_srcset(src)
+    if srcset:
+        attrs += f' srcset="{srcset}" sizes="{IMAGE_SIZES}"'
+    if lazy:
+        attrs += ' loading="lazy"'
+    attrs += ' decoding="async"'
+    if info and info.placeholder and placeholder:
+        attrs += f' style="background:center/contain no-repeat url({info.placeholder})"'
+    return attrs
+
+
+def image_dependencies(html: str) -> dict[str, str | None]:
+    """Hash of every local image `html` links (None if missing), so the post rebuilds when one changes."""
+    deps: dict[str, str | None] = {}
+    for src in IMAGE_REF_RE.findall(html):
+        path = image_file(src)
+        if path is None or path.suffix.lower() not in image_info.IMAGE_SUFFIXES:
+            continue
+        # Width variants too: one appearing or disappearing changes the srcset.
+        for dep in [path, *(image_file(image_info.width_variant(src, width)) for width in image_info.SRCSET_WIDTHS)]:
+            deps[image_info.rel_key(dep)] = image_info.file_hash(dep)[0]
+    return deps
+
 
+def split_gallery_and_body(
+    lines: Iterable[str], use_gallery: bool
+) -> tuple[list[tuple[str, str]], Iterable[str]]:
+    """Take the leading image block (after an optional H1) off a gallery post's body.
 
-def split_gallery_and_body(lines: list[str], use_gallery: bool) -> tuple[list[tuple[str, str]], list[str]]:
+    Only the lines up to the end of the block are read, so `lines` can be a lazy
+    iterator; the body is returned as the same kind of iterable, the block removed.
+    """
     if not use_gallery:
         return [], lines
 
-    cleaned = list(lines)
-    index = 0
+    rest = iter(lines)
+    head: list[str] = []
+    line = next(rest, None)
     # Skip leading blank lines
-    while index < len(cleaned) and not cleaned[index].strip():
-        index += 1
+    while line is not None and not line.strip():
+        head.append(line)
+        line = next(rest, None)
     # Skip a single leading H1
-    if index < len(cleaned) and cleaned[index].strip().startswith("# "):
-        index += 1
+    if line is not None and line.strip().startswith("# "):
+        head.append(line)
+        line = next(rest, None)
     # Skip blank lines after H1
-    while index < len(cleaned) and not cleaned[index].strip():
-        index += 1
+    while line is not None and not line.strip():
+        head.append(line)
+        line = next(rest, None)
 
     gallery_images: list[tuple[str, str]] = []
-    block_start = index
-    while index < len(cleaned):
-        match = IMAGE_RE.match(cleaned[index].strip())
+    while line is not None:
+        match = IMAGE_RE.match(line.strip())
         if not match:
             break
         alt, path = match.groups()
         gallery_images.append((alt, path))
-        index += 1
-    if not gallery_images:
-        return [], lines
+        line = next(rest, None)
+
+    tail = [] if line is None else [line]
+    body = chain(head, tail, rest)
+    return gallery_images, list(body) if isinstance(lines, list) else body
+
+
+# One scanner for every inline span, recursing into each span's contents. The spans
+# used to be four re.sub passes (code, links, bold, italic, each over the previous
+# pass's output); the alternatives below keep that precedence within one scan:
+# emphasis may contain links and bold only where the passes would have produced them
+# whole, and a link containing "*" claims its stars before emphasis does.
+_LINK = r"\[[^\]]+\]\([^)]+\)"
+_STARLESS_LINK = r"\[[^\]*]+\]\([^)*]+\)"
+# Runs of plain text are taken possessively; only a "[" needs the link lookahead.
+_BOLD_TEXT = rf"(?:[^*[]++|{_STARLESS_LINK}|(?!{_LINK})\[)+"
+_BOLD = rf"\*\*{_BOLD_TEXT}\*\*"
+_ITALIC_LINK = r"\[(?:[^\]*]|\*\*[^*\]]+\*\*)+\]\([^)*]+\)"
+INLINE_RE = re.compile(
+    r"`(?P<code>[^`]+)`"
+    r"|\[(?P<label>[^\]]+)\]\((?P<href>[^)]+)\)"
+    rf"|\*\*(?P<bold>{_BOLD_TEXT})\*\*"
+    # An italic closes on a lone "*", or on one directly followed by a bold span.
+    rf"|\*(?P<italic>(?:[^*[]++|{_ITALIC_LINK}|{_BOLD}|(?!{_LINK})\[)+)\*(?:(?!\*)|(?={_BOLD}))"
+)
 
-    body = cleaned[:block_start] + cleaned[index:]
-    return gallery_images, body
 
+def format_inline(text: str) -> str:
+    """Very small markdown-ish inline formatter: `code`, [links](href), **bold**, *italic*.
+
+    Spans nest: link labels, bold and italic text are formatted in turn (and, as
+    before, code and hrefs too).
+
+    >>> format_inline("***very important***")
+    '<em><strong>very important</strong></em>'
+    >>> format_inline("*an **emphasised** word*")
+    '<em>an <strong>emphasised</strong> word</em>'
+    >>> format_inline("see [the `docs`](https://example.com) **now**")
+    'see <a href="https://example.com">the <code>docs</code></a> <strong>now</strong>'
+    >>> format_inline("**bold***then italic*")
+    '<strong>bold</strong><em>then italic</em>'
+    """
+    # Nothing to format; most lines take this path.
+    if "*" not in text and "`" not in text and "[" not in text:
+        return text
+    parts: list[str] = []
+    done = pos = 0
+    while match := INLINE_RE.search(text, pos):
+        start = match.start()
+        kind = match.lastgroup
+        # An italic can't open right after a "*", unless that "*" closed the previous span.
+        if kind == "italic" and start > done and text[start - 1] == "*":
+            pos = start + 1
+            continue
+        parts.append(text[done:start])
+        if kind == "code":
+            parts.append(f"<code>{format_inline(match['code'])}</code>")
+        elif kind == "href":
+            parts.append(f'<a href="{format_inline(match["href"])}">{format_inline(match["label"])}</a>')
+        elif kind == "bold":
+            parts.append(f"<strong>{format_inline(match['bold'])}</strong>")
+        else:
+            parts.append(f"<em>{format_inline(match['italic'])}</em>")
+        done = pos = match.end()
+    parts.append(text[done:])
+    return "".join(parts)
 
-BOLD_RE = re.compile(r"\*\*([^*]+)\*\*")
-ITALIC_RE = re.compile(r"(?<!\*)\*([^*]+)\*(?!\*)")
-LINK_RE = re.compile(r"\[([^\]]+)\]\(([^)]+)\)")
 
+def _match_image(stripped: str) -> tuple[str, str] | None:
+    # Same shape as IMAGE_RE: ![alt](path), alt ends at the first "](".
+    if not stripped.startswith("![") or not stripped.endswith(")"):
+        return None
+    split = stripped.find("](", 2)
+    if split == -1:
+        return None
+    return stripped[2:split], stripped[split + 2 : -1]
 
-def format_inline(text: str) -> str:
-    """Very small markdown-ish inline formatter.
 
-    Order matters: code first, then links/emphasis.
-    """
+def _match_ordered_item(stripped: str) -> str | None:
+    index = 0
+    while index < len(stripped) and stripped[index].isdecimal():
+        index += 1
+    if index + 1 >= len(stripped) or stripped[index] != "." or not stripped[index + 1].isspace():
+        return None
+    return stripped[index + 1 :].strip()
+
 
-    def repl_code(m: re.Match[str]) -> str:
-        return f"<code>{m.group(1)}</code>"
+def tokenize_blocks(lines: Iterable[str]) -> Iterator[tuple[str, Any]]:
+    """Classify each line by its first non-space character and yield block tokens.
 
-    text = INLINE_CODE_RE.sub(repl_code, text)
+    Tokens: ("pre", (code_lines, closed)), ("blank", None), ("image", (alt, path)),
+    ("ol", text), ("ul", text), ("h1", text), ("h2", text), ("html", line), ("text", line).
+    """
+    code_lines: list[str] | None = None
+    for raw in lines:
+        line = raw.rstrip("\n")
+        stripped = line.strip()
+        first = stripped[:1]
 
-    def repl_link(m: re.Match[str]) -> str:
-        label, href = m.group(1), m.group(2)
-        return f'<a href="{href}">{label}</a>'
+        if code_lines is not None:
+            if first == "`" and stripped.startswith("```"):
+                yield "pre", (code_lines, True)
+                code_lines = None
+            else:
+                code_lines.append(line)
+        elif not first:
+            yield "blank", None
+        elif first == "`" and stripped.startswith("```"):
+            code_lines = []
+        elif first == "!":
+            image = _match_image(stripped)
+            yield ("image", image) if image else ("text", line)
+        elif first.isdecimal():
+            item = _match_ordered_item(stripped)
+            yield ("ol", item) if item is not None else ("text", line)
+        elif first in "-*" and len(stripped) > 1 and stripped[1].isspace():
+            yield "ul", stripped[1:].strip()
+        elif first == "#" and stripped.startswith("## "):
+            yield "h2", stripped[3:].strip()
+        elif first == "#" and stripped.startswith("# "):
+            yield "h1", stripped[2:].strip()
+        elif first == "<" and stripped.endswith(">"):
+            # Allow raw HTML blocks (for embeds) to pass through.
+            yield "html", line
+        else:
+            yield "text", line
 
-    text = LINK_RE.sub(repl_link, text)
-    text = BOLD_RE.sub(r"<strong>\1</strong>", text)
-    text = ITALIC_RE.sub(r"<em>\1</em>", text)
-    return text
+    if code_lines is not None:
+        yield "pre", (code_lines, False)
 
 
-def markdown_to_html(lines: list[str]) -> str:
+def markdown_to_html(lines: Iterable[str]) -> str:
     html: list[str] = []
     image_run: list[tuple[str, str]] = []
-    in_code_block = False
     list_mode: str | None = None
     paragraph: list[str] = []
 
@@ -178,12 +452,12 @@ def markdown_to_html(lines: list[str]) -> str:
             html.append('<div class="inline-gallery">')
             for alt, path in image_run:
                 src = normalize_image_path(path)
-                html.append(f'  <img class="inline-image" src="{src}" alt="{alt}" />')
+                html.append(f'  <img class="inline-image" src="{src}" alt="{alt}"{image_attrs(src)} />')
             html.append("</div>")
         else:
             alt, path = image_run[0]
             src = normalize_image_path(path)
-            html.append(f'<img class="inline-image" src="{src}" alt="{alt}" />')
+            html.append(f'<img class="inline-image" src="{src}" alt="{alt}"{image_attrs(src)} />')
         image_run = []
 
     def close_list() -> None:
@@ -194,71 +468,43 @@ def markdown_to_html(lines: list[str]) -> str:
             html.append("</ul>")
         list_mode = None
 
-    for raw in lines:
-        line = raw.rstrip("\n")
-        stripped = line.strip()
-
-        if stripped.startswith("```"):
-            flush_images()
-            flush_paragraph()
-            close_list()
-            if not in_code_block:
-                html.append("<pre><code>")
-                in_code_block = True
-            else:
-                html.append("</code></pre>")
-                in_code_block = False
-            continue
-
-        if in_code_block:
-            html.append(line)
+    for kind, value in tokenize_blocks(lines):
+        if kind == "image":
+            image_run.append(value)
             continue
 
-        if not stripped:
+        if image_run:
             flush_images()
+
+        if kind == "text":
+            close_list()
+            paragraph.append(value)
+        elif kind == "ol" or kind == "ul":
+            flush_paragraph()
+            if list_mode != kind:
+                close_list()
+                html.append(f"<{kind}>")
+                list_mode = kind
+            html.append(f"  <li>{format_inline(value)}</li>")
+        elif kind == "blank":
             flush_paragraph()
             close_list()
             html.append("")
-            continue
-
-        image_match = IMAGE_RE.match(stripped)
-        if image_match:
-            image_run.append(image_match.groups())
-            continue
-
-        flush_images()
-
-        ordered_match = ORDERED_LIST_RE.match(stripped)
-        unordered_match = UNORDERED_LIST_RE.match(stripped)
-        if ordered_match or unordered_match:
+        elif kind == "pre":
             flush_paragraph()
-            desired_mode = "ol" if ordered_match else "ul"
-            if list_mode != desired_mode:
-                close_list()
-                html.append(f"<{desired_mode}>")
-                list_mode = desired_mode
-            item_text = ordered_match.group(1) if ordered_match else unordered_match.group(1)
-            html.append(f"  <li>{format_inline(item_text.strip())}</li>")
-            continue
+            close_list()
+            code_lines, closed = value
+            html.append("<pre><code>")
+            html.extend(code_lines)
+            if closed:
+                html.append("</code></pre>")
         else:
             close_list()
-
-        if stripped.startswith("## "):
-            flush_paragraph()
-            html.append(f"<h2>{format_inline(stripped[3:].strip())}</h2>")
-            continue
-        if stripped.startswith("# "):
             flush_paragraph()
-            html.append(f"<h1>{format_inline(stripped[2:].strip())}</h1>")
-            continue
-
-        # Allow raw HTML blocks (for embeds) to pass through.
-        if stripped.startswith("<") and stripped.endswith(">"):
-            flush_paragraph()
-            html.append(line)
-            continue
-
-        paragraph.append(line)
+            if kind == "html":
+                html.append(value)
+            else:
+                html.append(f"<{kind}>{format_inline(value)}</{kind}>")
 
     flush_images()
     flush_paragraph()
@@ -267,153 +513,768 @@ def markdown_to_html(lines: list[str]) -> str:
     return "\n".join(html)
 
 
-def build_gallery_html(fm: FrontMatter, images: list[tuple[str, str]]) -> str:
-    if not images:
-        raise SystemExit(f"Gallery type requires images in {fm.source}")
+# Regions of the post templates that get filled per post. Each pattern's first group is
+# the slot body; everything outside the groups is copied through verbatim.
+SLOT_PATTERNS = {
+    "head_title": re.compile(r"<title>([\s\S]*?)</title>"),
+    "title": re.compile(r"<h1 class=\"title\">([\s\S]*?)</h1>"),
+    "meta": re.compile(r"<div class=\"meta\">([\s\S]*?)</div>"),
+    "image": re.compile(r"<img class=\"art-image\" (src=\"[^\"]*\")"),
+    "gallery_main": re.compile(r"<div class=\"gallery-main\">([\s\S]*?)</div>"),
+    "thumbs": re.compile(r"<div class=\"gallery-thumbs\">([\s\S]*?)</div>"),
+    "article": re.compile(r"<section class=\"article\">([\s\S]*?)</section>"),
+}
+
+
+class CompiledTemplate:
+    """A post template split once into literal chunks and named slots.
 
-    html = GALLERY_TEMPLATE
+    Rendering is a single join: literals[0] + slot + literals[1] + slot + ...
+    """
+
+    def __init__(self, text: str, name: str) -> None:
+        spans: list[tuple[int, int, str]] = []
+        for slot, pattern in SLOT_PATTERNS.items():
+            match = pattern.search(text)
+            if match:
+                spans.append((match.start(1), match.end(1), slot))
+        spans.sort()
+
+        self.name = name
+        self.literals: list[str] = []
+        self.slots: list[str] = []
+        pos = 0
+        for start, end, slot in spans:
+            if start < pos:
+                raise SystemExit(f"Overlapping template slot '{slot}' in {name}")
+            self.literals.append(text[pos:start])
+            self.slots.append(slot)
+            pos = end
+        self.literals.append(text[pos:])
+
+    def render(self, values: dict[str, str]) -> str:
+        missing = [slot for slot in self.slots if slot not in values]
+        if missing:
+            raise SystemExit(f"Template {self.name} is missing values for: {', '.join(missing)}")
+        out = [self.literals[0]]
+        for slot, literal in zip(self.slots, self.literals[1:]):
+            out.append(values[slot])
+            out.append(literal)
+        return "".join(out)
+
+
+COMPILED_TEMPLATES = {
+    "single": CompiledTemplate(SINGLE_TEMPLATE, TEMPLATE_PATHS["single"].name),
+    "gallery": CompiledTemplate(GALLERY_TEMPLATE, TEMPLATE_PATHS["gallery"].name),
+    "generic": CompiledTemplate(GENERIC_TEMPLATE, TEMPLATE_PATHS["generic"].name),
+}
+
+
+def article_html(fm: FrontMatter, content_html: str) -> str:
     section_label = fm.section.replace("-", " ").title()
+    return (
+        f"\n{content_html}\n"
+        f"        <a class=\"back-link\" href=\"../../index.html#{fm.section}\">← Back to {section_label}</a>\n"
+        "      "
+    )
 
-    html = html.replace("Art Series Title · Zach Isn't Dead", f"{fm.title} · Zach Isn't Dead")
-    html = html.replace("Art Series Title", fm.title)
-    html = html.replace("YYYY-MM-DD · Art", f"{fm.date} · {section_label}")
+
+def header_slots(fm: FrontMatter) -> dict[str, str]:
+    section_label = fm.section.replace("-", " ").title()
+    return {
+        "head_title": f"{fm.title} · Zach Isn't Dead",
+        "title": fm.title,
+        "meta": f"{fm.date} · {section_label}",
+    }
+
+
+def build_gallery_html(fm: FrontMatter, images: list[tuple[str, str]], content_html: str) -> str:
+    if not images:
+        raise SystemExit(f"Gallery type requires images in {fm.source}")
 
     main_alt, main_path = images[0]
     main_src = normalize_image_path(main_path)
-    main_block = f'<img src="{main_src}" alt="{main_alt}" />'
-    html = re.sub(
-        r"<div class=\"gallery-main\">[\s\S]*?</div>",
-        f"<div class=\"gallery-main\">\n            {main_block}\n          </div>",
-        html,
-    )
+    # The main image and the thumbnail strip under it are above the fold, so neither is
+    # lazy; thumbnails are too small to need a placeholder.
+    main_block = f'<img src="{main_src}" alt="{main_alt}"{image_attrs(main_src, lazy=False)} />'
 
     thumbs = []
     for idx, (alt, path) in enumerate(images, start=1):
         full_src = normalize_image_path(path)
-        thumb_src = normalize_image_path(thumb_for(path))
+        thumb_src = normalize_image_path(image_info.thumb_for(path))
+        full_file = image_file(full_src)
+        full_info = image_info.lookup(full_file) if full_file else None
+        # gallery.js copies these onto the main image when it switches to this one.
+        size = f' data-width="{full_info.width}" data-height="{full_info.height}"' if full_info else ""
+        srcset = image_srcset(full_src)
+        if srcset:
+            size += f' data-srcset="{srcset}"'
         thumbs.append(
-            f'            <button class="gallery-thumb" type="button" data-full="{full_src}" '
+            f'            <button class="gallery-thumb" type="button" data-full="{full_src}"{size} '
             f'data-alt="{alt or f"Image {idx}"}" data-caption="">\n'
-            f'              <img src="{thumb_src}" alt="Thumbnail {idx}." />\n'
+            f'              <img src="{thumb_src}" alt="Thumbnail {idx}."{image_attrs(thumb_src, lazy=False, placeholder=False)} />\n'
             f'            </button>'
         )
     thumbs_html = "\n".join(thumbs)
-    html = re.sub(
-        r"<div class=\"gallery-thumbs\">[\s\S]*?</div>",
-        f"<div class=\"gallery-thumbs\">\n{thumbs_html}\n          </div>",
-        html,
-    )
 
-    return html
+    html = COMPILED_TEMPLATES["gallery"].render(
+        {
+            **header_slots(fm),
+            "gallery_main": f"\n            {main_block}\n          ",
+            "thumbs": f"\n{thumbs_html}\n          ",
+            "article": article_html(fm, content_html),
+        }
+    )
+    # Fetch the first full image as soon as <head> is parsed; gallery.js prefetches the others.
+    main_srcset = image_srcset(main_src)
+    responsive = f' imagesrcset="{main_srcset}" imagesizes="{IMAGE_SIZES}"' if main_srcset else ""
+    preload = f'<link rel="preload" as="image" href="{main_src}"{responsive} fetchpriority="high">'
+    return html.replace("</head>", f"  {preload}\n</head>", 1)
 
 
-def build_single_html(fm: FrontMatter, images: list[tuple[str, str]]) -> str:
-    section_label = fm.section.replace("-", " ").title()
+def build_single_html(fm: FrontMatter, images: list[tuple[str, str]], content_html: str) -> str:
+    values = {**header_slots(fm), "article": article_html(fm, content_html)}
 
     # For non-art sections, use a simpler template with no required hero/media.
     if fm.section != "art":
-        html = GENERIC_TEMPLATE
-        html = html.replace("Post Title · Zach Isn't Dead", f"{fm.title} · Zach Isn't Dead")
-        html = html.replace("Post Title", fm.title)
-        html = html.replace("YYYY-MM-DD · Category", f"{fm.date} · {section_label}")
-        return html
-
-    html = SINGLE_TEMPLATE
-    html = html.replace("Art Title · Zach Isn't Dead", f"{fm.title} · Zach Isn't Dead")
-    html = html.replace("Art Title", fm.title)
-    html = html.replace("YYYY-MM-DD · Art", f"{fm.date} · {section_label}")
+        return COMPILED_TEMPLATES["generic"].render(values)
 
     image_path = images[0][1] if images else "your-image.jpg"
-    html = html.replace("../../assets/your-image.jpg", normalize_image_path(image_path))
-    return html
+    src = normalize_image_path(image_path)
+    values["image"] = f'src="{src}"{image_attrs(src, lazy=False)}'
+    return COMPILED_TEMPLATES["single"].render(values)
 
 
-def build_post(fm: FrontMatter, lines: list[str]) -> Path:
-    gallery_images, body_lines = split_gallery_and_body(lines, fm.type == "gallery")
-    content_html = markdown_to_html(body_lines)
+def render_post(fm: FrontMatter, lines: Iterable[str]) -> str:
+    with profiling.span("markdown"):
+        gallery_images, body = split_gallery_and_body(lines, fm.type == "gallery")
+        content_html = markdown_to_html(body)
 
-    if fm.type == "gallery":
-        html = build_gallery_html(fm, gallery_images)
-    else:
-        html = build_single_html(fm, gallery_images)
+    with profiling.span("template"):
+        if fm.type == "gallery":
+            return build_gallery_html(fm, gallery_images, content_html)
+        return build_single_html(fm, gallery_images, content_html)
 
-    section_label = fm.section.replace("-", " ").title()
 
-    html = re.sub(
-        r"<section class=\"article\">[\s\S]*?</section>",
-        f"<section class=\"article\">\n{content_html}\n        <a class=\"back-link\" href=\"../../index.html#{fm.section}\">← Back to {section_label}</a>\n      </section>",
-        html,
-        count=1,
-    )
+def output_path(fm: FrontMatter) -> Path:
+    return OUTPUT_DIR / fm.section / f"{slugify(fm.title)}.html"
+
 
-    out_dir = OUTPUT_DIR / fm.section
-    out_dir.mkdir(parents=True, exist_ok=True)
-    out_file = out_dir / f"{slugify(fm.title)}.html"
-    out_file.write_text(html)
-    print(f"Wrote {out_file}")
+def post_html(fm: FrontMatter, lines: Iterable[str]) -> str:
+    return rewrite_asset_refs(render_post(fm, lines), ASSET_URLS)
+
+
+def build_post(fm: FrontMatter, lines: Iterable[str]) -> Path:
+    out_file = output_path(fm)
+    outputs.write_output(out_file, post_html(fm, lines))
     return out_file
 
 
-def rebuild_section_lists(entries: list[tuple[FrontMatter, Path, str]]) -> None:
-    by_section: dict[str, list[tuple[FrontMatter, Path, str]]] = {}
+SECTIONS_DIR = ROOT / "sections"
+MD_POSTS_RE = re.compile(r"<!-- md-posts:start -->[\s\S]*?<!-- md-posts:end -->")
+
+# The home page lists only the newest HOME_LIST_LIMIT posts per section (override per
+# section in HOME_LIST_LIMITS); every post is also listed in archive pages of
+# ARCHIVE_PAGE_SIZE at posts/<section>/page/N.html.
+HOME_LIST_LIMIT = 5
+HOME_LIST_LIMITS: dict[str, int] = {}
+ARCHIVE_PAGE_SIZE = 10
+
+
+def archive_template(generic: str) -> CompiledTemplate:
+    """Archive pages sit one directory deeper than posts, so their relative links need one more "../"."""
+    return CompiledTemplate(generic.replace('"../../', '"../../../'), "archive")
+
+
+ARCHIVE_TEMPLATE = archive_template(GENERIC_TEMPLATE)
+
+
+# Section-list entries held in memory before EntrySpool spills a sorted run to disk.
+SPOOL_CHUNK = 1000
+
+
+class PostEntry:
+    """What a section list shows for one post; one of these per listed post is all the
+    section lists keep, so they're slotted rather than a dict or dataclass."""
+
+    __slots__ = ("section", "date", "name", "title", "meta", "summary")
+
+    def __init__(self, section: str, date: str, name: str, title: str, meta: str, summary: str) -> None:
+        self.section = section
+        self.date = date
+        # Output file name, under posts/<section>/.
+        self.name = name
+        self.title = title
+        self.meta = meta
+        self.summary = summary
+
+    @classmethod
+    def of(cls, fm: FrontMatter, out_file: Path, summary: str) -> PostEntry:
+        return cls(fm.section, fm.date, out_file.name, fm.title, fm.label or fm.type.title(), summary)
+
+    def row(self) -> list[str]:
+        return [getattr(self, field) for field in self.__slots__]
+
+    def sort_key(self) -> tuple[str, str, str]:
+        return self.section, self.date, self.name
+
+
+class EntrySpool:
+    """Section-list entries, sorted by section, date and name with an external merge sort.
+
+    add() buffers entries; each full chunk of SPOOL_CHUNK is sorted and spilled to a
+    temporary file as one run of JSON lines, so at most one chunk is held in memory
+    however large the archive gets. sections() merges the runs back lazily.
+    """
+
+    def __init__(self, chunk: int = SPOOL_CHUNK) -> None:
+        self.chunk = chunk
+        self.buffer: list[PostEntry] = []
+        self.runs: list[IO[str]] = []
+        # Listed posts per section.
+        self.counts: dict[str, int] = {}
+
+    def add(self, fm: FrontMatter, out_file: Path, summary: str) -> None:
+        if not fm.post_to_site:
+            return
+        self.buffer.append(PostEntry.of(fm, out_file, summary))
+        self.counts[fm.section] = self.counts.get(fm.section, 0) + 1
+        if len(self.buffer) >= self.chunk:
+            self._spill()
+
+    def _spill(self) -> None:
+        self.buffer.sort(key=PostEntry.sort_key)
+        run = tempfile.TemporaryFile("w+", encoding="utf-8")
+        run.writelines(json.dumps(entry.row()) + "\n" for entry in self.buffer)
+        self.runs.append(run)
+        self.buffer = []
+
+    def _read_run(self, run: IO[str]) -> Iterator[PostEntry]:
+        run.seek(0)
+        for line in run:
+            yield PostEntry(*json.loads(line))
+
+    def sections(self) -> Iterator[tuple[str, Iterator[PostEntry]]]:
+        """Yield (section, its entries oldest first), one section at a time."""
+        self.buffer.sort(key=PostEntry.sort_key)
+        merged = heapq.merge(*(self._read_run(run) for run in self.runs), self.buffer, key=PostEntry.sort_key)
+        return groupby(merged, key=attrgetter("section"))
+
+
+def group_by_section(entries: Iterable[tuple[FrontMatter, Path, str]]) -> dict[str, list[PostEntry]]:
+    """In-memory counterpart of EntrySpool, for callers that hold every post anyway (serve.py)."""
+    by_section: dict[str, list[PostEntry]] = {}
     for fm, out_file, summary in entries:
         if not fm.post_to_site:
             continue
-        by_section.setdefault(fm.section, []).append((fm, out_file, summary))
+        by_section.setdefault(fm.section, []).append(PostEntry.of(fm, out_file, summary))
+    return by_section
+
+
+def post_item_html(entry: PostEntry, href: str, indent: str = "    ") -> str:
+    return "\n".join([
+        f"{indent}<article class=\"post-item\" data-origin=\"md\">",
+        f"{indent}  <div class=\"post-meta\">{entry.meta}</div>",
+        f"{indent}  <h3><a class=\"content-link\" href=\"{href}\">{entry.title}</a></h3>",
+        f"{indent}  <p>{entry.summary}</p>",
+        f"{indent}</article>",
+    ])
+
+
+def archive_page_path(section: str, page: int) -> Path:
+    return OUTPUT_DIR / section / "page" / f"{page}.html"
+
 
-    for section, items in by_section.items():
-        section_file = ROOT / "sections" / f"{section}.html"
-        if not section_file.exists():
+def home_list_limit(section: str) -> int:
+    return HOME_LIST_LIMITS.get(section, HOME_LIST_LIMIT)
+
+
+def archive_page_count(section: str, total: int) -> int:
+    """Archive pages for a section of `total` posts; none if they all fit on the home page."""
+    if total <= home_list_limit(section):
+        return 0
+    return -(-total // ARCHIVE_PAGE_SIZE)
+
+
+def archive_pages(items: list[PostEntry]) -> list[list[PostEntry]]:
+    """Split a section's posts into archive pages, numbered from the oldest.
+
+    Counting from the oldest post keeps every full page unchanged when a post is
+    added; only the newest page (and the one before it, for its "newer" link) moves.
+    """
+    items = sorted(items, key=PostEntry.sort_key)
+    return [items[start : start + ARCHIVE_PAGE_SIZE] for start in range(0, len(items), ARCHIVE_PAGE_SIZE)]
+
+
+def section_list_html(html: str, section: str, newest: list[PostEntry], total: int) -> str:
+    """Replace the md-posts block of a section with its `newest` posts and, past the limit, an archive link."""
+    if "<!-- md-posts:start -->" not in html or "<!-- md-posts:end -->" not in html:
+        return html
+
+    generated = [post_item_html(entry, f"posts/{entry.section}/{entry.name}") for entry in newest]
+    pages = archive_page_count(section, total)
+    if pages:
+        href = f"posts/{section}/page/{pages}.html"
+        generated.append(
+            f"    <p class=\"post-archive-link\"><a class=\"content-link\" href=\"{href}\">All {total} posts →</a></p>"
+        )
+
+    generated_block = "\n".join(generated)
+    return MD_POSTS_RE.sub(
+        lambda _: f"<!-- md-posts:start -->\n{generated_block}\n    <!-- md-posts:end -->",
+        html,
+        count=1,
+    )
+
+
+def render_section_list(html: str, items: list[PostEntry]) -> str:
+    """Replace the md-posts block of a section with its newest posts and an archive link."""
+    items = sorted(items, key=PostEntry.sort_key, reverse=True)
+    section = items[0].section if items else ""
+    return section_list_html(html, section, items[: home_list_limit(section)], len(items))
+
+
+def archive_page_html(section: str, number: int, page_count: int, page_items: list[PostEntry]) -> str:
+    """One archive page; `page_items` are oldest first and listed newest first."""
+    section_label = section.replace("-", " ").title()
+    listed = "\n".join(
+        post_item_html(entry, f"../{entry.name}", indent="          ") for entry in reversed(page_items)
+    )
+    links = []
+    if number < page_count:
+        links.append(f"<a class=\"content-link\" rel=\"next\" href=\"{number + 1}.html\">← Newer</a>")
+    if number > 1:
+        links.append(f"<a class=\"content-link\" rel=\"prev\" href=\"{number - 1}.html\">Older →</a>")
+    pager = f"        <nav class=\"archive-pager\">{' '.join(links)}</nav>\n" if links else ""
+    article = (
+        f"\n        <div class=\"post-list\">\n{listed}\n        </div>\n"
+        f"{pager}"
+        f"        <a class=\"back-link\" href=\"../../../index.html#{section}\">← Back to {section_label}</a>\n"
+        "      "
+    )
+    return ARCHIVE_TEMPLATE.render(
+        {
+            "head_title": f"{section_label} archive, page {number} · Zach Isn't Dead",
+            "title": f"{section_label} archive",
+            # No page count: it would change every page whenever a new one is added.
+            "meta": f"Page {number}",
+            "article": article,
+        }
+    )
+
+
+def render_archive_pages(section: str, items: list[PostEntry]) -> dict[Path, str]:
+    """Return {output path: html} for every archive page of a section, or nothing if it fits on the home page."""
+    if not archive_page_count(section, len(items)):
+        return {}
+    pages = archive_pages(items)
+    return {
+        archive_page_path(section, number): archive_page_html(section, number, len(pages), page_items)
+        for number, page_items in enumerate(pages, start=1)
+    }
+
+
+def write_section_pages(section: str, html: str, items: Iterable[PostEntry], total: int) -> str:
+    """Write a section's archive pages from its `total` entries, oldest first, in one pass.
+
+    Only one archive page and the newest few posts are held at a time. Pages that no
+    longer exist are removed. Returns the section html with its list refreshed.
+    """
+    page_count = archive_page_count(section, total)
+    newest: deque[PostEntry] = deque(maxlen=home_list_limit(section))
+    page: list[PostEntry] = []
+    number = 0
+    for entry in items:
+        newest.append(entry)
+        if not page_count:
             continue
-        html = section_file.read_text()
-        if "<!-- md-posts:start -->" not in html or "<!-- md-posts:end -->" not in html:
+        page.append(entry)
+        if len(page) == ARCHIVE_PAGE_SIZE or number * ARCHIVE_PAGE_SIZE + len(page) == total:
+            number += 1
+            html_page = archive_page_html(section, number, page_count, page)
+            outputs.write_output(archive_page_path(section, number), rewrite_asset_refs(html_page, ASSET_URLS))
+            page = []
+
+    current = {archive_page_path(section, n) for n in range(1, page_count + 1)}
+    for stale in (OUTPUT_DIR / section / "page").glob("*.html"):
+        if stale not in current:
+            outputs.remove_output(stale)
+    return section_list_html(html, section, list(reversed(newest)), total)
+
+
+def update_section_lists(spool: EntrySpool, sections: Mapping[str, str]) -> dict[str, str]:
+    """Refresh the md-posts lists in `sections` (id -> html) and their archive pages.
+
+    Changed section files are written back; the returned mapping holds the current
+    html of every section in `sections`, so callers can use it without re-reading.
+    """
+    updated = dict(sections)
+    for section, items in spool.sections():
+        original = sections.get(section)
+        if original is None:
             continue
+        with profiling.span("section list", "file", file=section):
+            html = write_section_pages(section, original, items, spool.counts[section])
+            if html != original:
+                outputs.write_output(SECTIONS_DIR / f"{section}.html", html)
+                updated[section] = html
+    return updated
+
+
+def rebuild_section_lists(spool: EntrySpool) -> None:
+    sections = {}
+    for section in spool.counts:
+        section_file = SECTIONS_DIR / f"{section}.html"
+        if section_file.exists():
+            sections[section] = section_file.read_text()
+    update_section_lists(spool, sections)
 
-        items.sort(key=lambda entry: entry[0].date, reverse=True)
-        generated = []
-        for fm, out_file, summary in items:
-            href = f"posts/{fm.section}/{out_file.name}"
-            meta = fm.label or fm.type.title()
-            generated.append(
-                "\n".join([
-                    "    <article class=\"post-item\" data-origin=\"md\">",
-                    f"      <div class=\"post-meta\">{meta}</div>",
-                    f"      <h3><a class=\"content-link\" href=\"{href}\">{fm.title}</a></h3>",
-                    f"      <p>{summary}</p>",
-                    "    </article>",
-                ])
-            )
-
-        generated_block = "\n".join(generated)
-        html = re.sub(
-            r"<!-- md-posts:start -->[\s\S]*?<!-- md-posts:end -->",
-            f"<!-- md-posts:start -->\n{generated_block}\n    <!-- md-posts:end -->",
-            html,
-            count=1,
-        )
-        section_file.write_text(html)
+
+def source_key(md_path: Path) -> str:
+    """A source's key in the build manifest; manifest records are stored in key order."""
+    return md_path.relative_to(ROOT).as_posix()
+
+
+def iter_manifest() -> Iterator[tuple[str, dict[str, Any]]]:
+    """Yield (source key, record) from the last build in key order, or nothing if they can't be reused.
+
+    The manifest is JSON lines: a header with the generator version, then one
+    [key, record] line per source, so it's read one record at a time.
+    """
+    try:
+        manifest = MANIFEST_PATH.open(encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with manifest:
+        try:
+            header = json.loads(manifest.readline())
+        except json.JSONDecodeError:
+            return
+        if not isinstance(header, dict) or header.get("generator") != GENERATOR_VERSION:
+            return
+        for line in manifest:
+            try:
+                key, record = json.loads(line)
+            except (json.JSONDecodeError, ValueError):
+                # Cut short by an interrupted write: the rest just rebuilds.
+                return
+            yield key, record
+
+
+def with_records(
+    md_paths: Iterable[Path], records: Iterable[tuple[str, dict[str, Any]]]
+) -> Iterator[tuple[Path, dict[str, Any] | None]]:
+    """Pair sources, in source_key() order, with their records from iter_manifest(), reading both once."""
+    records = iter(records)
+    pending = next(records, None)
+    for md_path in md_paths:
+        key = source_key(md_path)
+        while pending is not None and pending[0] < key:
+            pending = next(records, None)
+        yield md_path, pending[1] if pending is not None and pending[0] == key else None
+
+
+def source_names() -> list[str]:
+    """File names of the markdown sources, in source_key() order.
+
+    Names rather than Paths: a Path per source held through a whole build adds up.
+    """
+    return sorted(name for name in os.listdir(MARKDOWN_DIR) if name.endswith(".md") and not name.startswith("."))
+
+
+class ManifestWriter:
+    """The build manifest being written, one record at a time.
+
+    add() appends each record to a temporary file beside MANIFEST_PATH as soon as
+    its post is done, so a build never holds the records in memory; records()
+    reads them back (the feeds, build_site.py's relinking) and save() moves the
+    file into place. Records must be added in source_key() order.
+    """
+
+    def __init__(self) -> None:
+        fd, name = tempfile.mkstemp(prefix=f".{MANIFEST_PATH.name}.", suffix=".tmp", dir=MANIFEST_PATH.parent)
+        self.path = Path(name)
+        self.file = os.fdopen(fd, "w", encoding="utf-8")
+        self.file.write(json.dumps({"generator": GENERATOR_VERSION}) + "\n")
+        self.saved = False
+        # build_site.py reads records() on one thread while another stage saves.
+        self._lock = threading.Lock()
+        # Not saved (dry run, failed build): the temporary file goes with the writer.
+        self._cleanup = weakref.finalize(self, self.path.unlink, missing_ok=True)
+
+    def add(self, key: str, record: dict[str, Any]) -> None:
+        self.file.write(json.dumps([key, record], sort_keys=True) + "\n")
+
+    def records(self) -> Iterator[dict[str, Any]]:
+        with self._lock:
+            if not self.file.closed:
+                self.file.flush()
+            manifest = self.path.open(encoding="utf-8")
+        with manifest:
+            manifest.readline()
+            for line in manifest:
+                yield json.loads(line)[1]
+
+    def save(self) -> None:
+        with self._lock:
+            if self.saved:
+                return
+            self.file.close()
+            if outputs.DRY_RUN:
+                return
+            self.path.replace(MANIFEST_PATH)
+            self._cleanup.detach()
+            self.path = MANIFEST_PATH
+            self.saved = True
+
+
+def save_manifest(manifest: ManifestWriter) -> None:
+    image_info.save_cache()
+    manifest.save()
+
+
+def is_up_to_date(record: dict[str, Any] | None, source_hash: str, template_hash: str) -> bool:
+    if not record:
+        return False
+    if record.get("source") != source_hash or record.get("template") != template_hash:
+        return False
+    out_file = ROOT / record.get("output", "")
+    if not out_file.is_file():
+        return False
+    for rel, digest in record.get("images", {}).items():
+        if image_info.file_hash(ROOT / rel)[0] != digest:
+            return False
+    data = out_file.read_bytes()
+    profiling.count(read=len(data))
+    return content_hash(data) == record.get("output_hash")
+
+
+def list_entry(fm: FrontMatter, summary: str) -> dict[str, Any]:
+    """The fields a section list needs, kept in the manifest so lists can be rebuilt without the source."""
+    return {
+        "title": fm.title,
+        "date": fm.date,
+        "section": fm.section,
+        "type": fm.type,
+        "label": fm.label,
+        "summary": summary,
+        "post_to_site": fm.post_to_site,
+    }
+
+
+def entry_from_record(md_path: Path, record: dict[str, Any]) -> tuple[FrontMatter, Path, str]:
+    entry = record["entry"]
+    fm = FrontMatter(
+        title=entry["title"],
+        date=entry["date"],
+        section=entry["section"],
+        type=entry["type"],
+        label=entry["label"],
+        summary=entry["summary"],
+        post_to_site=entry["post_to_site"],
+        source=md_path,
+    )
+    return fm, ROOT / record["output"], entry["summary"]
+
+
+def process_source(
+    md_path: Path, record: dict[str, Any] | None
+) -> tuple[FrontMatter, Path, str, dict[str, Any], bool]:
+    """Parse one markdown source and build it unless the manifest record says it's current."""
+    with profiling.span("post", "file", file=md_path.name):
+        return _process_source(md_path, record)
+
+
+def _process_source(
+    md_path: Path, record: dict[str, Any] | None
+) -> tuple[FrontMatter, Path, str, dict[str, Any], bool]:
+    with profiling.span("front matter"):
+        fm, summary, source_hash = scan_source(md_path)
+        template_hash = TEMPLATE_HASHES[template_name(fm)]
+
+    with profiling.span("up-to-date check"):
+        current = bool(record) and is_up_to_date(record, source_hash, template_hash)
+    if current:
+        return fm, ROOT / record["output"], summary, {**record, "entry": list_entry(fm, summary)}, True
+
+    html = post_html(fm, body_lines(md_path))
+    out_file = output_path(fm)
+    with profiling.span("write"):
+        outputs.write_output(out_file, html)
+    record = {
+        "source": source_hash,
+        "template": template_hash,
+        "output": out_file.relative_to(ROOT).as_posix(),
+        "output_hash": content_hash(html),
+        "images": image_dependencies(html),
+        "entry": list_entry(fm, summary),
+    }
+    return fm, out_file, summary, record, False
+
+
+def _init_worker(dry_run: bool, profile: bool) -> None:
+    outputs.set_dry_run(dry_run)
+    profiling.enable(profile)
+
+
+def _process_source_batch(
+    batch: list[tuple[Path, dict[str, Any] | None]]
+) -> tuple[
+    list[tuple[FrontMatter, Path, str, dict[str, Any], bool]],
+    list[outputs.Change],
+    dict[str, Any],
+    list[dict[str, Any]],
+]:
+    # Runs in a pool worker: hand back the writes it made, the image sizes it read and its spans.
+    outputs.take_changes()
+    image_info.take_new()
+    profiling.take_events()
+    results = [process_source(*job) for job in batch]
+    return results, outputs.take_changes(), image_info.take_new(), profiling.take_events()
+
+
+def build_sources(md_paths: Iterable[Path]) -> list[Path]:
+    """Build just `md_paths` and refresh only the section lists they appear in.
+
+    Other posts' list entries come from the build manifest instead of their sources,
+    so the cost follows the number of posts given, not the size of the archive.
+    Returns the output files.
+    """
+    given = {source_key(md_path): md_path for md_path in md_paths}
+    previous = {key: record for key, record in iter_manifest() if key in given}
+    touched: set[str] = set()
+    written: list[Path] = []
+    built: dict[str, dict[str, Any]] = {}
+    for key, md_path in given.items():
+        record = previous.get(key)
+        if record and "entry" in record:
+            # The post may have moved out of a section.
+            touched.add(record["entry"]["section"])
+        fm, out_file, _, built[key], _ = process_source(md_path, record)
+        touched.add(fm.section)
+        written.append(out_file)
+
+    manifest = ManifestWriter()
+    spool = EntrySpool()
+    sources = (MARKDOWN_DIR / name for name in source_names())
+    for md_path, record in with_records(sources, iter_manifest()):
+        key = source_key(md_path)
+        record = built.get(key, record)
+        if record and "entry" in record:
+            entry = entry_from_record(md_path, record)
+        else:
+            # No list entry recorded yet: read the source for one. Unknown sources are left
+            # for the next full build to render.
+            fm, summary, _ = scan_source(md_path)
+            entry = (fm, output_path(fm), summary)
+            if record:
+                record = {**record, "entry": list_entry(fm, summary)}
+        if record:
+            manifest.add(key, record)
+        if entry[0].section in touched:
+            spool.add(*entry)
+
+    rebuild_section_lists(spool)
+    save_manifest(manifest)
+    update_feeds(manifest.records())
+    return written
+
+
+# Sources sent to a pool worker at a time; at most two batches per worker are in flight.
+BUILD_BATCH = 32
+
+
+def iter_builds(
+    pending: Iterable[tuple[Path, dict[str, Any] | None]], count: int, jobs: int = 1
+) -> Iterator[tuple[FrontMatter, Path, str, dict[str, Any], bool]]:
+    """process_source() each of `count` (source, record) jobs, yielding results in job order.
+
+    Jobs are submitted to the pool a few batches ahead of the results being taken,
+    not all at once, so neither the jobs nor the results pile up in memory.
+    """
+    workers = jobs if jobs > 0 else (os.cpu_count() or 1)
+    if workers <= 1 or count <= 1:
+        for job in pending:
+            yield process_source(*job)
+        return
+
+    workers = min(workers, count)
+    batch_size = max(1, min(BUILD_BATCH, count // (workers * 4)))
+    pending = iter(pending)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(outputs.DRY_RUN, profiling.ENABLED),
+    ) as pool:
+        def take(future: Any) -> list[tuple[FrontMatter, Path, str, dict[str, Any], bool]]:
+            results, changes, images, events = future.result()
+            outputs.record(changes)
+            image_info.merge(images)
+            profiling.record(events, outer="post")
+            return results
+
+        # Taken in submission order, so output stays deterministic.
+        in_flight: deque[Any] = deque()
+        for batch in iter(lambda: list(islice(pending, batch_size)), []):
+            in_flight.append(pool.submit(_process_source_batch, batch))
+            if len(in_flight) >= workers * 2:
+                yield from take(in_flight.popleft())
+        while in_flight:
+            yield from take(in_flight.popleft())
+
+
+def build_all(force: bool = False, jobs: int = 1) -> tuple[ManifestWriter, EntrySpool, int]:
+    """Build every source that changed; return (the new manifest, section-list entries, skipped count).
+
+    Posts stream through: each is rendered and written, its record goes straight to
+    the manifest file and only a PostEntry is kept in the spool. Doesn't touch
+    section lists or save the manifest; see main() and build_site.py.
+    """
+    names = source_names()
+    pending = with_records((MARKDOWN_DIR / name for name in names), () if force else iter_manifest())
+
+    manifest = ManifestWriter()
+    spool = EntrySpool()
+    skipped = 0
+    for fm, out_file, summary, record, was_skipped in iter_builds(pending, len(names), jobs):
+        manifest.add(source_key(fm.source), record)
+        spool.add(fm, out_file, summary)
+        skipped += was_skipped
+    return manifest, spool, skipped
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Build markdown posts into posts/<section>/.")
+    parser.add_argument("--force", action="store_true", help="Rebuild every post, ignoring the build manifest")
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Render posts in N worker processes (0 = one per CPU core)",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Report which files would change without writing them")
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+
+    outputs.set_dry_run(args.dry_run)
+    profiling.enable(args.profile is not None)
     if not MARKDOWN_DIR.exists():
         print("No markdown directory found.")
         return
 
-    entries: list[tuple[FrontMatter, Path, str]] = []
-    for md_path in MARKDOWN_DIR.glob("*.md"):
-        lines = md_path.read_text().split("\n")
-        try:
-            blank_index = lines.index("")
-        except ValueError:
-            raise SystemExit(f"Missing blank line after front matter in {md_path}")
-
-        fm = parse_front_matter(lines[:blank_index], md_path)
-        body_lines = lines[blank_index + 1 :]
-        out_file = build_post(fm, body_lines)
-        summary = fm.summary or extract_summary(body_lines)
-        entries.append((fm, out_file, summary))
-
-    rebuild_section_lists(entries)
+    with profiling.span("posts"):
+        manifest, spool, skipped = build_all(args.force, args.jobs)
+    with profiling.span("section lists"):
+        rebuild_section_lists(spool)
+        save_manifest(manifest)
+    with profiling.span("feeds"):
+        update_feeds(manifest.records())
+    if skipped:
+        print(f"Skipped {skipped} unchanged post(s)")
+    if args.dry_run:
+        outputs.report()
+    profiling.finish(args.profile)
 
 
 if __name__ == "__main__":
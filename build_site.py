@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""Build the whole site in one pass, in dependency order.
+
+build_assets.py, build_markdown.py and build.py each work standalone, but they feed
+each other: posts and pages link the hashed asset names, build_markdown.py rewrites the
+section lists, and index.html inlines those sections. Run separately and in the wrong
+order, index.html lags a build behind. This script runs the same steps as stages of
+one dependency graph:
+
+  assets         publish hashed CSS/JS               (build_assets.publish_assets)
+  sections       read sections/*.html once
+  posts          render changed markdown posts       after assets
+  static_pages   re-link hand-written pages          after posts
+  section_lists  refresh post lists + archives       after posts, sections
+  index          index.html, fragments/, build-log   after section_lists
+  feeds          sitemap.xml, feed.xml, feed.json    after index, static_pages, section_lists
+  compress       .gz/.br siblings (--compress)       after everything else
+
+A stage starts as soon as its dependencies finish, so independent ones (sections
+alongside assets, static_pages alongside section_lists) overlap. Section html is
+handed from stage to stage in memory; each step still only writes files whose
+contents changed, so a second run is a no-op. With --dry-run nothing is written; the
+stages still run against each other's would-be output, and the files that would
+change are listed with their byte deltas.
+
+Usage: python3 build_site.py [--force] [--jobs N] [--lazy] [--inline IDS] [--compress] [--dry-run] [--profile [TRACE]]
+"""
+
+from __future__ import annotations
+
+import argparse
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+import time
+from typing import Any, Callable, Iterator
+
+import build
+import build_assets
+import build_markdown
+from feeds import update_feeds
+import outputs
+import profiling
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    deps: tuple[str, ...]
+    # Called with the results of earlier stages (name -> return value).
+    run: Callable[[dict[str, Any]], Any]
+
+
+def check_graph(stages: list[Stage]) -> None:
+    names = {stage.name for stage in stages}
+    for stage in stages:
+        missing = set(stage.deps) - names
+        if missing:
+            raise SystemExit(f"Stage {stage.name} depends on unknown stage(s): {', '.join(sorted(missing))}")
+    done: set[str] = set()
+    remaining = list(stages)
+    while remaining:
+        ready = [stage for stage in remaining if set(stage.deps) <= done]
+        if not ready:
+            raise SystemExit(f"Dependency cycle among: {', '.join(stage.name for stage in remaining)}")
+        done.update(stage.name for stage in ready)
+        remaining = [stage for stage in remaining if stage.name not in done]
+
+
+def run_stages(stages: list[Stage], workers: int = 4) -> dict[str, Any]:
+    """Run each stage once all of its deps are done; return every stage's result."""
+    check_graph(stages)
+    results: dict[str, Any] = {}
+    waiting = list(stages)
+    running: dict[Future[Any], tuple[Stage, float]] = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while waiting or running:
+            for stage in [stage for stage in waiting if all(dep in results for dep in stage.deps)]:
+                waiting.remove(stage)
+                running[pool.submit(run_stage, stage, dict(results))] = (stage, time.perf_counter())
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage, started = running.pop(future)
+                # Re-raises a stage's error here, after the others that are running finish.
+                results[stage.name] = future.result()
+                print(f"[{stage.name}] done in {time.perf_counter() - started:.2f}s")
+    return results
+
+
+def run_stage(stage: Stage, results: dict[str, Any]) -> Any:
+    with profiling.span(stage.name):
+        return stage.run(results)
+
+
+def publish_assets(_: dict[str, Any]) -> dict[str, str]:
+    urls = build_assets.publish_assets()
+    build_markdown.use_asset_urls(urls)
+    return urls
+
+
+def manifest_records(results: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    manifest, _ = results["posts"]
+    return manifest.records() if manifest else iter(())
+
+
+def relink_static_pages(results: dict[str, Any]) -> None:
+    generated = (build_markdown.ROOT / record["output"] for record in manifest_records(results))
+    pages = build_assets.hand_maintained_pages(generated)
+    rewritten = build_assets.rewrite_pages(pages, results["assets"])
+    if rewritten and not outputs.DRY_RUN:
+        print(f"Rewrote asset references in {rewritten} page(s)")
+
+
+def site_stages(args: argparse.Namespace) -> list[Stage]:
+    def posts(_: dict[str, Any]) -> tuple[build_markdown.ManifestWriter | None, build_markdown.EntrySpool]:
+        if not build_markdown.MARKDOWN_DIR.exists():
+            return None, build_markdown.EntrySpool()
+        manifest, spool, skipped = build_markdown.build_all(args.force, args.jobs)
+        if skipped:
+            print(f"Skipped {skipped} unchanged post(s)")
+        return manifest, spool
+
+    def section_lists(results: dict[str, Any]) -> dict[str, str]:
+        manifest, spool = results["posts"]
+        sections = build_markdown.update_section_lists(spool, results["sections"])
+        if manifest:
+            build_markdown.save_manifest(manifest)
+        return sections
+
+    def index(results: dict[str, Any]) -> None:
+        build.build_index(
+            results["section_lists"],
+            lazy=args.lazy,
+            inline=filter(None, args.inline.split(",")),
+            asset_urls=results["assets"],
+        )
+
+    def compress(_: dict[str, Any]) -> None:
+        import compress_outputs
+
+        compress_outputs.run(jobs=args.jobs)
+
+    stages = [
+        Stage("assets", (), publish_assets),
+        Stage("sections", (), lambda _: build.read_sections()),
+        Stage("posts", ("assets",), posts),
+        Stage("static_pages", ("assets", "posts"), relink_static_pages),
+        Stage("section_lists", ("posts", "sections"), section_lists),
+        Stage("index", ("section_lists",), index),
+        Stage("feeds", ("index", "static_pages", "section_lists"), lambda results: update_feeds(manifest_records(results))),
+    ]
+    if args.compress:
+        stages.append(Stage("compress", tuple(stage.name for stage in stages), compress))
+    return stages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build assets, posts, section lists, index.html and feeds in order.")
+    parser.add_argument("--force", action="store_true", help="Rebuild every post, ignoring the build manifest")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Render posts in N worker processes (0 = one per CPU core)")
+    parser.add_argument("--lazy", action="store_true", help="Load all but the --inline sections from fragments/ (see build.py)")
+    parser.add_argument(
+        "--inline",
+        default=",".join(build.DEFAULT_INLINE_SECTIONS),
+        help="Comma-separated section ids to keep inline with --lazy (default: %(default)s)",
+    )
+    parser.add_argument("--compress", action="store_true", help="Finish with compress_outputs.py")
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Run every stage but only report which files would change, and by how much"
+    )
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+
+    outputs.set_dry_run(args.dry_run)
+    profiling.enable(args.profile is not None)
+    # Compressing files that were never written would only compress the old ones.
+    args.compress = args.compress and not args.dry_run
+    started = time.perf_counter()
+    run_stages(site_stages(args))
+    if args.dry_run:
+        outputs.report()
+    else:
+        print(f"Built site in {time.perf_counter() - started:.2f}s")
+    profiling.finish(args.profile)
+
+
+if __name__ == "__main__":
+    main()
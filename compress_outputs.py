@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Write precompressed .gz and .br siblings next to the site's text outputs.
+
+Optional last build step. Every HTML/CSS/JS/XML/JSON file the build emits (see
+OUTPUT_GLOBS) gets a maximum-level gzip sibling and, when the `brotli` module is
+installed (`pip install brotli`), a quality-11 Brotli one, so a static host or
+serve.py can send compressed bytes without compressing per request.
+
+.compress-manifest.json records the source hash behind each pair of siblings, so
+unchanged files are skipped. Siblings of files that no longer exist are removed.
+
+Usage: python3 compress_outputs.py [--jobs N] [--force]
+"""
+
+from __future__ import annotations
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import gzip
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+from outputs import replace_atomic
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROOT = Path(__file__).resolve().parent
+MANIFEST_PATH = ROOT / ".compress-manifest.json"
+OUTPUT_GLOBS = (
+    "*.html",
+    "*.css",
+    "*.js",
+    "sitemap.xml",
+    "feed.xml",
+    "feed.json",
+    "posts/**/*.html",
+    "fragments/*.html",
+    "assets/dist/*.css",
+    "assets/dist/*.js",
+)
+# Below this, the compressed copy plus headers isn't worth a second file.
+MIN_BYTES = 256
+
+
+def find_outputs() -> list[str]:
+    found = set()
+    for pattern in OUTPUT_GLOBS:
+        for path in ROOT.glob(pattern):
+            if path.is_file() and not path.name.startswith("_") and path.stat().st_size >= MIN_BYTES:
+                found.add(path.relative_to(ROOT).as_posix())
+    return sorted(found)
+
+
+def compress_file(rel: str, source_hash: str) -> dict[str, Any]:
+    path = ROOT / rel
+    data = path.read_bytes()
+    # mtime=0 keeps the .gz bytes reproducible.
+    siblings = {"gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        siblings["br"] = brotli.compress(data, quality=11)
+    for ext, compressed in siblings.items():
+        replace_atomic(path.with_name(f"{path.name}.{ext}"), compressed)
+    return {"source": source_hash, "bytes": len(data), **{ext: len(blob) for ext, blob in siblings.items()}}
+
+
+def _compress_job(job: tuple[str, str]) -> dict[str, Any]:
+    return compress_file(*job)
+
+
+def load_manifest() -> dict[str, dict[str, Any]]:
+    if not MANIFEST_PATH.exists():
+        return {}
+    try:
+        return json.loads(MANIFEST_PATH.read_text())
+    except json.JSONDecodeError:
+        return {}
+
+
+def is_current(rel: str, record: dict[str, Any] | None, source_hash: str) -> bool:
+    if not record or record.get("source") != source_hash:
+        return False
+    wanted = ("gz", "br") if brotli is not None else ("gz",)
+    return all(ext in record and (ROOT / f"{rel}.{ext}").is_file() for ext in wanted)
+
+
+def remove_stale(previous: dict[str, dict[str, Any]], current: set[str]) -> None:
+    for rel in previous.keys() - current:
+        for ext in ("gz", "br"):
+            sibling = ROOT / f"{rel}.{ext}"
+            if sibling.exists():
+                sibling.unlink()
+                print(f"Removed {sibling.relative_to(ROOT)}")
+
+
+def ratio(record: dict[str, Any], ext: str) -> str:
+    return f"{ext} {record[ext]:,} ({record[ext] / record['bytes']:.0%})"
+
+
+def run(jobs: int = 0, force: bool = False) -> None:
+    if brotli is None:
+        print("brotli module not installed; writing .gz only (pip install brotli for .br)")
+
+    previous = load_manifest()
+    manifest: dict[str, dict[str, Any]] = {}
+    pending: list[tuple[str, str]] = []
+    for rel in find_outputs():
+        source_hash = hashlib.sha256((ROOT / rel).read_bytes()).hexdigest()
+        record = previous.get(rel)
+        if not force and is_current(rel, record, source_hash):
+            manifest[rel] = record
+        else:
+            pending.append((rel, source_hash))
+
+    workers = jobs if jobs > 0 else (os.cpu_count() or 1)
+    if workers > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+            results = list(pool.map(_compress_job, pending))
+    else:
+        results = [_compress_job(job) for job in pending]
+
+    for (rel, _), record in zip(pending, results):
+        manifest[rel] = record
+        details = ", ".join(ratio(record, ext) for ext in ("gz", "br") if ext in record)
+        print(f"Compressed {rel}: {record['bytes']:,} -> {details}")
+
+    remove_stale(previous, set(manifest))
+    MANIFEST_PATH.write_text(json.dumps(dict(sorted(manifest.items())), indent=2) + "\n")
+    print(f"{len(pending)} compressed, {len(manifest) - len(pending)} unchanged")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Write .gz/.br siblings for the site's text outputs.")
+    parser.add_argument("--jobs", "-j", type=int, default=0, help="Worker processes (0 = one per CPU core)")
+    parser.add_argument("--force", action="store_true", help="Recompress every file, ignoring the manifest")
+    args = parser.parse_args()
+    run(args.jobs, args.force)
+
+
+if __name__ == "__main__":
+    main()
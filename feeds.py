@@ -0,0 +1,173 @@
+"""sitemap.xml, feed.xml (Atom) and feed.json (JSON Feed) for the built site.
+
+Generated from the build manifest records that build_markdown.py already keeps: each
+post's section-list entry plus the hash of its output. Nothing is re-read or re-hashed
+except the few hand-maintained top-level pages and the section archive pages.
+
+The sitemap lists every generated page, including posts not listed on the site and the
+archive pages; the feeds carry only the newest listed (post-to-site) posts.
+
+A page's lastmod only moves when its output hash does. lastmod.json (tracked, so it
+survives a cold build cache) remembers the hash and lastmod of every URL; when no
+hash changed the feed files aren't touched at all.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+import heapq
+from html import escape
+import json
+from pathlib import Path
+from typing import Any, Iterable, Mapping
+
+import outputs
+
+ROOT = Path(__file__).resolve().parent
+SITE_URL = "https://zachisntdead.com/"
+SITE_TITLE = "Zach Isn't Dead"
+SITEMAP_PATH = ROOT / "sitemap.xml"
+ATOM_PATH = ROOT / "feed.xml"
+JSON_FEED_PATH = ROOT / "feed.json"
+LASTMOD_PATH = ROOT / "lastmod.json"
+POSTS_DIR = ROOT / "posts"
+# build_markdown.py's section archive pages, posts/<section>/page/N.html.
+ARCHIVE_PAGES = "*/page/*.html"
+
+# Pages outside build_markdown.py that belong in the sitemap; "index.html" is the site root.
+STATIC_PAGES = ("index.html", "about.html", "build-log.html")
+FEED_LIMIT = 20
+
+
+def page_url(rel: str) -> str:
+    return SITE_URL if rel == "index.html" else SITE_URL + rel
+
+
+def archive_order(path: Path) -> tuple[str, int, str]:
+    """Sort archive pages by section, then page number."""
+    return path.parent.parent.name, int(path.stem) if path.stem.isdigit() else 0, path.name
+
+
+def load_lastmods() -> dict[str, dict[str, str]]:
+    if not LASTMOD_PATH.exists():
+        return {}
+    return json.loads(LASTMOD_PATH.read_text()).get("pages", {})
+
+
+def published(date: str) -> str | None:
+    try:
+        return dt.date.fromisoformat(date).isoformat() + "T00:00:00Z"
+    except ValueError:
+        return None
+
+
+def render_sitemap(pages: dict[str, dict[str, str]]) -> str:
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+    for rel, page in pages.items():
+        lines += [
+            "  <url>",
+            f"    <loc>{escape(page_url(rel))}</loc>",
+            f"    <lastmod>{page['lastmod']}</lastmod>",
+            "  </url>",
+        ]
+    lines.append("</urlset>")
+    return "\n".join(lines) + "\n"
+
+
+def render_atom(posts: list[tuple[str, dict[str, Any], str]]) -> str:
+    updated = max((lastmod for _, _, lastmod in posts), default="1970-01-01T00:00:00Z")
+    lines = [
+        '<?xml version="1.0" encoding="utf-8"?>',
+        '<feed xmlns="http://www.w3.org/2005/Atom">',
+        f"  <title>{escape(SITE_TITLE, quote=False)}</title>",
+        f'  <link href="{SITE_URL}"/>',
+        f'  <link rel="self" href="{SITE_URL}{ATOM_PATH.name}"/>',
+        f"  <id>{SITE_URL}</id>",
+        f"  <updated>{updated}</updated>",
+        "  <author><name>Zach Gastley</name></author>",
+    ]
+    for rel, entry, lastmod in posts:
+        url = escape(page_url(rel))
+        lines += [
+            "  <entry>",
+            f"    <title>{escape(entry['title'], quote=False)}</title>",
+            f'    <link href="{url}"/>',
+            f"    <id>{url}</id>",
+            f"    <updated>{lastmod}</updated>",
+        ]
+        if published(entry["date"]):
+            lines.append(f"    <published>{published(entry['date'])}</published>")
+        lines += [
+            f"    <category term=\"{escape(entry['section'])}\"/>",
+            f"    <summary>{escape(entry['summary'], quote=False)}</summary>",
+            "  </entry>",
+        ]
+    lines.append("</feed>")
+    return "\n".join(lines) + "\n"
+
+
+def render_json_feed(posts: list[tuple[str, dict[str, Any], str]]) -> str:
+    items = []
+    for rel, entry, lastmod in posts:
+        item = {"id": page_url(rel), "url": page_url(rel), "title": entry["title"], "summary": entry["summary"]}
+        if published(entry["date"]):
+            item["date_published"] = published(entry["date"])
+        item["date_modified"] = lastmod
+        item["tags"] = [entry["section"]]
+        items.append(item)
+    feed = {
+        "version": "https://jsonfeed.org/version/1.1",
+        "title": SITE_TITLE,
+        "home_page_url": SITE_URL,
+        "feed_url": SITE_URL + JSON_FEED_PATH.name,
+        "items": items,
+    }
+    return json.dumps(feed, indent=2, ensure_ascii=False) + "\n"
+
+
+def update_feeds(records: Iterable[Mapping[str, Any]]) -> None:
+    """Refresh the sitemap and feeds from build manifest records, read once as they stream past."""
+    hashes: dict[str, str] = {}
+    for rel in STATIC_PAGES:
+        # Through outputs so a dry run hashes the pages it would have written.
+        data = outputs.read_output(ROOT / rel)
+        if data is not None:
+            hashes[rel] = hashlib.sha256(data).hexdigest()
+    # Archive pages aren't in the manifest; there's one per ARCHIVE_PAGE_SIZE listed posts.
+    for path in sorted(outputs.list_outputs(POSTS_DIR, ARCHIVE_PAGES), key=archive_order):
+        data = outputs.read_output(path)
+        if data is not None:
+            hashes[path.relative_to(ROOT).as_posix()] = hashlib.sha256(data).hexdigest()
+    # Only the date, output and hash of each post and the newest few listed entries are kept.
+    generated: list[tuple[str, str, str]] = []
+    newest: list[tuple[str, int, str, dict[str, Any]]] = []
+    for order, record in enumerate(records):
+        entry = record.get("entry", {})
+        generated.append((entry.get("date", ""), record["output"], record["output_hash"]))
+        if not entry.get("post_to_site"):
+            continue
+        # Ties keep manifest order, like a stable sort.
+        heapq.heappush(newest, (entry["date"], -order, record["output"], entry))
+        if len(newest) > FEED_LIMIT:
+            heapq.heappop(newest)
+    # Newest first, matching the section lists.
+    generated.sort(key=lambda post: post[0], reverse=True)
+    for _, rel, digest in generated:
+        hashes[rel] = digest
+
+    previous = load_lastmods()
+    now = dt.datetime.now(dt.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    pages = {
+        rel: previous[rel] if previous.get(rel, {}).get("hash") == digest else {"hash": digest, "lastmod": now}
+        for rel, digest in hashes.items()
+    }
+    feed_paths = (SITEMAP_PATH, ATOM_PATH, JSON_FEED_PATH)
+    if pages == previous and all(outputs.read_output(path) is not None for path in feed_paths):
+        return
+
+    feed_posts = [(rel, entry, pages[rel]["lastmod"]) for _, _, rel, entry in sorted(newest, reverse=True)]
+    outputs.write_output(SITEMAP_PATH, render_sitemap(pages))
+    outputs.write_output(ATOM_PATH, render_atom(feed_posts))
+    outputs.write_output(JSON_FEED_PATH, render_json_feed(feed_posts))
+    outputs.write_output(LASTMOD_PATH, json.dumps({"pages": pages}, indent=2) + "\n", quiet=True)
@@ -0,0 +1,97 @@
+(() => {
+  const placeholders = Array.from(document.querySelectorAll("section[data-fragment]"));
+  if (!placeholders.length) {
+    return;
+  }
+  const loads = new Map();
+
+  // Scripts parsed out of another document never run; swap in fresh copies so they do.
+  const activateScripts = (container) => {
+    container.querySelectorAll("script").forEach((inert) => {
+      const script = document.createElement("script");
+      Array.from(inert.attributes).forEach((attr) => script.setAttribute(attr.name, attr.value));
+      script.textContent = inert.textContent;
+      inert.replaceWith(script);
+    });
+  };
+
+  // Match theme.js before the embeds are attached, so each iframe loads once.
+  const applyTheme = (container) => {
+    const dark = document.body.classList.contains("dark");
+    container.querySelectorAll("[data-src-light][data-src-dark]").forEach((embed) => {
+      embed.setAttribute("src", dark ? embed.dataset.srcDark : embed.dataset.srcLight);
+    });
+  };
+
+  const load = (placeholder) => {
+    if (!loads.has(placeholder)) {
+      const url = placeholder.dataset.fragment;
+      const loading = fetch(url)
+        .then((response) => {
+          if (!response.ok) {
+            throw new Error(`${url}: ${response.status}`);
+          }
+          return response.text();
+        })
+        .then((text) => {
+          const doc = new DOMParser().parseFromString(text, "text/html");
+          const section = doc.getElementById(placeholder.id);
+          if (!section) {
+            throw new Error(`${url}: no #${placeholder.id}`);
+          }
+          applyTheme(section);
+          // Fill the placeholder in place: status.js keeps references to the section elements.
+          placeholder.className = section.className;
+          placeholder.removeAttribute("data-fragment");
+          placeholder.replaceChildren(...Array.from(section.childNodes));
+          activateScripts(placeholder);
+        })
+        .catch(() => {
+          // Leave the fallback link; try again next time.
+          loads.delete(placeholder);
+        });
+      loads.set(placeholder, loading);
+    }
+    return loads.get(placeholder);
+  };
+
+  // Load everything above a jump target too, so the page doesn't shift after scrolling to it.
+  const loadThrough = (target) => Promise.all(placeholders.slice(0, placeholders.indexOf(target) + 1).map(load));
+
+  const placeholderFor = (hash) => placeholders.find((placeholder) => `#${placeholder.id}` === hash);
+
+  document.addEventListener("click", (event) => {
+    const link = event.target.closest("a[href^=\"#\"]");
+    const target = link && placeholderFor(link.getAttribute("href"));
+    if (!target || !target.hasAttribute("data-fragment")) {
+      return;
+    }
+    event.preventDefault();
+    loadThrough(target).then(() => {
+      history.pushState(null, "", `#${target.id}`);
+      target.scrollIntoView();
+    });
+  });
+
+  const initial = placeholderFor(window.location.hash);
+  if (initial) {
+    loadThrough(initial).then(() => initial.scrollIntoView());
+  }
+
+  if (!("IntersectionObserver" in window)) {
+    placeholders.forEach(load);
+    return;
+  }
+  const observer = new IntersectionObserver(
+    (entries) => {
+      entries.forEach((entry) => {
+        if (entry.isIntersecting) {
+          observer.unobserve(entry.target);
+          load(entry.target);
+        }
+      });
+    },
+    { rootMargin: "600px 0px" }
+  );
+  placeholders.forEach((placeholder) => observer.observe(placeholder));
+})();
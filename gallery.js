@@ -1,4 +1,37 @@
 (() => {
+  // Full-size images fetched and decoded ahead of a click, oldest first. Kept small so a
+  // large gallery doesn't hold every decoded image in memory.
+  const MAX_DECODED = 6;
+  const decoded = new Map();
+
+  const whenIdle = window.requestIdleCallback || ((callback) => setTimeout(callback, 200));
+
+  // With a srcset, the browser picks the same candidate it will for the main image.
+  const prefetch = (url, srcset, sizes) => {
+    if (!url) {
+      return;
+    }
+    if (decoded.has(url)) {
+      // Most recently wanted goes to the back of the eviction queue.
+      const img = decoded.get(url);
+      decoded.delete(url);
+      decoded.set(url, img);
+      return;
+    }
+    const img = new Image();
+    img.decoding = "async";
+    if (srcset) {
+      img.sizes = sizes || "";
+      img.srcset = srcset;
+    }
+    img.src = url;
+    img.decode().catch(() => decoded.delete(url));
+    decoded.set(url, img);
+    while (decoded.size > MAX_DECODED) {
+      decoded.delete(decoded.keys().next().value);
+    }
+  };
+
   const galleries = document.querySelectorAll("[data-gallery]");
   galleries.forEach((gallery) => {
     const mainImg = gallery.querySelector(".gallery-main img");
@@ -8,22 +41,55 @@
       return;
     }
 
+    const prefetchButton = (button) =>
+      prefetch(button.dataset.full, button.dataset.srcset, mainImg.getAttribute("sizes"));
+
+    // The neighbours are the likeliest next clicks.
+    const prefetchAround = (button) => {
+      const index = buttons.indexOf(button);
+      whenIdle(() => {
+        [index + 1, index - 1].forEach((near) => {
+          if (buttons[near]) {
+            prefetchButton(buttons[near]);
+          }
+        });
+      });
+    };
+
     const setActive = (button) => {
       buttons.forEach((btn) => btn.classList.toggle("active", btn === button));
       const full = button.dataset.full;
       const alt = button.dataset.alt || "";
       const cap = button.dataset.caption || "";
-      if (full) {
+      if (full && mainImg.getAttribute("src") !== full) {
+        // srcset takes precedence over src, so it has to switch too.
+        if (button.dataset.srcset) {
+          mainImg.srcset = button.dataset.srcset;
+        } else {
+          mainImg.removeAttribute("srcset");
+        }
         mainImg.src = full;
+        // The build sized the main image and gave it a placeholder for the first image only.
+        mainImg.style.background = "";
+        if (button.dataset.width && button.dataset.height) {
+          mainImg.width = Number(button.dataset.width);
+          mainImg.height = Number(button.dataset.height);
+        } else {
+          mainImg.removeAttribute("width");
+          mainImg.removeAttribute("height");
+        }
       }
       mainImg.alt = alt;
       if (caption) {
         caption.textContent = cap;
       }
+      prefetchAround(button);
     };
 
     buttons.forEach((button) => {
       button.addEventListener("click", () => setActive(button));
+      button.addEventListener("pointerenter", () => prefetchButton(button));
+      button.addEventListener("focus", () => prefetchButton(button));
     });
 
     setActive(buttons[0]);
@@ -0,0 +1,241 @@
+"""Small keep-alive HTTP client shared by the Instagram tools.
+
+Standard library only. Connections are pooled per origin and reused across requests
+and threads, redirects are followed, and transient failures (network errors, 429 and
+5xx responses) are retried with exponential backoff.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+import http.client
+import json
+import os
+from pathlib import Path
+import random
+import threading
+import time
+from typing import Any, Callable, TypeVar
+import urllib.parse
+
+T = TypeVar("T")
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+CHUNK_SIZE = 64 * 1024
+
+Origin = tuple[str, str, int]
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, url: str, body: bytes = b"") -> None:
+        super().__init__(f"HTTP {status} for {url}")
+        self.status = status
+        self.url = url
+        self.body = body
+
+
+class _RetryableStatus(Exception):
+    def __init__(self, response: Response) -> None:
+        super().__init__(f"HTTP {response.status}")
+        self.response = response
+
+
+@dataclass
+class Response:
+    status: int
+    headers: dict[str, str]
+    body: bytes
+    url: str
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+def with_query(url: str, params: dict[str, str] | None) -> str:
+    if not params:
+        return url
+    sep = "&" if urllib.parse.urlsplit(url).query else "?"
+    return f"{url}{sep}{urllib.parse.urlencode(params)}"
+
+
+class Pool:
+    def __init__(
+        self,
+        *,
+        timeout: float = 30.0,
+        retries: int = 3,
+        backoff: float = 0.5,
+        max_redirects: int = 5,
+        user_agent: str = "zachisntdead-site/1",
+    ) -> None:
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_redirects = max_redirects
+        self.user_agent = user_agent
+        self._idle: dict[Origin, list[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> Pool:
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+    def _acquire(self, origin: Origin) -> http.client.HTTPConnection:
+        with self._lock:
+            conns = self._idle.get(origin)
+            if conns:
+                return conns.pop()
+        scheme, host, port = origin
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def _release(self, origin: Origin, conn: http.client.HTTPConnection, response: http.client.HTTPResponse) -> None:
+        # Only a fully read response on a connection the server keeps open can be reused.
+        if response.isclosed() and not response.will_close:
+            with self._lock:
+                self._idle.setdefault(origin, []).append(conn)
+        else:
+            conn.close()
+
+    def _send(
+        self, method: str, url: str, headers: dict[str, str] | None, body: bytes | None
+    ) -> tuple[Origin, http.client.HTTPConnection, http.client.HTTPResponse, str]:
+        """Send a request, following redirects; the caller must read and release the response."""
+        for _ in range(self.max_redirects + 1):
+            parts = urllib.parse.urlsplit(url)
+            if parts.scheme not in {"http", "https"}:
+                raise ValueError(f"Unsupported URL: {url}")
+            origin = (parts.scheme, parts.hostname or "", parts.port or (443 if parts.scheme == "https" else 80))
+            target = parts.path or "/"
+            if parts.query:
+                target += f"?{parts.query}"
+
+            conn = self._acquire(origin)
+            try:
+                conn.request(method, target, body=body, headers={"User-Agent": self.user_agent, **(headers or {})})
+                response = conn.getresponse()
+            except BaseException:
+                conn.close()
+                raise
+
+            location = response.getheader("Location")
+            if response.status not in REDIRECT_STATUSES or not location:
+                return origin, conn, response, url
+            self._read_all(origin, conn, response)
+            url = urllib.parse.urljoin(url, location)
+            if response.status == 303:
+                method, body = "GET", None
+        # Too many redirects: report the last redirect status.
+        raise HTTPError(response.status, url)
+
+    def _read_all(self, origin: Origin, conn: http.client.HTTPConnection, response: http.client.HTTPResponse) -> bytes:
+        try:
+            data = response.read()
+        except BaseException:
+            conn.close()
+            raise
+        self._release(origin, conn, response)
+        return data
+
+    def _with_retries(self, attempt: Callable[[], T]) -> T:
+        for tries in range(self.retries + 1):
+            try:
+                return attempt()
+            except (OSError, http.client.HTTPException, _RetryableStatus) as exc:
+                if tries == self.retries:
+                    if isinstance(exc, _RetryableStatus):
+                        raise HTTPError(exc.response.status, exc.response.url, exc.response.body)
+                    raise
+            # Exponential backoff with jitter so parallel workers don't retry in lockstep.
+            time.sleep(self.backoff * (2**tries) * (1 + random.random() / 2))
+        raise AssertionError("unreachable")
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        params: dict[str, str] | None = None,
+        headers: dict[str, str] | None = None,
+        body: bytes | None = None,
+    ) -> Response:
+        """Buffered request. Non-retryable error statuses are returned, not raised."""
+        url = with_query(url, params)
+
+        def attempt() -> Response:
+            origin, conn, raw, final_url = self._send(method, url, headers, body)
+            data = self._read_all(origin, conn, raw)
+            response = Response(raw.status, {k.lower(): v for k, v in raw.getheaders()}, data, final_url)
+            if response.status in RETRY_STATUSES:
+                raise _RetryableStatus(response)
+            return response
+
+        return self._with_retries(attempt)
+
+    def get_json(self, url: str, params: dict[str, str] | None = None) -> Any:
+        return self.request("GET", url, params=params).json()
+
+    def download(self, url: str, dest: Path) -> int:
+        """Stream `url` to `dest` via a temp file and atomic rename; return the byte count."""
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.part")
+
+        def attempt() -> int:
+            origin, conn, raw, final_url = self._send("GET", url, None, None)
+            if raw.status != 200:
+                data = self._read_all(origin, conn, raw)
+                if raw.status in RETRY_STATUSES:
+                    raise _RetryableStatus(Response(raw.status, {}, data, final_url))
+                raise HTTPError(raw.status, final_url, data)
+            try:
+                size = 0
+                with tmp.open("wb") as fh:
+                    while chunk := raw.read(CHUNK_SIZE):
+                        fh.write(chunk)
+                        size += len(chunk)
+                # read(amt) returns b"" when the server hangs up early instead of raising.
+                if raw.length:
+                    raise http.client.IncompleteRead(b"", raw.length)
+            except BaseException:
+                conn.close()
+                tmp.unlink(missing_ok=True)
+                raise
+            self._release(origin, conn, raw)
+            tmp.replace(dest)
+            return size
+
+        return self._with_retries(attempt)
+
+
+class RateLimiter:
+    """Token bucket shared across threads: on average at most `rate` calls per second."""
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
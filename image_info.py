@@ -0,0 +1,208 @@
+"""Intrinsic size and a tiny blurred placeholder for the images posts link to.
+
+Sizes come from the file header (PNG, GIF, JPEG, WebP), parsed with the standard
+library, so nothing is decoded just to measure it. Placeholders need Pillow: the image
+is shrunk to PLACEHOLDER_WIDTH px and inlined as a data: URI, which the browser scales
+up (and so blurs) until the real image arrives. Without Pillow, or for images with
+transparency (the placeholder would show through), there is no placeholder.
+
+Results are cached in .image-cache.json by content hash, and each file's hash is
+cached against its size and mtime, so an unchanged image costs one stat().
+"""
+
+from __future__ import annotations
+
+import base64
+from dataclasses import dataclass
+import hashlib
+import io
+import json
+from pathlib import Path
+import struct
+from typing import Any
+
+import outputs
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+
+ROOT = Path(__file__).resolve().parent
+CACHE_PATH = ROOT / ".image-cache.json"
+# Bump when placeholder settings change.
+CACHE_VERSION = "1"
+PLACEHOLDER_WIDTH = 16
+# Part of build_markdown's template hashes: gaining or losing Pillow changes every post.
+PLACEHOLDERS = Image is not None
+IMAGE_SUFFIXES = {".png", ".gif", ".jpg", ".jpeg", ".webp"}
+# optimize_images.py writes a `-<width>w` variant for each width narrower than the image;
+# build_markdown lists the ones that exist in srcset.
+SRCSET_WIDTHS = (480, 960)
+
+
+@dataclass(frozen=True)
+class ImageInfo:
+    width: int
+    height: int
+    # data: URI, or "" when there is none.
+    placeholder: str
+
+
+_cache: dict[str, dict[str, Any]] | None = None
+# Entries added by this process; pool workers hand them back to the parent (take_new).
+_new: dict[str, dict[str, Any]] = {"files": {}, "images": {}}
+
+
+def thumb_for(path: str) -> str:
+    """`path` of the gallery thumbnail variant: photo.png -> photo-thumb.png; URLs are left alone."""
+    if path.startswith("http://") or path.startswith("https://"):
+        return path
+    if path.endswith("-thumb.png") or path.endswith("-thumb.jpg") or path.endswith("-thumb.jpeg"):
+        return path
+    if "." not in path:
+        return path
+    base, ext = path.rsplit(".", 1)
+    return f"{base}-thumb.{ext}"
+
+
+def width_variant(name: str, width: int) -> str:
+    """`name` (a path or URL) of the `width` px variant: photo.png -> photo-480w.png."""
+    base, ext = name.rsplit(".", 1)
+    return f"{base}-{width}w.{ext}"
+
+
+def header_size(data: bytes) -> tuple[int, int] | None:
+    """(width, height) from a PNG, GIF, JPEG or WebP header, or None if unrecognised."""
+    if data.startswith(b"\x89PNG\r\n\x1a\n") and data[12:16] == b"IHDR":
+        return struct.unpack(">II", data[16:24])
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return struct.unpack("<HH", data[6:10])
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        chunk = data[12:16]
+        if chunk == b"VP8 ":
+            width, height = struct.unpack("<HH", data[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+        if chunk == b"VP8L":
+            bits = int.from_bytes(data[21:25], "little")
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b"VP8X":
+            return int.from_bytes(data[24:27], "little") + 1, int.from_bytes(data[27:30], "little") + 1
+        return None
+    if data[:2] == b"\xff\xd8":
+        pos = 2
+        while pos + 9 < len(data):
+            if data[pos] != 0xFF:
+                pos += 1
+                continue
+            marker = data[pos + 1]
+            # Fill bytes and markers without a length field.
+            if marker == 0xFF or marker == 0x01 or 0xD0 <= marker <= 0xD8:
+                pos += 1 if marker == 0xFF else 2
+                continue
+            # Start-of-frame markers, except DHT (C4), JPG (C8) and DAC (CC).
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack(">HH", data[pos + 5 : pos + 9])
+                return width, height
+            pos += 2 + struct.unpack(">H", data[pos + 2 : pos + 4])[0]
+    return None
+
+
+def make_placeholder(data: bytes) -> str:
+    if Image is None:
+        return ""
+    with Image.open(io.BytesIO(data)) as image:
+        if image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info:
+            if image.convert("RGBA").getchannel("A").getextrema()[0] < 255:
+                return ""
+        small = image.convert("RGB")
+        small.thumbnail((PLACEHOLDER_WIDTH, PLACEHOLDER_WIDTH * 4))
+    out = io.BytesIO()
+    if features.check("webp"):
+        small.save(out, "WEBP", quality=40)
+        mime = "image/webp"
+    else:
+        small.save(out, "PNG", optimize=True)
+        mime = "image/png"
+    return f"data:{mime};base64,{base64.b64encode(out.getvalue()).decode()}"
+
+
+def load_cache() -> dict[str, dict[str, Any]]:
+    global _cache
+    if _cache is None:
+        _cache = {"files": {}, "images": {}}
+        if CACHE_PATH.exists():
+            try:
+                data = json.loads(CACHE_PATH.read_text())
+            except json.JSONDecodeError:
+                data = {}
+            if data.get("version") == CACHE_VERSION and data.get("placeholders") == PLACEHOLDERS:
+                _cache = {"files": data.get("files", {}), "images": data.get("images", {})}
+    return _cache
+
+
+def save_cache() -> None:
+    cache = load_cache()
+    data = {"version": CACHE_VERSION, "placeholders": PLACEHOLDERS, **cache}
+    outputs.write_output(CACHE_PATH, json.dumps(data, indent=2, sort_keys=True) + "\n", quiet=True)
+
+
+def _remember(kind: str, key: str, value: dict[str, Any]) -> None:
+    load_cache()[kind][key] = value
+    _new[kind][key] = value
+
+
+def take_new() -> dict[str, dict[str, Any]]:
+    """Cache entries added since the last call; see merge()."""
+    global _new
+    taken, _new = _new, {"files": {}, "images": {}}
+    return taken
+
+
+def merge(entries: dict[str, dict[str, Any]]) -> None:
+    cache = load_cache()
+    for kind, values in entries.items():
+        cache[kind].update(values)
+
+
+def rel_key(path: Path) -> str:
+    return path.relative_to(ROOT).as_posix() if path.is_relative_to(ROOT) else str(path)
+
+
+def file_hash(path: Path) -> tuple[str | None, bytes | None]:
+    """Content hash of `path` (None if it's missing), plus its bytes if they had to be read."""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None, None
+    key = rel_key(path)
+    known = load_cache()["files"].get(key)
+    if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+        return known["hash"], None
+    data = path.read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    _remember("files", key, {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": digest})
+    return digest, data
+
+
+def lookup(path: Path) -> ImageInfo | None:
+    """Size and placeholder of the image at `path`, or None if it's missing or unreadable."""
+    if path.suffix.lower() not in IMAGE_SUFFIXES:
+        return None
+    digest, data = file_hash(path)
+    if digest is None:
+        return None
+    known = load_cache()["images"].get(digest)
+    if known is None:
+        data = data if data is not None else path.read_bytes()
+        size = header_size(data)
+        if size is None:
+            known = {}
+        else:
+            try:
+                placeholder = make_placeholder(data)
+            except Exception:
+                placeholder = ""
+            known = {"width": size[0], "height": size[1], "placeholder": placeholder}
+        _remember("images", digest, known)
+    return ImageInfo(known["width"], known["height"], known["placeholder"]) if known else None
@@ -0,0 +1,137 @@
+"""Indexed local store for Instagram media metadata.
+
+Backs instagram_sync.py with SQLite (instagram/media.sqlite3) so commands look up
+only the rows they need by id, timestamp or media_type instead of parsing the whole
+history. Each row keeps the Graph API item verbatim as JSON; `export_json` writes the
+legacy instagram/cache.json shape.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+import sqlite3
+from typing import Any, Iterable, Iterator
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    id TEXT PRIMARY KEY,
+    timestamp TEXT NOT NULL DEFAULT '',
+    media_type TEXT NOT NULL DEFAULT '',
+    item TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS media_timestamp ON media (timestamp DESC);
+CREATE INDEX IF NOT EXISTS media_type_timestamp ON media (media_type, timestamp DESC);
+"""
+
+# SQLite caps bound parameters per statement; stay well under the limit.
+MAX_PARAMS = 500
+
+
+class MediaStore:
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def __enter__(self) -> MediaStore:
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM media").fetchone()[0]
+
+    def get(self, media_id: str) -> dict[str, Any] | None:
+        row = self.db.execute("SELECT item FROM media WHERE id = ?", (media_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, ids: Iterable[str]) -> dict[str, dict[str, Any]]:
+        found: dict[str, dict[str, Any]] = {}
+        for chunk in _chunks(list(ids)):
+            marks = ",".join("?" * len(chunk))
+            for media_id, item in self.db.execute(f"SELECT id, item FROM media WHERE id IN ({marks})", chunk):
+                found[media_id] = json.loads(item)
+        return found
+
+    def known_ids(self, ids: Iterable[str]) -> set[str]:
+        known: set[str] = set()
+        for chunk in _chunks(list(ids)):
+            marks = ",".join("?" * len(chunk))
+            known.update(row[0] for row in self.db.execute(f"SELECT id FROM media WHERE id IN ({marks})", chunk))
+        return known
+
+    def recent(
+        self,
+        limit: int | None = None,
+        *,
+        media_type: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """Yield items newest first, optionally filtered by type and ISO timestamp range."""
+        clauses, params = [], []
+        if media_type:
+            clauses.append("media_type = ?")
+            params.append(media_type)
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        sql = "SELECT item FROM media"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY timestamp DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        for (item,) in self.db.execute(sql, params):
+            yield json.loads(item)
+
+    def upsert_many(self, items: Iterable[dict[str, Any]]) -> tuple[int, int]:
+        """Insert or replace items; return (added, updated) counts."""
+        rows = {
+            str(item.get("id")): (
+                str(item.get("id")),
+                str(item.get("timestamp") or ""),
+                str(item.get("media_type") or ""),
+                json.dumps(item, ensure_ascii=False, sort_keys=True),
+            )
+            for item in items
+        }
+        existing: dict[str, str] = {}
+        for chunk in _chunks(list(rows)):
+            marks = ",".join("?" * len(chunk))
+            existing.update(self.db.execute(f"SELECT id, item FROM media WHERE id IN ({marks})", chunk).fetchall())
+
+        added = sum(1 for media_id in rows if media_id not in existing)
+        changed = [row for media_id, row in rows.items() if existing.get(media_id) != row[3]]
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO media (id, timestamp, media_type, item) VALUES (?, ?, ?, ?)", changed
+            )
+        return added, len(changed) - added
+
+    def import_json(self, path: Path) -> int:
+        cache = json.loads(path.read_text())
+        items = cache.get("data", []) or []
+        self.upsert_many(items)
+        return len(items)
+
+    def export_json(self, path: Path) -> int:
+        items = list(self.recent())
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"data": items}, indent=2, ensure_ascii=False) + "\n")
+        return len(items)
+
+
+def _chunks(values: list[str]) -> Iterator[list[str]]:
+    for start in range(0, len(values), MAX_PARAMS):
+        yield values[start : start + MAX_PARAMS]
@@ -4,7 +4,7 @@
 This is intentionally a small, repo-local tool.
 
 Phase 1 goals:
-- Sync recent IG media metadata into instagram/cache.json
+- Sync IG media metadata into instagram/media.sqlite3 (incremental; `sync --full` backfills)
 - Maintain a repo-tracked curation file instagram/curation.yaml
 - For approved posts:
   - download images locally (assets/instagram/...)
@@ -23,34 +23,49 @@ Auth model:
 from __future__ import annotations
 
 import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import datetime as dt
+import hashlib
 import json
 import os
 import re
 import subprocess
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
 import yaml
 
+import build_markdown
+import feeds
+import http_pool
+from instagram_store import MediaStore
+import profiling
+
 ROOT = Path(__file__).resolve().parent
 INSTAGRAM_DIR = ROOT / "instagram"
 CACHE_PATH = INSTAGRAM_DIR / "cache.json"
+STORE_PATH = INSTAGRAM_DIR / "media.sqlite3"
 CURATION_PATH = INSTAGRAM_DIR / "curation.yaml"
 ASSETS_DIR = ROOT / "assets" / "instagram"
 MARKDOWN_DIR = ROOT / "markdown"
+DOWNLOADS_PATH = INSTAGRAM_DIR / "downloads.json"
 
-GRAPH_BASE = "https://graph.facebook.com/v19.0"
+DOWNLOAD_WORKERS = 8
+# Overridable so sync can be pointed at a local fake Graph server.
+GRAPH_BASE = os.environ.get("IG_GRAPH_BASE", "https://graph.facebook.com/v19.0").rstrip("/")
+MEDIA_FIELDS = "id,caption,media_type,media_url,permalink,timestamp,thumbnail_url,children{media_type,media_url,thumbnail_url}"
+PAGE_LIMIT = 50
 
 
 def sh(*args: str, check: bool = True, capture: bool = False) -> subprocess.CompletedProcess[str]:
-    return subprocess.run(
-        list(args),
-        check=check,
-        text=True,
-        capture_output=capture,
-    )
+    with profiling.span("subprocess", "subprocess", cmd=" ".join(args[:2])):
+        return subprocess.run(
+            list(args),
+            check=check,
+            text=True,
+            capture_output=capture,
+        )
 
 
 def require_env(name: str) -> str:
@@ -77,19 +92,84 @@ def save_yaml(path: Path, data: dict[str, Any]) -> None:
     path.write_text(yaml.safe_dump(data, sort_keys=False, allow_unicode=True))
 
 
-def graph_get(endpoint: str, params: dict[str, str]) -> dict[str, Any]:
-    # Use curl to keep dependencies minimal and debugging easy.
-    import urllib.parse
-
-    qs = urllib.parse.urlencode(params)
-    url = f"{GRAPH_BASE}{endpoint}?{qs}"
-    out = sh("curl", "-sS", url, capture=True).stdout
-    data = json.loads(out)
+def graph_get(pool: http_pool.Pool, url: str, params: dict[str, str] | None = None) -> dict[str, Any]:
+    with profiling.span("graph request"):
+        data = pool.get_json(url, params)
     if isinstance(data, dict) and data.get("error"):
         raise SystemExit(f"Graph API error: {data['error']}")
     return data
 
 
+def iter_media_pages(
+    pool: http_pool.Pool,
+    ig_user_id: str,
+    token: str,
+    *,
+    since: int | None = None,
+    until: int | None = None,
+    limiter: http_pool.RateLimiter | None = None,
+) -> Iterator[list[dict[str, Any]]]:
+    """Yield pages of /{ig_user_id}/media, newest first, following the paging cursors."""
+    url: str | None = f"{GRAPH_BASE}/{ig_user_id}/media"
+    params: dict[str, str] | None = {"access_token": token, "fields": MEDIA_FIELDS, "limit": str(PAGE_LIMIT)}
+    if since is not None:
+        params["since"] = str(since)
+    if until is not None:
+        params["until"] = str(until)
+    while url:
+        if limiter:
+            limiter.wait()
+        page = graph_get(pool, url, params)
+        yield page.get("data") or []
+        # The `next` URL already carries every query parameter, including the cursor.
+        url = (page.get("paging") or {}).get("next")
+        params = None
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        while chunk := fh.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def download_media(jobs: list[tuple[str, Path]], workers: int = DOWNLOAD_WORKERS) -> None:
+    """Fetch (url, dest) pairs over pooled connections, skipping files already downloaded intact.
+
+    instagram/downloads.json records the size and hash of every file we fetched; CDN URLs
+    expire, so the destination path (media id + index) is the identity, not the URL.
+    """
+    records: dict[str, dict[str, Any]] = json.loads(DOWNLOADS_PATH.read_text()) if DOWNLOADS_PATH.exists() else {}
+    pending: list[tuple[str, Path, str]] = []
+    for url, dest in jobs:
+        key = dest.relative_to(ROOT).as_posix()
+        record = records.get(key)
+        if record and dest.exists() and dest.stat().st_size == record["bytes"] and file_sha256(dest) == record["sha256"]:
+            continue
+        pending.append((url, dest, key))
+    if not pending:
+        return
+
+    def fetch(pool: http_pool.Pool, url: str, dest: Path, key: str) -> int:
+        with profiling.span("download", "file", file=key):
+            size = pool.download(url, dest)
+            profiling.count(written=size)
+            return size
+
+    try:
+        with http_pool.Pool() as pool, ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(fetch, pool, url, dest, key): (dest, key) for url, dest, key in pending}
+            for future in as_completed(futures):
+                dest, key = futures[future]
+                size = future.result()
+                records[key] = {"bytes": size, "sha256": file_sha256(dest)}
+                print(f"Downloaded {key} ({size:,} bytes)")
+    finally:
+        INSTAGRAM_DIR.mkdir(parents=True, exist_ok=True)
+        DOWNLOADS_PATH.write_text(json.dumps(dict(sorted(records.items())), indent=2) + "\n")
+
+
 @dataclass
 class CuratedPost:
     id: str
@@ -138,27 +218,86 @@ def write_curation(posts: list[CuratedPost]) -> None:
     )
 
 
-def cmd_sync(_: argparse.Namespace) -> None:
+def open_store() -> MediaStore:
+    """Open the media store, importing a legacy instagram/cache.json the first time."""
+    store = MediaStore(STORE_PATH)
+    if not len(store) and CACHE_PATH.exists():
+        count = store.import_json(CACHE_PATH)
+        print(f"Imported {count} items from {CACHE_PATH}")
+    return store
+
+
+def require_store() -> MediaStore:
+    if not STORE_PATH.exists() and not CACHE_PATH.exists():
+        raise SystemExit("Missing instagram/media.sqlite3. Run: python instagram_sync.py sync")
+    return open_store()
+
+
+def fetch_recent(pool: http_pool.Pool, ig_user_id: str, token: str, store: MediaStore) -> list[dict[str, Any]]:
+    """Page back from the newest media until a page reaches something already stored."""
+    fetched: list[dict[str, Any]] = []
+    for page in iter_media_pages(pool, ig_user_id, token):
+        fetched.extend(page)
+        if store.known_ids(str(item.get("id")) for item in page):
+            break
+    return fetched
+
+
+def fetch_all(
+    pool: http_pool.Pool, ig_user_id: str, token: str, *, since_year: int, workers: int, rate: float
+) -> list[dict[str, Any]]:
+    """Backfill the whole account history.
+
+    Cursor paging is sequential, so the history is split into one time window per year
+    and the windows are paged concurrently, sharing one rate limit.
+    """
+    limiter = http_pool.RateLimiter(rate)
+    this_year = dt.date.today().year
+    windows = []
+    for year in range(since_year, this_year + 1):
+        start = dt.datetime(year, 1, 1, tzinfo=dt.timezone.utc)
+        end = dt.datetime(year + 1, 1, 1, tzinfo=dt.timezone.utc)
+        windows.append((int(start.timestamp()), int(end.timestamp())))
+
+    def fetch_window(window: tuple[int, int]) -> list[dict[str, Any]]:
+        since, until = window
+        items: list[dict[str, Any]] = []
+        for page in iter_media_pages(pool, ig_user_id, token, since=since, until=until, limiter=limiter):
+            items.extend(page)
+        return items
+
+    fetched: list[dict[str, Any]] = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for items in executor.map(fetch_window, windows):
+            fetched.extend(items)
+    return fetched
+
+
+def cmd_sync(args: argparse.Namespace) -> None:
     token = require_env("IG_GRAPH_ACCESS_TOKEN")
     ig_user_id = require_env("IG_GRAPH_IG_USER_ID")
 
-    fields = "id,caption,media_type,media_url,permalink,timestamp,thumbnail_url,children{media_type,media_url,thumbnail_url}"
-    data: dict[str, Any] = graph_get(
-        f"/{ig_user_id}/media",
-        {"access_token": token, "fields": fields, "limit": "50"},
-    )
+    with open_store() as store, http_pool.Pool() as pool:
+        if args.full:
+            fetched = fetch_all(
+                pool, ig_user_id, token, since_year=args.since_year, workers=args.workers, rate=args.rate
+            )
+        else:
+            fetched = fetch_recent(pool, ig_user_id, token, store)
 
-    INSTAGRAM_DIR.mkdir(parents=True, exist_ok=True)
-    CACHE_PATH.write_text(json.dumps(data, indent=2, ensure_ascii=False) + "\n")
-    print(f"Wrote {CACHE_PATH}")
+        added, updated = store.upsert_many(fetched)
+        print(f"Updated {STORE_PATH} ({added} new, {updated} updated, {len(store)} total)")
 
 
-def cmd_curate(args: argparse.Namespace) -> None:
-    if not CACHE_PATH.exists():
-        raise SystemExit("Missing instagram/cache.json. Run: python instagram_sync.py sync")
+def cmd_export(args: argparse.Namespace) -> None:
+    with require_store() as store:
+        count = store.export_json(args.output)
+    print(f"Wrote {args.output} ({count} items)")
+
 
-    cache = json.loads(CACHE_PATH.read_text())
-    items: list[dict[str, Any]] = cache.get("data", []) or []
+def cmd_curate(args: argparse.Namespace) -> None:
+    with require_store() as store:
+        items = list(store.recent(args.limit))
 
     existing = {p.id: p for p in load_curation()}
 
@@ -216,6 +355,10 @@ def cmd_curate(args: argparse.Namespace) -> None:
         )
         print("")
 
+    # Keep decisions for older posts that weren't shown this time.
+    shown = {p.id for p in curated} | {str(item.get("id", "")) for item in items}
+    curated.extend(p for media_id, p in existing.items() if media_id not in shown)
+
     write_curation(curated)
     print(f"Updated {CURATION_PATH}")
 
@@ -241,24 +384,23 @@ def markdown_front_matter(*, title: str, date: str, section: str, summary: str)
     )
 
 
-def cmd_build(_: argparse.Namespace) -> None:
-    if not CACHE_PATH.exists():
-        raise SystemExit("Missing instagram/cache.json. Run: python instagram_sync.py sync")
-
-    cache = json.loads(CACHE_PATH.read_text())
-    by_id = {str(item.get("id")): item for item in (cache.get("data", []) or [])}
-
+def cmd_build(args: argparse.Namespace) -> None:
     curated = [p for p in load_curation() if p.publish]
     if not curated:
         print("No curated posts marked publish:true")
         return
 
+    with require_store() as store:
+        by_id = store.get_many(p.id for p in curated)
+
     ASSETS_DIR.mkdir(parents=True, exist_ok=True)
     MARKDOWN_DIR.mkdir(parents=True, exist_ok=True)
 
     today = dt.date.today().isoformat()
 
-    written = 0
+    downloads: list[tuple[str, Path]] = []
+    stubs: list[tuple[Path, str]] = []
+    unchanged = 0
     for p in curated:
         item = by_id.get(p.id)
         if not item:
@@ -276,6 +418,7 @@ def cmd_build(_: argparse.Namespace) -> None:
         md_path = MARKDOWN_DIR / f"ig-{slug}.md"
 
         body_lines: list[str] = []
+        post_downloads: list[tuple[str, Path]] = []
         body_lines.append(f"# {title}")
         body_lines.append("")
 
@@ -298,7 +441,7 @@ def cmd_build(_: argparse.Namespace) -> None:
                     if not url:
                         continue
                     out = ASSETS_DIR / f"{p.id}-{idx}.jpg"
-                    sh("curl", "-L", "-sS", "-o", str(out), str(url))
+                    post_downloads.append((str(url), out))
                     body_lines.append(f"![]({out.relative_to(ROOT).as_posix()})")
                 body_lines.append("")
             elif media_type == "VIDEO":
@@ -309,38 +452,80 @@ def cmd_build(_: argparse.Namespace) -> None:
                 url = item.get("media_url")
                 if url:
                     out = ASSETS_DIR / f"{p.id}.jpg"
-                    sh("curl", "-L", "-sS", "-o", str(out), str(url))
+                    post_downloads.append((str(url), out))
                     body_lines.append(f"![]({out.relative_to(ROOT).as_posix()})")
                     body_lines.append("")
 
-        fm = markdown_front_matter(title=title, date=today, section=p.section, summary=summary)
-        md_path.write_text(fm + "\n".join(body_lines) + "\n")
-        print(f"Wrote {md_path}")
-        written += 1
+        # Keep the date of the first import so rerunning doesn't touch existing stubs.
+        existing = md_path.read_text() if md_path.exists() else None
+        date = build_markdown.split_source(existing, md_path)[0].date if existing else today
+        fm = markdown_front_matter(title=title, date=date, section=p.section, summary=summary)
+        text = fm + "\n".join(body_lines) + "\n"
+        if text == existing and all(dest.exists() for _, dest in post_downloads):
+            unchanged += 1
+            continue
+        downloads.extend(post_downloads)
+        stubs.append((md_path, text))
 
-    if written:
-        sh("python", "build_markdown.py")
-        sh("git", "add", "markdown", "posts", "assets/instagram")
+    # Fetch all media before writing stubs so a failed download doesn't leave dangling images.
+    download_media(downloads, workers=args.workers)
+    for md_path, text in stubs:
+        md_path.write_text(text)
+        print(f"Wrote {md_path}")
+    if unchanged:
+        print(f"Skipped {unchanged} unchanged post(s)")
+
+    if stubs:
+        # Render just the new/changed posts and the section lists they appear in.
+        build_markdown.build_sources(md_path for md_path, _ in stubs)
+        paths = [ROOT / "markdown", ROOT / "posts", ROOT / "sections", ASSETS_DIR, DOWNLOADS_PATH]
+        # build_sources() also refreshes the sitemap and feeds.
+        paths += [feeds.SITEMAP_PATH, feeds.ATOM_PATH, feeds.JSON_FEED_PATH, feeds.LASTMOD_PATH]
+        # Nothing is downloaded for embed/link-only imports, so some of these may not exist.
+        sh("git", "add", *(str(path) for path in paths if path.exists()))
         sh("git", "commit", "-m", f"Import curated Instagram posts ({today})", check=False)
 
 
-def main() -> None:
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser()
+    profiling.add_argument(parser)
     sub = parser.add_subparsers(dest="cmd", required=True)
 
-    p_sync = sub.add_parser("sync", help="Fetch recent IG media into instagram/cache.json")
+    p_sync = sub.add_parser("sync", help="Fetch new IG media and merge it into instagram/media.sqlite3")
+    p_sync.add_argument("--full", action="store_true", help="Backfill the whole account history")
+    p_sync.add_argument("--since-year", type=int, default=2010, help="First year to backfill with --full")
+    p_sync.add_argument("--workers", type=int, default=4, help="Concurrent windows with --full")
+    p_sync.add_argument("--rate", type=float, default=2.0, help="Max Graph requests per second with --full")
     p_sync.set_defaults(func=cmd_sync)
 
+    p_export = sub.add_parser("export", help="Write the media store as instagram/cache.json")
+    p_export.add_argument("--output", type=Path, default=CACHE_PATH)
+    p_export.set_defaults(func=cmd_export)
+
     p_curate = sub.add_parser("curate", help="Interactively update instagram/curation.yaml")
+    p_curate.add_argument("--limit", type=int, default=50, help="How many recent posts to review")
     p_curate.add_argument("--auto-commit", action="store_true", default=True)
     p_curate.add_argument("--non-interactive", action="store_true")
     p_curate.set_defaults(func=cmd_curate)
 
     p_build = sub.add_parser("build", help="Generate markdown + download media for curated posts")
+    p_build.add_argument("--workers", type=int, default=DOWNLOAD_WORKERS, help="Concurrent media downloads")
     p_build.set_defaults(func=cmd_build)
+    return parser
+
 
-    args = parser.parse_args()
-    args.func(args)
+def run(argv: list[str] | None = None) -> None:
+    """Run a sub-command in-process, e.g. run(["build"]); instagram_webhook.py uses this."""
+    args = build_parser().parse_args(argv)
+    if args.profile is not None:
+        profiling.enable()
+    with profiling.span(args.cmd):
+        args.func(args)
+    profiling.finish(args.profile)
+
+
+def main() -> None:
+    run()
 
 
 if __name__ == "__main__":
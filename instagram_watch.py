@@ -1,11 +1,13 @@
 #!/usr/bin/env python3
-"""Daily Instagram watcher.
+"""Instagram watcher.
 
-Reads the latest Instagram media item via Graph API and compares it against a
-local state file. If there's a new post, prints a small JSON payload to stdout.
+Reads the most recent Instagram media via Graph API and diffs them against the set of
+media IDs seen before (instagram/last_seen.json). Every new post is reported.
 
-Outputs (stdout):
-  {"new": true|false, "id": "...", "permalink": "...", "timestamp": "..."}
+Outputs (stdout), one JSON line per new post, oldest first:
+  {"new": true, "id": "...", "permalink": "...", "timestamp": "..."}
+or, when nothing is new, a single line for the latest post:
+  {"new": false, "id": "...", "permalink": "...", "timestamp": "..."}
 
 Exit codes:
   0 success (including no new post)
@@ -16,22 +18,39 @@ Auth:
   - IG Graph token from op://OpenClaw/instagram-api-key-zachisntdead/credential
   - IG business account id from op://OpenClaw/instagram-api-key-zachisntdead/username
 
-This script is designed to run under cron.
+Runs once per invocation (for cron), or with --daemon as a long-running poller that
+keeps credentials and the HTTP connection alive, polls faster right after a new post
+and backs off on errors. Daemon errors go to stderr as JSON lines.
 """
 
 from __future__ import annotations
 
+import argparse
 import datetime as dt
 import json
 import os
+import random
 import re
 import subprocess
+import sys
+import time
 from pathlib import Path
-from typing import Any
+from typing import Any, TextIO
+
+import http_pool
 
 ROOT = Path(__file__).resolve().parent
 STATE_PATH = ROOT / "instagram" / "last_seen.json"
-GRAPH_BASE = "https://graph.facebook.com/v19.0"
+GRAPH_BASE = os.environ.get("IG_GRAPH_BASE", "https://graph.facebook.com/v19.0").rstrip("/")
+
+WINDOW = 10
+MAX_SEEN_IDS = 500
+# Graph API error code for an expired or invalidated access token.
+AUTH_ERROR_CODE = 190
+
+
+class AuthError(RuntimeError):
+    pass
 
 
 def sh(*args: str, capture: bool = False, check: bool = True) -> subprocess.CompletedProcess[str]:
@@ -66,28 +85,35 @@ def get_token_and_ig_id() -> tuple[str, str]:
     return token, ig_id
 
 
-def graph_get_latest(token: str, ig_id: str) -> dict[str, Any]:
-    # Use curl with -G + --data-urlencode to avoid token escaping issues.
-    fields = "id,permalink,timestamp,media_type"
-    out = sh(
-        "curl",
-        "-sS",
-        "-G",
+class Credentials:
+    """Token + IG user id, read once and reused until they expire or are rejected."""
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._value: tuple[str, str] | None = None
+        self._loaded_at = 0.0
+
+    def get(self) -> tuple[str, str]:
+        if self._value is None or time.monotonic() - self._loaded_at > self.ttl:
+            self._value = get_token_and_ig_id()
+            self._loaded_at = time.monotonic()
+        return self._value
+
+    def invalidate(self) -> None:
+        self._value = None
+
+
+def graph_get_recent(pool: http_pool.Pool, token: str, ig_id: str, limit: int = WINDOW) -> list[dict[str, Any]]:
+    """Return the newest `limit` media items, newest first."""
+    data = pool.get_json(
         f"{GRAPH_BASE}/{ig_id}/media",
-        "--data-urlencode",
-        f"fields={fields}",
-        "--data-urlencode",
-        "limit=1",
-        "--data-urlencode",
-        f"access_token={token}",
-        capture=True,
-    ).stdout
-
-    data = json.loads(out)
+        {"fields": "id,permalink,timestamp,media_type", "limit": str(limit), "access_token": token},
+    )
     if isinstance(data, dict) and data.get("error"):
+        if data["error"].get("code") == AUTH_ERROR_CODE:
+            raise AuthError(str(data["error"]))
         raise RuntimeError(str(data["error"]))
-    items = (data.get("data") or [])
-    return items[0] if items else {}
+    return data.get("data") or []
 
 
 def load_state() -> dict[str, Any]:
@@ -101,36 +127,124 @@ def save_state(state: dict[str, Any]) -> None:
     STATE_PATH.write_text(json.dumps(state, indent=2) + "\n")
 
 
-def main() -> None:
+def payload(item: dict[str, Any], new: bool) -> dict[str, Any]:
+    return {
+        "new": new,
+        "id": str(item.get("id", "")),
+        "permalink": str(item.get("permalink", "")),
+        "timestamp": str(item.get("timestamp", "")),
+    }
+
+
+def diff_recent(items: list[dict[str, Any]], state: dict[str, Any]) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+    """Return the unseen items (oldest first) and the updated state."""
+    ids = [str(item.get("id", "")) for item in items]
+    if "seen_ids" in state:
+        seen = list(state["seen_ids"])
+    elif state.get("last_id") in ids:
+        # Older state only tracked the latest id: everything from it down is already seen.
+        seen = ids[ids.index(state["last_id"]) :]
+    elif state.get("last_id"):
+        seen = []
+    else:
+        # First run: remember what's there without reporting it.
+        seen = ids
+
+    seen_set = set(seen)
+    new_items = [item for item, media_id in zip(items, ids) if media_id not in seen_set]
+    new_items.reverse()
+
+    seen = [media_id for media_id in ids if media_id not in seen_set] + seen
+    state = {
+        "last_id": ids[0] if ids else state.get("last_id", ""),
+        "seen_ids": seen[:MAX_SEEN_IDS],
+        "seen_at": dt.datetime.now(dt.timezone.utc).isoformat(),
+    }
+    return new_items, state
+
+
+def record_seen(items: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Persist pushed items (newest first) as seen; return the ones not seen before, oldest first.
+
+    Unlike a poll, a push is itself the news, so with no saved state nothing is hidden
+    behind a first-run baseline. Repeated deliveries of the same id are dropped.
+    """
+    state = load_state()
+    if "seen_ids" not in state and not state.get("last_id"):
+        state = {"seen_ids": []}
+    new_items, state = diff_recent(items, state)
+    save_state(state)
+    return new_items
+
+
+def check_once(pool: http_pool.Pool, credentials: Credentials, window: int) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+    """Fetch the recent window, persist what was seen, and return (new items, latest item)."""
+    token, ig_id = credentials.get()
     try:
-        token, ig_id = get_token_and_ig_id()
-        latest = graph_get_latest(token, ig_id)
-        latest_id = str(latest.get("id", ""))
-        permalink = str(latest.get("permalink", ""))
-        timestamp = str(latest.get("timestamp", ""))
-
-        if not latest_id:
-            print(json.dumps({"new": False}))
-            return
-
-        state = load_state()
-        last_id = str(state.get("last_id", ""))
+        items = graph_get_recent(pool, token, ig_id, window)
+    except AuthError:
+        credentials.invalidate()
+        raise
+    if not items:
+        return [], {}
+    new_items, state = diff_recent(items, load_state())
+    save_state(state)
+    return new_items, items[0]
+
+
+def emit(line: dict[str, Any], stream: TextIO = sys.stdout) -> None:
+    print(json.dumps(line), file=stream, flush=True)
+
+
+def run_daemon(args: argparse.Namespace) -> None:
+    credentials = Credentials(args.credential_ttl)
+    interval = args.interval
+    failures = 0
+    with http_pool.Pool(retries=1) as pool:
+        while True:
+            try:
+                new_items, _ = check_once(pool, credentials, args.window)
+                failures = 0
+                for item in new_items:
+                    emit(payload(item, True))
+                # Posts tend to come in bursts: check again soon after one lands, then relax.
+                interval = args.min_interval if new_items else min(args.interval, interval * 2)
+                delay = interval
+            except Exception as e:
+                failures += 1
+                emit({"error": str(e)}, sys.stderr)
+                delay = min(args.max_backoff, args.interval * 2 ** (failures - 1))
+            time.sleep(delay * random.uniform(1 - args.jitter, 1 + args.jitter))
 
-        is_new = last_id != latest_id and last_id != ""
 
-        # Always update state to the latest we can see.
-        save_state({"last_id": latest_id, "seen_at": dt.datetime.now(dt.timezone.utc).isoformat()})
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report new Instagram posts as JSON lines.")
+    parser.add_argument("--daemon", action="store_true", help="Keep running and poll on an adaptive interval")
+    parser.add_argument("--window", type=int, default=WINDOW, help="How many recent posts to check each time")
+    parser.add_argument("--interval", type=float, default=300.0, help="Normal seconds between checks (daemon)")
+    parser.add_argument("--min-interval", type=float, default=30.0, help="Seconds between checks after a new post")
+    parser.add_argument("--max-backoff", type=float, default=3600.0, help="Longest wait after repeated errors")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Random +/- fraction applied to each wait")
+    parser.add_argument("--credential-ttl", type=float, default=12 * 3600, help="Seconds before re-reading credentials")
+    args = parser.parse_args()
+
+    if args.daemon:
+        try:
+            run_daemon(args)
+        except KeyboardInterrupt:
+            pass
+        return
 
-        print(
-            json.dumps(
-                {
-                    "new": bool(is_new),
-                    "id": latest_id,
-                    "permalink": permalink,
-                    "timestamp": timestamp,
-                }
-            )
-        )
+    try:
+        with http_pool.Pool() as pool:
+            new_items, latest = check_once(pool, Credentials(args.credential_ttl), args.window)
+        if not latest:
+            emit({"new": False})
+            return
+        for item in new_items:
+            emit(payload(item, True))
+        if not new_items:
+            emit(payload(latest, False))
 
     except Exception as e:
         print(json.dumps({"error": str(e)}))
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""Instagram webhook receiver.
+
+Push-based alternative to polling with instagram_watch.py. Meta delivers media
+notifications to this endpoint as soon as they happen; each new media id is written to
+stdout as the same JSON line instagram_watch.py prints:
+  {"new": true, "id": "...", "permalink": "...", "timestamp": "..."}
+and added to instagram/last_seen.json, so a later poll doesn't report it again.
+
+Requests:
+- GET  /webhooks/instagram answers the subscription challenge when hub.verify_token
+  matches IG_WEBHOOK_VERIFY_TOKEN.
+- POST /webhooks/instagram must carry X-Hub-Signature-256, the HMAC-SHA256 of the raw
+  body keyed with IG_APP_SECRET; anything else is rejected with 403. A body without
+  a valid Content-Length, or one that isn't a JSON delivery object, gets a 400.
+
+With --build, each delivery with new media also runs `instagram_sync.py sync` and
+`instagram_sync.py build` in-process on a background worker. Deliveries that arrive
+while a build is running are folded into one follow-up build.
+
+Usage:
+  python3 instagram_webhook.py serve [--port 8787] [--build] [--lookup]
+  python3 instagram_webhook.py send [--url URL] [--media-id ID]   # signed sample payload
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import hashlib
+import hmac
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+import http_pool
+import instagram_watch as watch
+
+WEBHOOK_PATH = "/webhooks/instagram"
+SIGNATURE_HEADER = "X-Hub-Signature-256"
+# Meta never sends more than this; anything bigger isn't a webhook delivery.
+MAX_BODY_BYTES = 1024 * 1024
+
+
+def require_env(name: str) -> str:
+    value = os.environ.get(name, "").strip()
+    if not value:
+        raise SystemExit(f"{name} is not set")
+    return value
+
+
+def sign(secret: str, body: bytes) -> str:
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def signature_ok(secret: str, body: bytes, header: str | None) -> bool:
+    return bool(header) and hmac.compare_digest(sign(secret, body), header)
+
+
+def _expect(value: Any, kind: type, what: str) -> Any:
+    if not isinstance(value, kind):
+        raise ValueError(f"{what} should be {kind.__name__}, got {type(value).__name__}")
+    return value
+
+
+def media_items(delivery: Any) -> list[dict[str, Any]]:
+    """Pull media items out of a webhook delivery, newest first.
+
+    Raises ValueError for anything not shaped like a delivery (a list where an object
+    belongs, a change without an object value, ...), so the handler can answer 400.
+    """
+    items = []
+    for entry in _expect(_expect(delivery, dict, "delivery").get("entry") or [], list, "entry"):
+        _expect(entry, dict, "entry item")
+        for change in _expect(entry.get("changes") or [], list, "changes"):
+            value = _expect(_expect(change, dict, "change").get("value") or {}, dict, "change value")
+            media_id = value.get("media_id") or value.get("id")
+            if not media_id:
+                continue
+            if not isinstance(media_id, (str, int)):
+                raise ValueError(f"media id should be str or int, got {type(media_id).__name__}")
+            timestamp = value.get("timestamp") or entry.get("time") or ""
+            if isinstance(timestamp, (int, float)):
+                try:
+                    timestamp = dt.datetime.fromtimestamp(timestamp, dt.timezone.utc).isoformat()
+                except (OverflowError, OSError) as e:
+                    raise ValueError(f"bad timestamp {timestamp}") from e
+            items.append({"id": str(media_id), "permalink": value.get("permalink", ""), "timestamp": str(timestamp)})
+    items.sort(key=lambda item: item["timestamp"], reverse=True)
+    return items
+
+
+class BuildWorker:
+    """Runs sync + build on one background thread, coalescing requests that pile up."""
+
+    def __init__(self) -> None:
+        self._pending = threading.Event()
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def request(self) -> None:
+        self._pending.set()
+
+    def _loop(self) -> None:
+        # Imported here so a plain receiver doesn't need instagram_sync's dependencies.
+        import instagram_sync
+
+        while True:
+            self._pending.wait()
+            self._pending.clear()
+            try:
+                instagram_sync.run(["sync"])
+                instagram_sync.run(["build"])
+            except (Exception, SystemExit) as e:
+                watch.emit({"error": f"build failed: {e}"}, sys.stderr)
+
+
+class Receiver:
+    def __init__(self, secret: str, verify_token: str, build: BuildWorker | None, lookup: bool) -> None:
+        self.secret = secret
+        self.verify_token = verify_token
+        self.build = build
+        self.pool = http_pool.Pool(retries=1) if lookup else None
+        self.credentials = watch.Credentials(12 * 3600)
+        # Deliveries are handled on parallel threads; last_seen.json is read-modify-write.
+        self._state_lock = threading.Lock()
+
+    def fill_in(self, item: dict[str, Any]) -> dict[str, Any]:
+        """Fetch the permalink/timestamp when the delivery didn't include them."""
+        if self.pool is None or (item["permalink"] and item["timestamp"]):
+            return item
+        token, _ = self.credentials.get()
+        data = self.pool.get_json(
+            f"{watch.GRAPH_BASE}/{item['id']}", {"fields": "id,permalink,timestamp", "access_token": token}
+        )
+        if isinstance(data, dict) and not data.get("error"):
+            item = {**item, **{key: data[key] for key in ("permalink", "timestamp") if data.get(key)}}
+        return item
+
+    def handle(self, items: list[dict[str, Any]]) -> int:
+        """Report and record the media_items() of a delivery; return how many were new."""
+        with self._state_lock:
+            new_items = watch.record_seen(items)
+        for item in new_items:
+            try:
+                item = self.fill_in(item)
+            except Exception as e:
+                watch.emit({"error": f"lookup failed for {item['id']}: {e}"}, sys.stderr)
+            watch.emit(watch.payload(item, True))
+        if new_items and self.build:
+            self.build.request()
+        return len(new_items)
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    receiver: Receiver
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        if url.path != WEBHOOK_PATH:
+            self.reply(404)
+            return
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if query.get("hub.mode") != "subscribe" or not hmac.compare_digest(
+            query.get("hub.verify_token", ""), self.receiver.verify_token
+        ):
+            self.reply(403)
+            return
+        self.reply(200, query.get("hub.challenge", "").encode())
+
+    def do_POST(self) -> None:
+        if urlsplit(self.path).path != WEBHOOK_PATH:
+            self.reply(404)
+            return
+        header = self.headers.get("Content-Length") or ""
+        # Digits only: a missing length, a sign or other junk is a 400, so a negative
+        # length never reaches rfile.read().
+        if not (header.isascii() and header.strip().isdigit()):
+            self.reply(400)
+            return
+        length = int(header)
+        if length > MAX_BODY_BYTES:
+            self.reply(413)
+            return
+        body = self.rfile.read(length)
+        if not signature_ok(self.receiver.secret, body, self.headers.get(SIGNATURE_HEADER)):
+            self.reply(403)
+            return
+        try:
+            # Signed but malformed (not JSON, or not shaped like a delivery): a 400, not a dead thread.
+            items = media_items(json.loads(body))
+        except ValueError:
+            self.reply(400)
+            return
+        self.receiver.handle(items)
+        self.reply(200)
+
+    def reply(self, status: int, body: bytes = b"") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        # stdout is reserved for payload lines.
+        pass
+
+
+def cmd_serve(args: argparse.Namespace) -> None:
+    receiver = Receiver(
+        require_env("IG_APP_SECRET"),
+        require_env("IG_WEBHOOK_VERIFY_TOKEN"),
+        BuildWorker() if args.build else None,
+        args.lookup,
+    )
+    handler = type("Handler", (WebhookHandler,), {"receiver": receiver})
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+    print(f"Listening on http://{args.host}:{args.port}{WEBHOOK_PATH}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def sample_delivery(media_id: str) -> dict[str, Any]:
+    now = dt.datetime.now(dt.timezone.utc)
+    return {
+        "object": "instagram",
+        "entry": [
+            {
+                "id": os.environ.get("IG_GRAPH_IG_USER_ID", "0"),
+                "time": int(now.timestamp()),
+                "changes": [
+                    {
+                        "field": "media",
+                        "value": {
+                            "media_id": media_id,
+                            "permalink": f"https://www.instagram.com/p/{media_id}/",
+                            "timestamp": now.strftime("%Y-%m-%dT%H:%M:%S+0000"),
+                        },
+                    }
+                ],
+            }
+        ],
+    }
+
+
+def cmd_send(args: argparse.Namespace) -> None:
+    body = json.dumps(sample_delivery(args.media_id)).encode()
+    secret = require_env("IG_APP_SECRET")
+    headers = {"Content-Type": "application/json", SIGNATURE_HEADER: sign(secret, body)}
+    if args.bad_signature:
+        headers[SIGNATURE_HEADER] = sign(secret + "x", body)
+    with http_pool.Pool(retries=0) as pool:
+        response = pool.request("POST", args.url, headers=headers, body=body)
+    print(f"{response.status} {args.url}")
+    if response.status != 200:
+        raise SystemExit(1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Receive Instagram media webhooks.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_serve = sub.add_parser("serve", help="Run the webhook receiver")
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=8787)
+    p_serve.add_argument("--build", action="store_true", help="Run instagram_sync sync + build after new media")
+    p_serve.add_argument("--lookup", action="store_true", help="Fetch permalink/timestamp when a delivery omits them")
+    p_serve.set_defaults(func=cmd_serve)
+
+    p_send = sub.add_parser("send", help="POST a signed sample delivery (for local testing)")
+    p_send.add_argument("--url", default=f"http://127.0.0.1:8787{WEBHOOK_PATH}")
+    p_send.add_argument("--media-id", default=dt.datetime.now().strftime("sample-%Y%m%d%H%M%S"))
+    p_send.add_argument("--bad-signature", action="store_true", help="Sign with the wrong secret (expect 403)")
+    p_send.set_defaults(func=cmd_send)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""Resize and recompress source images into assets/optimized/.
+
+For every raster image under assets/ (outside assets/optimized/) this writes:
+- the full-size image, capped at FULL_MAX_WIDTH
+- the `-thumb` sibling that image_info.thumb_for() names
+- `-<width>w` variants for each image_info.SRCSET_WIDTHS entry narrower than the image,
+  which build_markdown lists in the srcset of the posts that show it
+
+assets/optimized/manifest.json records the source hash and the variants written, so
+unchanged images are never reprocessed. PNGs stay full-colour unless --quantize asks
+for a 256-colour palette, which is much smaller but lossy. Requires Pillow (`pip install pillow`).
+
+Usage: python3 optimize_images.py [--jobs N] [--force] [--quantize]
+"""
+
+from __future__ import annotations
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import io
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+from image_info import SRCSET_WIDTHS, thumb_for, width_variant
+from outputs import replace_atomic
+
+ROOT = Path(__file__).resolve().parent
+SOURCE_DIR = ROOT / "assets"
+OPTIMIZED_DIR = SOURCE_DIR / "optimized"
+MANIFEST_PATH = OPTIMIZED_DIR / "manifest.json"
+
+# Bump when encoder settings change so every image is reprocessed.
+OPTIMIZER_VERSION = "3"
+SOURCE_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp"}
+FULL_MAX_WIDTH = 1600
+THUMB_WIDTH = 320
+JPEG_QUALITY = 82
+WEBP_QUALITY = 82
+
+
+def load_pillow() -> Any:
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        raise SystemExit("Pillow is required: pip install pillow")
+    return Image, ImageOps
+
+
+def find_sources() -> list[str]:
+    sources = []
+    for path in SOURCE_DIR.rglob("*"):
+        if OPTIMIZED_DIR in path.parents or path.suffix.lower() not in SOURCE_SUFFIXES:
+            continue
+        sources.append(path.relative_to(SOURCE_DIR).as_posix())
+    return sorted(sources)
+
+
+def encode(image: Any, suffix: str, quantize: bool) -> bytes:
+    Image, _ = load_pillow()
+    out = io.BytesIO()
+    if suffix in {".jpg", ".jpeg"}:
+        image.convert("RGB").save(out, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    elif suffix == ".webp":
+        image.save(out, "WEBP", quality=WEBP_QUALITY, method=6)
+    else:
+        if quantize and image.mode != "P":
+            image = image.convert("RGBA").quantize(256, method=Image.Quantize.FASTOCTREE)
+        image.save(out, "PNG", optimize=True)
+    return out.getvalue()
+
+
+def resized(image: Any, width: int) -> Any:
+    Image, _ = load_pillow()
+    if image.width <= width:
+        return image
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.Resampling.LANCZOS)
+
+
+def optimize_image(rel: str, source_hash: str, quantize: bool) -> dict[str, Any]:
+    Image, ImageOps = load_pillow()
+    source = SOURCE_DIR / rel
+    suffix = source.suffix.lower()
+    with Image.open(source) as opened:
+        # EXIF-rotated images have to be re-encoded even at their own size.
+        upright = opened.getexif().get(0x0112, 1) == 1
+        image = ImageOps.exif_transpose(opened)
+        image.load()
+    original = source.read_bytes()
+
+    def encode_width(width: int) -> bytes:
+        # resized() never upscales; an image already this narrow is re-encoded as is, and
+        # never ships bigger than what we started with.
+        scaled = resized(image, width)
+        data = encode(scaled, suffix, quantize)
+        if scaled is image and upright and len(original) <= len(data):
+            return original
+        return data
+
+    full = resized(image, FULL_MAX_WIDTH)
+    variants = {"full": (rel, encode_width(FULL_MAX_WIDTH))}
+    variants["thumb"] = (thumb_for(rel), encode_width(THUMB_WIDTH))
+    for width in SRCSET_WIDTHS:
+        if width < full.width:
+            variants[f"{width}w"] = (width_variant(rel, width), encode_width(width))
+
+    for name, data in variants.values():
+        replace_atomic(OPTIMIZED_DIR / name, data)
+
+    return {
+        "source": source_hash,
+        "quantize": quantize,
+        "source_bytes": source.stat().st_size,
+        "width": full.width,
+        "height": full.height,
+        "variants": {key: name for key, (name, _) in variants.items()},
+        "bytes": {key: len(data) for key, (_, data) in variants.items()},
+    }
+
+
+def _optimize_job(job: tuple[str, str, bool]) -> dict[str, Any]:
+    return optimize_image(*job)
+
+
+def load_manifest() -> dict[str, dict[str, Any]]:
+    if not MANIFEST_PATH.exists():
+        return {}
+    data = json.loads(MANIFEST_PATH.read_text())
+    if data.get("optimizer") != OPTIMIZER_VERSION:
+        return {}
+    return data.get("images", {})
+
+
+def is_current(record: dict[str, Any] | None, source_hash: str, quantize: bool) -> bool:
+    if not record or record.get("source") != source_hash or record.get("quantize") != quantize:
+        return False
+    return all((OPTIMIZED_DIR / name).is_file() for name in record.get("variants", {}).values())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Optimize images into assets/optimized/.")
+    parser.add_argument("--jobs", "-j", type=int, default=0, help="Worker processes (0 = one per CPU core)")
+    parser.add_argument("--force", action="store_true", help="Reprocess every image, ignoring the manifest")
+    parser.add_argument(
+        "--quantize", action="store_true", help="Reduce PNGs to a 256-colour palette (smaller, but lossy)"
+    )
+    args = parser.parse_args()
+    load_pillow()
+
+    previous = {} if args.force else load_manifest()
+    manifest: dict[str, dict[str, Any]] = {}
+    jobs: list[tuple[str, str, bool]] = []
+    for rel in find_sources():
+        source_hash = hashlib.sha256((SOURCE_DIR / rel).read_bytes()).hexdigest()
+        record = previous.get(rel)
+        if is_current(record, source_hash, args.quantize):
+            manifest[rel] = record
+        else:
+            jobs.append((rel, source_hash, args.quantize))
+
+    workers = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            results = list(pool.map(_optimize_job, jobs))
+    else:
+        results = [_optimize_job(job) for job in jobs]
+
+    for (rel, _, _), record in zip(jobs, results):
+        manifest[rel] = record
+        before = record["source_bytes"]
+        after = record["bytes"]["full"]
+        print(f"Optimized {rel}: {before:,} -> {after:,} bytes ({len(record['variants'])} files)")
+
+    OPTIMIZED_DIR.mkdir(parents=True, exist_ok=True)
+    data = {"optimizer": OPTIMIZER_VERSION, "images": dict(sorted(manifest.items()))}
+    MANIFEST_PATH.write_text(json.dumps(data, indent=2) + "\n")
+    print(f"{len(jobs)} optimized, {len(manifest) - len(jobs)} unchanged")
+
+
+if __name__ == "__main__":
+    main()
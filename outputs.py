@@ -0,0 +1,176 @@
+"""Shared writer for build outputs.
+
+write_output() compares the new bytes with what's on disk and only writes real
+changes, so unchanged outputs keep their mtimes and git sees no diff. Writes go to a
+temp file in the same directory and are renamed into place, so a reader (serve.py, a
+crashed build, the CI commit step) never sees half a file.
+
+With set_dry_run(True) nothing touches the disk: every write and removal is only
+recorded as a Change, and the would-be contents are kept in memory so later stages
+(read_output) see the same bytes a real build would produce. report() prints the
+list with byte deltas. Real builds keep no log, so it doesn't grow with the site.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+import os
+from pathlib import Path
+import threading
+
+import profiling
+
+ROOT = Path(__file__).resolve().parent
+
+
+@dataclass(frozen=True)
+class Change:
+    path: Path
+    # None when the file didn't exist before / won't exist after.
+    old_size: int | None
+    new_size: int | None
+
+    @property
+    def kind(self) -> str:
+        if self.old_size is None:
+            return "A"
+        return "D" if self.new_size is None else "M"
+
+    @property
+    def delta(self) -> int:
+        return (self.new_size or 0) - (self.old_size or 0)
+
+
+DRY_RUN = False
+# Stages run on threads (build_site.py); the change log and dry-run overlay are shared.
+_lock = threading.Lock()
+_changes: list[Change] = []
+# Dry run only: path -> pending bytes, or None once removed.
+_pending: dict[Path, bytes | None] = {}
+
+
+def set_dry_run(enabled: bool) -> None:
+    global DRY_RUN
+    DRY_RUN = enabled
+
+
+def read_output(path: Path) -> bytes | None:
+    """Current bytes of `path`, including writes a dry run has only recorded."""
+    with _lock:
+        if path in _pending:
+            return _pending[path]
+    if not path.is_file():
+        return None
+    data = path.read_bytes()
+    profiling.count(read=len(data))
+    return data
+
+
+def list_outputs(directory: Path, pattern: str) -> list[Path]:
+    """Files under `directory` matching the glob `pattern`, including a dry run's pending writes and removals."""
+    found = set(directory.glob(pattern))
+    depth = len(Path(pattern).parts)
+    with _lock:
+        pending = list(_pending.items())
+    for path, data in pending:
+        try:
+            rel = path.relative_to(directory)
+        except ValueError:
+            continue
+        if len(rel.parts) != depth or not rel.match(pattern):
+            continue
+        if data is None:
+            found.discard(path)
+        else:
+            found.add(path)
+    return sorted(found)
+
+
+def replace_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Unique per writer, in the target directory so the rename never crosses filesystems.
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        tmp.write_bytes(data)
+        tmp.replace(path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def write_output(path: Path, data: str | bytes, *, quiet: bool = False) -> bool:
+    """Write `data` to `path` unless it already holds exactly that; return whether it changed."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    old = read_output(path)
+    if old == data:
+        return False
+    record([Change(path, None if old is None else len(old), len(data))])
+    if DRY_RUN:
+        with _lock:
+            _pending[path] = data
+        return True
+    replace_atomic(path, data)
+    profiling.count(written=len(data))
+    if not quiet:
+        print(f"Wrote {path}")
+    return True
+
+
+def remove_output(path: Path) -> bool:
+    old = read_output(path)
+    if old is None:
+        return False
+    record([Change(path, len(old), None)])
+    if DRY_RUN:
+        with _lock:
+            _pending[path] = None
+        return True
+    path.unlink()
+    print(f"Removed {path}")
+    return True
+
+
+def record(changes: list[Change]) -> None:
+    """Add changes to the log; also how pool workers' changes reach the parent process."""
+    if not DRY_RUN:
+        return
+    with _lock:
+        _changes.extend(changes)
+
+
+def take_changes() -> list[Change]:
+    """Return the recorded changes and clear the log."""
+    with _lock:
+        taken = list(_changes)
+        _changes.clear()
+    return taken
+
+
+def changes() -> list[Change]:
+    with _lock:
+        return list(_changes)
+
+
+def display_path(path: Path) -> str:
+    try:
+        return path.relative_to(ROOT).as_posix()
+    except ValueError:
+        return str(path)
+
+
+def report() -> None:
+    # A file written twice in one run (e.g. a section list, then its asset links) counts once.
+    merged: dict[Path, Change] = {}
+    for change in changes():
+        first = merged.get(change.path)
+        merged[change.path] = Change(change.path, first.old_size if first else change.old_size, change.new_size)
+    # Created and removed again: nothing to show.
+    final = [change for change in merged.values() if change.old_size is not None or change.new_size is not None]
+    if not final:
+        print("No files would change" if DRY_RUN else "No files changed")
+        return
+    print(f"{len(final)} file(s) {'would change' if DRY_RUN else 'changed'}:")
+    for change in sorted(final, key=lambda change: display_path(change.path)):
+        sizes = f"{change.old_size or 0:,} -> {change.new_size or 0:,}"
+        print(f"  {change.kind} {display_path(change.path)}  {change.delta:+,} bytes ({sizes})")
+    print(f"Net {sum(change.delta for change in final):+,} bytes")
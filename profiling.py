@@ -0,0 +1,160 @@
+"""Opt-in build profiling: wall time, CPU time and bytes read/written per span.
+
+Code marks work with `with profiling.span(name, cat, **args):`. Spans nest per thread,
+and count() adds bytes to the innermost one (outputs.write_output counts writes). The
+`--profile` option of the build scripts calls enable() and, at the end, finish(),
+which writes every span as a Chrome trace-event file (open it in chrome://tracing or
+https://ui.perfetto.dev) and prints the slowest stages and files.
+
+Disabled (the default), span() does nothing but check a flag. Pool workers run with
+their own copy of this module and hand their spans back with take_events().
+"""
+
+from __future__ import annotations
+
+import argparse
+from contextlib import contextmanager
+import json
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Any, Iterator
+
+ROOT = Path(__file__).resolve().parent
+DEFAULT_TRACE_PATH = ROOT / "build-profile.json"
+SUMMARY_TOP = 15
+
+ENABLED = False
+_lock = threading.Lock()
+_events: list[dict[str, Any]] = []
+_local = threading.local()
+
+
+def add_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        type=Path,
+        const=DEFAULT_TRACE_PATH,
+        metavar="TRACE",
+        help=f"Record timings and write a Chrome trace (default: {DEFAULT_TRACE_PATH.name}) plus a summary",
+    )
+
+
+def enable(enabled: bool = True) -> None:
+    global ENABLED
+    ENABLED = enabled
+
+
+@contextmanager
+def span(name: str, cat: str = "stage", **args: Any) -> Iterator[None]:
+    """Record the wall time, thread CPU time and counted bytes of the block."""
+    if not ENABLED:
+        yield
+        return
+    stack = _local.__dict__.setdefault("stack", [])
+    counters = {"read": 0, "written": 0}
+    stack.append(counters)
+    wall = time.perf_counter_ns()
+    cpu = time.thread_time_ns()
+    try:
+        yield
+    finally:
+        cpu = time.thread_time_ns() - cpu
+        end = time.perf_counter_ns()
+        stack.pop()
+        if stack:
+            # Bytes count toward every enclosing span too.
+            for key, value in counters.items():
+                stack[-1][key] += value
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": wall / 1000,
+            "dur": (end - wall) / 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": {**args, "cpu_ms": round(cpu / 1e6, 3), "read_bytes": counters["read"], "written_bytes": counters["written"]},
+        }
+        with _lock:
+            _events.append(event)
+
+
+def count(read: int = 0, written: int = 0) -> None:
+    """Add bytes read/written to the innermost open span on this thread."""
+    if not ENABLED:
+        return
+    stack = _local.__dict__.get("stack")
+    if stack:
+        stack[-1]["read"] += read
+        stack[-1]["written"] += written
+
+
+def record(events: list[dict[str, Any]], outer: str = "") -> None:
+    """Add spans from a pool worker; the bytes of its `outer` (per-job) spans count toward the current span."""
+    for event in events:
+        if event["name"] == outer:
+            count(event["args"]["read_bytes"], event["args"]["written_bytes"])
+    with _lock:
+        _events.extend(events)
+
+
+def take_events() -> list[dict[str, Any]]:
+    with _lock:
+        taken = list(_events)
+        _events.clear()
+    return taken
+
+
+def write_trace(path: Path) -> None:
+    with _lock:
+        events = sorted(_events, key=lambda event: event["ts"])
+    names = [
+        {"name": "process_name", "ph": "M", "pid": pid, "args": {"name": "main" if pid == os.getpid() else f"worker {pid}"}}
+        for pid in sorted({event["pid"] for event in events})
+    ]
+    # Written directly: a profile is a report, not a site output for --dry-run to hold back.
+    path.write_text(json.dumps({"traceEvents": names + events}) + "\n")
+    print(f"Wrote {path} ({len(events)} spans)")
+
+
+def summary_lines(top: int = SUMMARY_TOP) -> list[str]:
+    with _lock:
+        events = list(_events)
+    totals: dict[str, dict[str, float]] = {}
+    for event in events:
+        if event["cat"] == "file":
+            continue
+        total = totals.setdefault(event["name"], {"count": 0, "wall": 0.0, "cpu": 0.0, "read": 0, "written": 0})
+        total["count"] += 1
+        total["wall"] += event["dur"] / 1000
+        total["cpu"] += event["args"]["cpu_ms"]
+        total["read"] += event["args"]["read_bytes"]
+        total["written"] += event["args"]["written_bytes"]
+
+    lines = [f"{'stage':<28} {'calls':>6} {'wall ms':>10} {'cpu ms':>10} {'read':>12} {'written':>12}"]
+    for name, total in sorted(totals.items(), key=lambda item: item[1]["wall"], reverse=True)[:top]:
+        lines.append(
+            f"{name:<28} {total['count']:>6} {total['wall']:>10.1f} {total['cpu']:>10.1f}"
+            f" {int(total['read']):>12,} {int(total['written']):>12,}"
+        )
+    files = sorted((event for event in events if event["cat"] == "file"), key=lambda event: event["dur"], reverse=True)
+    if files:
+        lines += ["", f"{'slowest files':<48} {'wall ms':>10} {'cpu ms':>10} {'read':>12} {'written':>12}"]
+        for event in files[:top]:
+            label = f"{event['name']} {event['args'].get('file', '')}"
+            lines.append(
+                f"{label[:48]:<48} {event['dur'] / 1000:>10.1f} {event['args']['cpu_ms']:>10.1f}"
+                f" {event['args']['read_bytes']:>12,} {event['args']['written_bytes']:>12,}"
+            )
+    return lines
+
+
+def finish(path: Path | None = None) -> None:
+    """Write the trace and print the summary, if profiling is on."""
+    if not ENABLED:
+        return
+    write_trace(path or DEFAULT_TRACE_PATH)
+    print("\n".join(summary_lines()))
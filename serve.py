@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""Local preview server with live reload.
+
+Renders the site in memory from markdown/, sections/, index.template.html and the
+post templates, serves it over HTTP, and re-renders only the outputs a changed file
+affects. Open pages reload themselves after each rebuild. Nothing is written to disk.
+
+Usage: python3 serve.py [--port 8000]
+"""
+
+from __future__ import annotations
+
+import argparse
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import os
+from pathlib import Path
+import threading
+import time
+from urllib.parse import urlsplit
+
+import build
+import build_markdown as bm
+
+ROOT = bm.ROOT
+LIVERELOAD_PATH = "/__livereload"
+LIVERELOAD_SCRIPT = f"""(() => {{
+  const source = new EventSource("{LIVERELOAD_PATH}");
+  source.onmessage = () => window.location.reload();
+}})();
+""".encode()
+# External script rather than inline: the pages' CSP only allows scripts from 'self'.
+LIVERELOAD_TAG = f'<script src="{LIVERELOAD_PATH}.js" defer></script>'
+
+
+def inject_livereload(html: str) -> bytes:
+    if "</body>" in html:
+        html = html.replace("</body>", f"{LIVERELOAD_TAG}\n</body>", 1)
+    else:
+        html += LIVERELOAD_TAG
+    return html.encode()
+
+
+def url_for(path: Path) -> str:
+    return "/" + path.relative_to(ROOT).as_posix()
+
+
+class Site:
+    """In-memory copy of every generated page, keyed by URL path."""
+
+    def __init__(self) -> None:
+        self.changed = threading.Condition()
+        self.version = 0
+        self.pages: dict[str, bytes] = {}
+        self.posts: dict[Path, tuple[bm.FrontMatter, Path, str]] = {}
+        self.sections_raw: dict[str, str] = {}
+        self.sections: dict[str, str] = {}
+        self.index_template = ""
+
+    def watched_files(self) -> list[Path]:
+        files = list(bm.MARKDOWN_DIR.glob("*.md"))
+        files += build.sections_dir.glob("*.html")
+        files += [build.template_path, *bm.TEMPLATE_PATHS.values()]
+        # Stylesheets and scripts are served from disk; watch them only to trigger a reload.
+        files += ROOT.glob("*.css")
+        files += ROOT.glob("*.js")
+        return files
+
+    def load_all(self) -> None:
+        self.index_template = build.template_path.read_text()
+        self.sections_raw = build.read_sections()
+        for md_path in bm.MARKDOWN_DIR.glob("*.md"):
+            try:
+                self.render_post(md_path)
+            except SystemExit as exc:
+                print(f"Build error: {exc}")
+        self.render_sections(set(self.sections_raw))
+
+    def render_post(self, md_path: Path) -> set[str]:
+        """(Re)render one markdown source; return the sections whose lists it touches.
+
+        The source is rendered before the previous render is dropped, so a source that
+        fails to parse (SystemExit) leaves the last good page in place.
+        """
+        rendered = None
+        if md_path.exists():
+            fm, body_lines = bm.split_source(md_path.read_text(), md_path)
+            out_file = bm.output_path(fm)
+            page = inject_livereload(bm.render_post(fm, body_lines))
+            rendered = (fm, out_file, fm.summary or bm.extract_summary(body_lines))
+
+        touched: set[str] = set()
+        previous = self.posts.pop(md_path, None)
+        if previous:
+            fm, out_file, _ = previous
+            self.pages.pop(url_for(out_file), None)
+            touched.add(fm.section)
+        if rendered:
+            fm, out_file, _ = rendered
+            self.pages[url_for(out_file)] = page
+            self.posts[md_path] = rendered
+            touched.add(fm.section)
+        return touched
+
+    def archived_sections(self) -> set[str]:
+        """Sections that currently have archive pages."""
+        entries = bm.group_by_section(self.posts.values())
+        return {section for section, items in entries.items() if bm.archive_page_count(section, len(items))}
+
+    def render_sections(self, section_ids: set[str]) -> None:
+        entries = bm.group_by_section(self.posts.values())
+        for section_id in section_ids:
+            archive_prefix = url_for(bm.OUTPUT_DIR / section_id / "page") + "/"
+            for url in [url for url in self.pages if url.startswith(archive_prefix)]:
+                del self.pages[url]
+            raw = self.sections_raw.get(section_id)
+            if raw is None:
+                self.sections.pop(section_id, None)
+                continue
+            items = entries.get(section_id)
+            self.sections[section_id] = bm.render_section_list(raw, items) if items else raw
+            for path, html in bm.render_archive_pages(section_id, items or []).items():
+                self.pages[url_for(path)] = inject_livereload(html)
+
+        self.pages["/index.html"] = inject_livereload(build.render_index(self.index_template, self.sections))
+        build_log = self.sections.get(build.build_log_source.stem)
+        if build_log is not None:
+            self.pages[url_for(build.build_log_output)] = inject_livereload(build_log)
+
+    def apply_changes(self, changed: set[Path]) -> tuple[list[str], dict[Path, str]]:
+        """Re-render whatever the changed files feed into.
+
+        Returns a short description of what was rebuilt, and the error for each changed
+        file that failed; those keep their last good render.
+        """
+        done: list[str] = []
+        failed: dict[Path, str] = {}
+        touched: set[str] = set()
+
+        for name, path in bm.TEMPLATE_PATHS.items():
+            if path in changed:
+                try:
+                    text = path.read_text()
+                    compiled = bm.CompiledTemplate(text, path.name)
+                    archive = bm.archive_template(text) if name == "generic" else None
+                except SystemExit as exc:
+                    failed[path] = str(exc)
+                    continue
+                bm.COMPILED_TEMPLATES[name] = compiled
+                if archive:
+                    # Archive pages are rendered from the generic template too.
+                    bm.ARCHIVE_TEMPLATE = archive
+                    touched |= self.archived_sections()
+                stale = [md for md, (fm, _, _) in self.posts.items() if bm.template_name(fm) == name]
+                changed.update(stale)
+                done.append(path.name)
+
+        for path in sorted(changed):
+            if path.parent == bm.MARKDOWN_DIR and path.suffix == ".md":
+                try:
+                    touched |= self.render_post(path)
+                except SystemExit as exc:
+                    failed[path] = str(exc)
+                    continue
+                done.append(path.relative_to(ROOT).as_posix())
+            elif path.parent == build.sections_dir:
+                if path.exists():
+                    self.sections_raw[path.stem] = path.read_text()
+                else:
+                    self.sections_raw.pop(path.stem, None)
+                touched.add(path.stem)
+                done.append(path.relative_to(ROOT).as_posix())
+            elif path == build.template_path:
+                self.index_template = path.read_text()
+                done.append(path.name)
+
+        self.render_sections(touched)
+        return done, failed
+
+    def notify(self) -> None:
+        with self.changed:
+            self.version += 1
+            self.changed.notify_all()
+
+
+def snapshot(paths: list[Path]) -> dict[Path, tuple[int, int]]:
+    stats: dict[Path, tuple[int, int]] = {}
+    for path in paths:
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue
+        stats[path] = (st.st_mtime_ns, st.st_size)
+    return stats
+
+
+def watch(site: Site, interval: float) -> None:
+    previous = snapshot(site.watched_files())
+    # Last error printed per file, so a broken file is reported once, not every check.
+    errors: dict[Path, str] = {}
+    while True:
+        time.sleep(interval)
+        current = snapshot(site.watched_files())
+        changed = {path for path in previous.keys() | current.keys() if previous.get(path) != current.get(path)}
+        if not changed:
+            continue
+
+        started = time.perf_counter()
+        done, failed = site.apply_changes(set(changed))
+        for path in changed - failed.keys():
+            errors.pop(path, None)
+        for path, message in failed.items():
+            if errors.get(path) != message:
+                print(f"Build error: {message}")
+            errors[path] = message
+            # Keep serving the last good render, and retry the file until it's fixed.
+            if path in previous:
+                current[path] = previous[path]
+            else:
+                current.pop(path, None)
+        previous = current
+        if not changed - failed.keys():
+            continue
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"Rebuilt {', '.join(done) or 'static assets'} in {elapsed:.0f} ms")
+        site.notify()
+
+
+class PreviewHandler(SimpleHTTPRequestHandler):
+    site: Site
+
+    def do_GET(self) -> None:
+        path = urlsplit(self.path).path
+        if path.endswith("/"):
+            path += "index.html"
+
+        if path == LIVERELOAD_PATH:
+            self.stream_reloads()
+            return
+        if path == f"{LIVERELOAD_PATH}.js":
+            self.send_body(LIVERELOAD_SCRIPT, "text/javascript")
+            return
+
+        body = self.site.pages.get(path)
+        if body is None and path.endswith(".html"):
+            disk_path = Path(self.translate_path(path))
+            if disk_path.is_file():
+                body = inject_livereload(disk_path.read_text())
+        if body is not None:
+            self.send_body(body, "text/html; charset=utf-8")
+            return
+        if self.send_precompressed(Path(self.translate_path(path))):
+            return
+        super().do_GET()
+
+    def send_precompressed(self, disk_path: Path) -> bool:
+        """Serve a .br/.gz sibling from compress_outputs.py if the client accepts it and it's current."""
+        accepted = {part.split(";")[0].strip() for part in self.headers.get("Accept-Encoding", "").split(",")}
+        for encoding, ext in (("br", "br"), ("gzip", "gz")):
+            sibling = disk_path.with_name(f"{disk_path.name}.{ext}")
+            if encoding not in accepted or not sibling.is_file() or not disk_path.is_file():
+                continue
+            if sibling.stat().st_mtime_ns < disk_path.stat().st_mtime_ns:
+                # The source was edited since compress_outputs.py ran.
+                continue
+            body = sibling.read_bytes()
+            self.send_response(200)
+            self.send_header("Content-Type", self.guess_type(os.fspath(disk_path)))
+            self.send_header("Content-Encoding", encoding)
+            self.send_header("Vary", "Accept-Encoding")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(body)
+            return True
+        return False
+
+    def send_body(self, body: bytes, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_reloads(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        seen = self.site.version
+        try:
+            while True:
+                with self.site.changed:
+                    self.site.changed.wait_for(lambda: self.site.version != seen, timeout=15)
+                    version = self.site.version
+                # Comment lines keep the connection alive and surface closed sockets.
+                self.wfile.write(b"data: reload\n\n" if version != seen else b": ping\n\n")
+                self.wfile.flush()
+                seen = version
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the site locally with live reload.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--interval", type=float, default=0.2, help="Seconds between file checks")
+    args = parser.parse_args()
+
+    site = Site()
+    started = time.perf_counter()
+    site.load_all()
+    print(f"Rendered {len(site.pages)} pages in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    threading.Thread(target=watch, args=(site, args.interval), daemon=True).start()
+
+    handler = partial(type("Handler", (PreviewHandler,), {"site": site}), directory=os.fspath(ROOT))
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+    print(f"Serving http://{args.host}:{args.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
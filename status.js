@@ -2,6 +2,15 @@
   const root = document.body;
   const statusEls = Array.from(document.querySelectorAll(".life-pill"));
   const feedUrl = "https://docs.google.com/spreadsheets/d/e/2PACX-1vTf9LEUBGvKLUj21scsKLQtDQ-ucL0RccRz-eNfB76MNM2U_hz-RuJe3reKNU22XtR-8xX8HpC63ol3/pub?gid=663029337&single=true&output=csv";
+  // The last reading ({ bpm, at }) is shared by every page and tab through localStorage;
+  // the sheet is asked again only once it's older than this.
+  const cacheKey = "life-status";
+  const minRefreshMs = 2 * 60 * 1000;
+  // This is a liveness indicator: a reading older than this is not shown as the current
+  // status; the pill goes back to its fallback text until a fetch succeeds. It applies to
+  // the deploy-time snapshot too, so one injected more than 10 minutes before a visit is
+  // ignored.
+  const maxDisplayAgeMs = 5 * minRefreshMs;
   const modal = document.getElementById("life-modal");
   const triggers = Array.from(document.querySelectorAll(".life-trigger"));
   const closeBtn = document.querySelector(".life-modal-close");
@@ -41,11 +50,14 @@
   };
 
   const parseBpm = (csvText) => {
-    const lines = csvText.trim().split("\n").filter(Boolean);
-    if (!lines.length) {
+    // Only the first row matters; don't split the rest of the sheet.
+    const text = csvText.trimStart();
+    const end = text.indexOf("\n");
+    const firstLine = end < 0 ? text : text.slice(0, end);
+    if (!firstLine.trim()) {
       return null;
     }
-    const firstRow = lines[0].split(",").map((cell) => cell.replace(/\"/g, "").trim());
+    const firstRow = firstLine.split(",").map((cell) => cell.replace(/\"/g, "").trim());
     const bpm = Number(firstRow[1] || firstRow[0]);
     return Number.isFinite(bpm) ? bpm : null;
   };
@@ -80,28 +92,93 @@
       heart.style.setProperty("--pulse-speed", `${seconds}s`);
     });
   };
+
+  const fallbackText = statusEls.map((el) => el.textContent);
+  // The newest reading shown on this page, for when localStorage is blocked.
+  let lastShown = null;
+
+  const isDisplayable = (reading) =>
+    Boolean(reading && reading.bpm) && Date.now() - reading.at <= maxDisplayAgeMs;
+
+  const showReading = (reading) => {
+    if (!isDisplayable(reading)) {
+      statusEls.forEach((el, index) => {
+        el.textContent = fallbackText[index];
+      });
+      return;
+    }
+    lastShown = reading;
+    statusEls.forEach((el) => {
+      el.textContent = statusForBpm(reading.bpm);
+    });
+    setHeartRateAnimation(reading.bpm);
+  };
+
+  const readJson = (text) => {
+    try {
+      return text ? JSON.parse(text) : null;
+    } catch (error) {
+      return null;
+    }
+  };
+
+  const cachedReading = () => {
+    let cached = null;
+    try {
+      cached = readJson(localStorage.getItem(cacheKey));
+    } catch (error) {
+      // Storage can be blocked; fall back to the snapshot.
+    }
+    // status_snapshot.py --inject inlines a reading at deploy time, when there is one.
+    const snapshotEl = document.getElementById("status-snapshot");
+    const snapshot = snapshotEl ? readJson(snapshotEl.textContent) : null;
+    return [cached, snapshot, lastShown].reduce(
+      (newest, reading) => (reading && (!newest || reading.at > newest.at) ? reading : newest),
+      null,
+    );
+  };
+
+  let inFlight = false;
   const refreshStatus = async () => {
-    if (!statusEls.length) {
+    if (!statusEls.length || inFlight || document.hidden) {
+      return;
+    }
+    // Stale-while-revalidate: a cached reading stays on screen while it's recent enough
+    // (showReading drops one past maxDisplayAgeMs); only refetch once it's old.
+    const cached = cachedReading();
+    showReading(cached);
+    if (cached && Date.now() - cached.at < minRefreshMs) {
       return;
     }
+    inFlight = true;
     try {
       const response = await fetch(feedUrl, { cache: "no-store" });
       if (!response.ok) {
         return;
       }
-      const csvText = await response.text();
-      const bpm = parseBpm(csvText);
+      const bpm = parseBpm(await response.text());
       if (bpm) {
-        statusEls.forEach((el) => {
-          el.textContent = statusForBpm(bpm);
-        });
-        setHeartRateAnimation(bpm);
+        const reading = { bpm, at: Date.now() };
+        try {
+          localStorage.setItem(cacheKey, JSON.stringify(reading));
+        } catch (error) {
+          // Not cached; the next page view fetches again.
+        }
+        showReading(reading);
       }
     } catch (error) {
-      // Keep fallback text when the feed is unavailable.
+      // Keep the recent cached reading, or the fallback text, when the feed is unavailable.
+    } finally {
+      inFlight = false;
     }
   };
 
+  // Fetch only once the page has painted and the browser is idle.
+  const refreshWhenIdle = () => {
+    const idle = window.requestIdleCallback || ((callback) => setTimeout(callback, 1));
+    idle(refreshStatus, { timeout: 5000 });
+  };
+
   const openModal = () => {
     if (!modal) {
       return;
@@ -152,9 +229,21 @@
   };
 
   update();
-  refreshStatus();
+  showReading(cachedReading());
+  if (document.readyState === "complete") {
+    refreshWhenIdle();
+  } else {
+    window.addEventListener("load", refreshWhenIdle, { once: true });
+  }
   window.addEventListener("scroll", update, { passive: true });
-  setInterval(refreshStatus, 30000);
+  setInterval(refreshStatus, minRefreshMs / 2);
+  document.addEventListener("visibilitychange", refreshStatus);
+  // Another tab fetched a newer reading.
+  window.addEventListener("storage", (event) => {
+    if (event.key === cacheKey) {
+      showReading(readJson(event.newValue));
+    }
+  });
 
   if (sections.length && navLinks.length) {
     navLinks.forEach((link) => {
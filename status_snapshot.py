@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Snapshot the heartbeat reading and, at deploy time, inline it into index.html.
+
+Fetches the same published sheet status.js polls (its feedUrl is read from status.js)
+and writes status-snapshot.json: {"bpm": 72, "at": <epoch ms>}. With --inject, the
+reading is also embedded in index.html as a JSON script tag, so the life pill renders
+from static data before status.js makes any request.
+
+The build never inlines it: a reading stamped with the current time would change
+index.html (and its sitemap/feed lastmod) on every build. Inject only into a copy that
+is published without being committed, after the build, so the page to rewrite is
+always named explicitly. A page that was not injected starts from the visitor's cached
+reading, or the fallback text.
+
+status.js shows a reading for at most maxDisplayAgeMs (10 minutes) after it was taken,
+and the injected one is no exception: inject right before publishing. Once it is that
+old the page shows the fallback text until its own fetch succeeds.
+
+Usage: python3 status_snapshot.py [--inject HTML]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+import re
+import time
+
+import http_pool
+import outputs
+
+ROOT = Path(__file__).resolve().parent
+SNAPSHOT_PATH = ROOT / "status-snapshot.json"
+FEED_URL_RE = re.compile(r'const feedUrl = "([^"]+)"')
+SNAPSHOT_TAG_RE = re.compile(r'\s*<script type="application/json" id="status-snapshot">.*?</script>')
+
+
+def feed_url() -> str:
+    match = FEED_URL_RE.search((ROOT / "status.js").read_text())
+    if not match:
+        raise SystemExit("feedUrl not found in status.js")
+    return match.group(1)
+
+
+def parse_bpm(csv_text: str) -> int | float | None:
+    """Same reading as status.js parseBpm: the second cell of the first row (or the first)."""
+    first = next((line for line in csv_text.splitlines() if line.strip()), "")
+    cells = [cell.replace('"', "").strip() for cell in first.split(",")]
+    value = cells[1] if len(cells) > 1 and cells[1] else cells[0]
+    try:
+        bpm = float(value)
+    except ValueError:
+        return None
+    return int(bpm) if bpm.is_integer() else bpm
+
+
+def inject(html: str, snapshot: dict[str, int | float]) -> str:
+    """Embed `snapshot` before </head>, replacing any earlier one."""
+    data = json.dumps({"bpm": snapshot["bpm"], "at": snapshot["at"]})
+    tag = f'<script type="application/json" id="status-snapshot">{data}</script>'
+    return SNAPSHOT_TAG_RE.sub("", html).replace("</head>", f"  {tag}\n</head>", 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Save the current heartbeat reading to status-snapshot.json.")
+    parser.add_argument(
+        "--inject",
+        type=Path,
+        metavar="HTML",
+        help="Also inline the reading into HTML, e.g. a deploy copy of index.html; never commit the result",
+    )
+    args = parser.parse_args()
+
+    with http_pool.Pool(retries=2) as pool:
+        response = pool.request("GET", feed_url())
+    if response.status != 200:
+        raise SystemExit(f"HTTP {response.status} for the status feed")
+    bpm = parse_bpm(response.body.decode("utf-8", "replace"))
+    if not bpm:
+        raise SystemExit("No reading in the status feed")
+    snapshot = {"bpm": bpm, "at": int(time.time() * 1000)}
+    outputs.write_output(SNAPSHOT_PATH, json.dumps(snapshot) + "\n")
+    if args.inject:
+        outputs.write_output(args.inject, inject(args.inject.read_text(), snapshot))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""build_assets.py minifiers and asset reference rewriting."""
+
+from __future__ import annotations
+
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+import build_assets as ba
+
+URLS = {
+    "styles.css": "assets/dist/styles.0123456789ab.css",
+    "theme.js": "assets/dist/theme.ba9876543210.js",
+}
+
+
+class MinifyJsTest(unittest.TestCase):
+    def assertMinified(self, source: str, expected: str) -> None:
+        self.assertEqual(ba.minify_js(source), expected + "\n")
+
+    def test_division_is_not_a_regex(self) -> None:
+        self.assertMinified("const a = b / c / d;", "const a = b / c / d;")
+        self.assertMinified("const half = (a + b) / 2; // half", "const half = (a + b) / 2;")
+        # Ends in the keyword "in", but it's an identifier.
+        self.assertMinified("const ratio = totalin / 2 / x;", "const ratio = totalin / 2 / x;")
+
+    def test_regex_literals_are_kept(self) -> None:
+        self.assertMinified(r"const re = /\/\/ not a comment/g;", r"const re = /\/\/ not a comment/g;")
+        self.assertMinified('x.replace(/[/]+/g, "");', 'x.replace(/[/]+/g, "");')
+        self.assertMinified("function f(s) {\n  return /ab+c/i.test(s);\n}", "function f(s) {\nreturn /ab+c/i.test(s);\n}")
+
+    def test_strings_and_templates_are_kept(self) -> None:
+        self.assertMinified(
+            "const url = \"https://example.com/*\"; /* note */ const q = '//';",
+            "const url = \"https://example.com/*\";  const q = '//';",
+        )
+        template = "const s = `a // b ${c ? \"/*\" : '}'} d /* e */`;"
+        self.assertMinified(template, template)
+
+    def test_line_breaks_are_kept_for_asi(self) -> None:
+        self.assertMinified("let a = 1\n\n\n  let b = 2\n/* gone */", "let a = 1\nlet b = 2")
+
+    @unittest.skipUnless(shutil.which("node"), "node not installed")
+    def test_site_scripts_still_parse(self) -> None:
+        for name in ba.ASSETS:
+            if not name.endswith(".js"):
+                continue
+            with self.subTest(name=name), tempfile.NamedTemporaryFile("w", suffix=".js") as minified:
+                minified.write(ba.minify_js((ba.ROOT / name).read_text()))
+                minified.flush()
+                result = subprocess.run(["node", "--check", minified.name], capture_output=True, text=True)
+                self.assertEqual(result.returncode, 0, result.stderr)
+
+
+class MinifyCssTest(unittest.TestCase):
+    def test_whitespace_is_dropped_only_where_it_cant_matter(self) -> None:
+        self.assertEqual(ba.minify_css("a  {  color: red;  }"), "a{color:red}\n")
+        self.assertEqual(
+            ba.minify_css("@media (min-width: 600px) and (hover: hover) {\n  .a :hover { color: blue; }\n}"),
+            "@media (min-width:600px) and (hover:hover){.a :hover{color:blue}}\n",
+        )
+
+    def test_comments_go_but_strings_stay(self) -> None:
+        self.assertEqual(
+            ba.minify_css('.q::before { content: "/* not */ a"; } /* gone */'), '.q::before{content:"/* not */ a"}\n'
+        )
+
+    def test_relative_urls_are_rebased(self) -> None:
+        css = "a{background:url(img/x.png)} b{background:url(\"data:image/png;base64,AA\")} c{background:url('/abs.png')}"
+        self.assertEqual(
+            ba.minify_css(css, rebase="../../"),
+            "a{background:url(../../img/x.png)}b{background:url(\"data:image/png;base64,AA\")}c{background:url('/abs.png')}\n",
+        )
+
+
+class RewriteAssetRefsTest(unittest.TestCase):
+    def test_plain_and_stale_names_are_rewritten(self) -> None:
+        html = (
+            '<link rel="stylesheet" href="styles.css" />\n'
+            '<script src="../../theme.js"></script>\n'
+            '<link rel="stylesheet" href="../assets/dist/styles.aaaaaaaaaaaa.css" />\n'
+            '<script src="mytheme.js"></script>\n'
+            '<a href="status.js">source</a>\n'
+        )
+        self.assertEqual(
+            ba.rewrite_asset_refs(html, URLS),
+            '<link rel="stylesheet" href="assets/dist/styles.0123456789ab.css" />\n'
+            '<script src="../../assets/dist/theme.ba9876543210.js"></script>\n'
+            '<link rel="stylesheet" href="../assets/dist/styles.0123456789ab.css" />\n'
+            '<script src="mytheme.js"></script>\n'
+            '<a href="status.js">source</a>\n',
+        )
+
+    def test_rewriting_is_idempotent(self) -> None:
+        for page in ("index.html", "about.html", "posts/art/_gallery-template.html"):
+            with self.subTest(page=page):
+                once = ba.rewrite_asset_refs((ba.ROOT / page).read_text(), URLS)
+                self.assertIn(URLS["styles.css"], once)
+                self.assertEqual(ba.rewrite_asset_refs(once, URLS), once)
+        self.assertEqual(ba.rewrite_asset_refs('<script src="theme.js"></script>', {}), '<script src="theme.js"></script>')
+
+
+if __name__ == "__main__":
+    unittest.main()
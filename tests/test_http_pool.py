@@ -0,0 +1,163 @@
+"""http_pool.py against a local stand-in for the CDN."""
+
+from __future__ import annotations
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import http_pool
+
+ASSET = bytes(range(256)) * 1024
+
+
+class CDNHandler(BaseHTTPRequestHandler):
+    """Serves ASSET at /asset.jpg; the first `failures` requests to /flaky.jpg answer 503."""
+
+    protocol_version = "HTTP/1.1"
+    server: CDN
+
+    def do_GET(self) -> None:
+        self.server.requests.append(self.path)
+        self.server.clients.add(self.client_address)
+        if self.path == "/moved.jpg":
+            self.send_response(302)
+            self.send_header("Location", "/asset.jpg")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif self.path == "/flaky.jpg" and self.server.failures > 0:
+            self.server.failures -= 1
+            self.reply(503, b"busy")
+        elif self.path == "/truncated.jpg":
+            # Promise the whole asset, send half of it and hang up.
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(ASSET)))
+            self.end_headers()
+            self.wfile.write(ASSET[: len(ASSET) // 2])
+            self.close_connection = True
+        elif self.path in {"/asset.jpg", "/flaky.jpg"}:
+            self.reply(200, ASSET)
+        else:
+            self.reply(404, b"missing")
+
+    def reply(self, status: int, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+class CDN(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), CDNHandler)
+        self.requests: list[str] = []
+        self.clients: set[tuple[str, int]] = set()
+        self.failures = 0
+
+
+class PoolTest(unittest.TestCase):
+    def setUp(self) -> None:
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        self.dir = Path(scratch.name)
+
+        self.cdn = CDN()
+        threading.Thread(target=self.cdn.serve_forever, daemon=True).start()
+        self.addCleanup(self.cdn.server_close)
+        self.addCleanup(self.cdn.shutdown)
+        host, port = self.cdn.server_address
+        self.base = f"http://{host}:{port}"
+
+        self.pool = http_pool.Pool(timeout=5, retries=2, backoff=0)
+        self.addCleanup(self.pool.close)
+
+    def test_download_replaces_dest_atomically(self) -> None:
+        dest = self.dir / "media" / "1.jpg"
+        self.assertEqual(self.pool.download(f"{self.base}/asset.jpg", dest), len(ASSET))
+        self.assertEqual(dest.read_bytes(), ASSET)
+        self.assertEqual(sorted(path.name for path in dest.parent.iterdir()), ["1.jpg"])
+
+    def test_failed_download_keeps_existing_file(self) -> None:
+        dest = self.dir / "1.jpg"
+        dest.write_bytes(b"previous")
+        with self.assertRaises(http_pool.HTTPError) as caught:
+            self.pool.download(f"{self.base}/gone.jpg", dest)
+        self.assertEqual(caught.exception.status, 404)
+        with self.assertRaises(http_pool.http.client.IncompleteRead):
+            self.pool.download(f"{self.base}/truncated.jpg", dest)
+        self.assertEqual(dest.read_bytes(), b"previous")
+        self.assertEqual([path.name for path in self.dir.iterdir()], ["1.jpg"])
+        # 404 is final; the truncated body was tried once plus two retries.
+        self.assertEqual(self.cdn.requests, ["/gone.jpg"] + ["/truncated.jpg"] * 3)
+
+    def test_connections_are_reused_across_requests_and_redirects(self) -> None:
+        for index in range(3):
+            self.pool.download(f"{self.base}/asset.jpg", self.dir / f"{index}.jpg")
+        self.pool.download(f"{self.base}/moved.jpg", self.dir / "moved.jpg")
+        self.assertEqual((self.dir / "moved.jpg").read_bytes(), ASSET)
+        self.assertEqual(len(self.cdn.requests), 5)
+        self.assertEqual(len(self.cdn.clients), 1)
+
+    def test_transient_statuses_are_retried_with_backoff(self) -> None:
+        self.pool.backoff = 0.25
+        self.cdn.failures = 2
+        with mock.patch.object(http_pool.time, "sleep") as sleep, mock.patch.object(http_pool.random, "random", return_value=0):
+            self.assertEqual(self.pool.download(f"{self.base}/flaky.jpg", self.dir / "1.jpg"), len(ASSET))
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [0.25, 0.5])
+        self.assertEqual(self.cdn.requests, ["/flaky.jpg"] * 3)
+
+    def test_retries_give_up_with_the_last_status(self) -> None:
+        self.cdn.failures = 10
+        with self.assertRaises(http_pool.HTTPError) as caught:
+            self.pool.request("GET", f"{self.base}/flaky.jpg")
+        self.assertEqual((caught.exception.status, caught.exception.body), (503, b"busy"))
+        self.assertEqual(len(self.cdn.requests), 3)
+        # Other error statuses are returned to the caller as they are.
+        self.assertEqual(self.pool.request("GET", f"{self.base}/gone.jpg").status, 404)
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class RateLimiterTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.clock = Clock()
+        patch = mock.patch.object(http_pool, "time", self.clock)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_burst_then_steady_rate(self) -> None:
+        limiter = http_pool.RateLimiter(rate=4, burst=2)
+        times = []
+        for _ in range(6):
+            limiter.wait()
+            times.append(self.clock.now)
+        self.assertEqual(times, [0, 0, 0.25, 0.5, 0.75, 1.0])
+
+    def test_idle_time_refills_up_to_the_burst(self) -> None:
+        limiter = http_pool.RateLimiter(rate=4, burst=2)
+        limiter.wait()
+        self.clock.now = 10.0
+        for _ in range(3):
+            limiter.wait()
+        self.assertEqual(self.clock.now, 10.25)
+
+
+if __name__ == "__main__":
+    unittest.main()
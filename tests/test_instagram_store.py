@@ -0,0 +1,71 @@
+"""instagram_store.py on a scratch SQLite file."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+import tempfile
+import unittest
+from unittest import mock
+
+import instagram_store
+from instagram_store import MediaStore
+
+
+def item(number: int, media_type: str = "IMAGE", **extra: str) -> dict[str, str]:
+    return {"id": str(17890000 + number), "media_type": media_type, "timestamp": f"2024-01-{number:02}T12:00:00+0000", **extra}
+
+
+class MediaStoreTest(unittest.TestCase):
+    def setUp(self) -> None:
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        self.dir = Path(scratch.name)
+        self.store = MediaStore(self.dir / "instagram" / "media.sqlite3")
+        self.addCleanup(self.store.close)
+
+    def test_upsert_counts_added_and_updated(self) -> None:
+        self.assertEqual(self.store.upsert_many([item(1), item(2)]), (2, 0))
+        # Unchanged items aren't rewritten, changed ones are, new ones are added.
+        self.assertEqual(self.store.upsert_many([item(1), item(2, caption="edited"), item(3)]), (1, 1))
+        self.assertEqual(len(self.store), 3)
+        self.assertEqual(self.store.get(item(2)["id"]), item(2, caption="edited"))
+        # The same id twice in one batch is one row; the last copy wins.
+        self.assertEqual(self.store.upsert_many([item(4), item(4, caption="second")]), (1, 0))
+        self.assertEqual(self.store.get(item(4)["id"])["caption"], "second")
+
+    def test_lookups_by_id_span_parameter_chunks(self) -> None:
+        self.store.upsert_many(item(number) for number in range(1, 11))
+        ids = [item(number)["id"] for number in range(1, 14)]
+        with mock.patch.object(instagram_store, "MAX_PARAMS", 3):
+            found = self.store.get_many(ids)
+            known = self.store.known_ids(ids)
+        self.assertEqual(sorted(found), ids[:10])
+        self.assertEqual(found[ids[4]], item(5))
+        self.assertEqual(known, set(ids[:10]))
+        self.assertIsNone(self.store.get("missing"))
+        self.assertEqual(self.store.get_many([]), {})
+
+    def test_recent_filters_by_type_and_time(self) -> None:
+        self.store.upsert_many([item(1), item(2, "VIDEO"), item(3, "CAROUSEL_ALBUM"), item(4, "VIDEO")])
+        self.assertEqual([i["id"] for i in self.store.recent()], [item(n)["id"] for n in (4, 3, 2, 1)])
+        self.assertEqual([i["id"] for i in self.store.recent(2)], [item(n)["id"] for n in (4, 3)])
+        self.assertEqual([i["id"] for i in self.store.recent(media_type="VIDEO")], [item(n)["id"] for n in (4, 2)])
+        window = self.store.recent(since="2024-01-02", until="2024-01-04")
+        self.assertEqual([i["id"] for i in window], [item(n)["id"] for n in (3, 2)])
+
+    def test_export_matches_the_legacy_cache_and_imports_back(self) -> None:
+        items = [item(1), item(2, "VIDEO", caption="café")]
+        self.store.upsert_many(items)
+        cache = self.dir / "instagram" / "cache.json"
+        self.assertEqual(self.store.export_json(cache), 2)
+        self.assertEqual(json.loads(cache.read_text()), {"data": items[::-1]})
+        self.assertIn("café", cache.read_text())
+
+        with MediaStore(self.dir / "copy.sqlite3") as copy:
+            self.assertEqual(copy.import_json(cache), 2)
+            self.assertEqual(list(copy.recent()), list(self.store.recent()))
+
+
+if __name__ == "__main__":
+    unittest.main()
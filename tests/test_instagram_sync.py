@@ -0,0 +1,199 @@
+"""instagram_sync.py against local stand-ins for the CDN and the Graph API."""
+
+from __future__ import annotations
+
+import datetime as dt
+from functools import partial
+from http.server import BaseHTTPRequestHandler, SimpleHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+from pathlib import Path
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import urllib.parse
+
+from instagram_store import MediaStore
+import instagram_sync as sync
+
+TOKEN = "graph-token"
+IG_USER_ID = "1784"
+
+
+class LocalServerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        self.root = Path(scratch.name)
+        patches = [
+            mock.patch.object(sync, "ROOT", self.root),
+            mock.patch.object(sync, "INSTAGRAM_DIR", self.root / "instagram"),
+            mock.patch.object(sync, "DOWNLOADS_PATH", self.root / "instagram" / "downloads.json"),
+            mock.patch.object(sync, "STORE_PATH", self.root / "instagram" / "media.sqlite3"),
+            mock.patch.object(sync, "CACHE_PATH", self.root / "instagram" / "cache.json"),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.requests: list[str] = []
+
+    def serve(self, handler: type) -> str:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        host, port = server.server_address
+        return f"http://{host}:{port}"
+
+
+class DownloadMediaTest(LocalServerTest):
+    def setUp(self) -> None:
+        super().setUp()
+        self.cdn_dir = self.root / "cdn"
+        self.cdn_dir.mkdir()
+        requests = self.requests
+
+        class CDNHandler(SimpleHTTPRequestHandler):
+            def do_GET(self) -> None:
+                requests.append(self.path)
+                super().do_GET()
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        self.base = self.serve(partial(CDNHandler, directory=str(self.cdn_dir)))
+        self.assets = self.root / "assets" / "instagram"
+        for name, size in (("a.jpg", 3000), ("b.jpg", 5000)):
+            (self.cdn_dir / name).write_bytes(name.encode() * size)
+        self.jobs = [(f"{self.base}/{name}", self.assets / "17890001" / name) for name in ("a.jpg", "b.jpg")]
+
+    def download(self) -> list[str]:
+        del self.requests[:]
+        with mock.patch("builtins.print"):
+            sync.download_media(self.jobs, workers=2)
+        return sorted(self.requests)
+
+    def test_intact_files_are_skipped(self) -> None:
+        self.assertEqual(self.download(), ["/a.jpg", "/b.jpg"])
+        for _, dest in self.jobs:
+            self.assertEqual(dest.read_bytes(), (self.cdn_dir / dest.name).read_bytes())
+        records = json.loads(sync.DOWNLOADS_PATH.read_text())
+        self.assertEqual(records["assets/instagram/17890001/a.jpg"]["bytes"], 15000)
+        self.assertEqual(self.download(), [])
+
+    def test_changed_or_missing_files_are_fetched_again(self) -> None:
+        self.download()
+        a, b = (dest for _, dest in self.jobs)
+        # Same size, different bytes: only the hash can tell.
+        a.write_bytes(b"x" * a.stat().st_size)
+        b.unlink()
+        self.assertEqual(self.download(), ["/a.jpg", "/b.jpg"])
+        self.assertEqual(a.read_bytes(), (self.cdn_dir / "a.jpg").read_bytes())
+
+
+def graph_item(number: int, year: int) -> dict[str, str]:
+    return {"id": f"1789{number:04}", "media_type": "IMAGE", "timestamp": f"{year}-06-{number % 28 + 1:02}T12:00:00+0000"}
+
+
+def epoch(item: dict[str, str]) -> int:
+    return int(dt.datetime.strptime(item["timestamp"], "%Y-%m-%dT%H:%M:%S%z").timestamp())
+
+
+class GraphSyncTest(LocalServerTest):
+    """Paging against a fake /{ig-user-id}/media that answers `limit` items per page, newest first."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.year = dt.date.today().year
+        self.media: list[dict[str, str]] = []
+        test = self
+
+        class GraphHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                url = urllib.parse.urlsplit(self.path)
+                query = dict(urllib.parse.parse_qsl(url.query))
+                test.requests.append(self.path)
+                if url.path != f"/{IG_USER_ID}/media" or query.get("access_token") != TOKEN:
+                    return self.reply({"error": {"message": "Invalid request", "code": 190}})
+                items = sorted(test.media, key=lambda item: item["timestamp"], reverse=True)
+                if "since" in query:
+                    items = [item for item in items if epoch(item) >= int(query["since"])]
+                if "until" in query:
+                    items = [item for item in items if epoch(item) < int(query["until"])]
+                start = int(query.get("after", 0))
+                end = start + int(query["limit"])
+                page: dict = {"data": items[start:end]}
+                if end < len(items):
+                    next_query = urllib.parse.urlencode({**query, "after": str(end)})
+                    page["paging"] = {"cursors": {"after": str(end)}, "next": f"{test.base}{url.path}?{next_query}"}
+                self.reply(page)
+
+            def reply(self, data: dict) -> None:
+                body = json.dumps(data).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        self.base = self.serve(GraphHandler)
+        patches = [
+            mock.patch.object(sync, "GRAPH_BASE", self.base),
+            mock.patch.object(sync, "PAGE_LIMIT", 3),
+            mock.patch.dict(os.environ, {"IG_GRAPH_ACCESS_TOKEN": TOKEN, "IG_GRAPH_IG_USER_ID": IG_USER_ID}),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def sync(self, *args: str) -> list[str]:
+        del self.requests[:]
+        with mock.patch("builtins.print"):
+            sync.run(["sync", *args])
+        return self.requests
+
+    def stored(self) -> dict[str, dict]:
+        with MediaStore(sync.STORE_PATH) as store:
+            return {item["id"]: item for item in store.recent()}
+
+    def test_first_sync_follows_every_page(self) -> None:
+        self.media = [graph_item(number, self.year) for number in range(1, 8)]
+        self.assertEqual(len(self.sync()), 3)
+        self.assertEqual(sorted(self.stored()), sorted(item["id"] for item in self.media))
+
+    def test_sync_stops_at_the_first_page_with_known_media(self) -> None:
+        self.media = [graph_item(number, self.year) for number in range(1, 8)]
+        self.sync()
+        # Four new posts: the second page reaches the newest one already stored.
+        self.media += [graph_item(number, self.year) for number in range(8, 12)]
+        self.assertEqual(len(self.sync()), 2)
+        self.assertEqual(len(self.stored()), 11)
+
+    def test_sync_merges_updates_into_the_store(self) -> None:
+        self.media = [graph_item(number, self.year) for number in range(1, 4)]
+        self.sync()
+        self.media[-1] = {**self.media[-1], "caption": "edited"}
+        self.sync()
+        stored = self.stored()
+        self.assertEqual(len(stored), 3)
+        self.assertEqual(stored[self.media[-1]["id"]]["caption"], "edited")
+
+    def test_full_backfill_pages_each_year(self) -> None:
+        self.media = [graph_item(number, self.year - number % 3) for number in range(1, 11)]
+        with MediaStore(sync.STORE_PATH) as store:
+            store.upsert_many(self.media[:1])
+        requests = self.sync("--full", "--since-year", str(self.year - 2), "--rate", "1000")
+        self.assertEqual(sorted(self.stored()), sorted(item["id"] for item in self.media))
+        # One window per year, paged to the end whatever is already stored: the year with
+        # four items takes two pages of three.
+        self.assertEqual(len(requests), 4)
+        self.assertEqual(sum("after=" not in path for path in requests), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
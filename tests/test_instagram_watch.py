@@ -0,0 +1,105 @@
+"""instagram_watch.py seen-ID diffing and state, without the Graph API."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+import tempfile
+import unittest
+from unittest import mock
+
+import instagram_watch as watch
+
+
+def window(*numbers: int) -> list[dict[str, str]]:
+    """Graph items for the given post numbers, newest (highest) first."""
+    return [{"id": str(n), "permalink": f"https://www.instagram.com/p/{n}/"} for n in sorted(numbers, reverse=True)]
+
+
+def ids(items: list[dict[str, str]]) -> list[str]:
+    return [item["id"] for item in items]
+
+
+class DiffRecentTest(unittest.TestCase):
+    def test_first_run_sets_a_baseline(self) -> None:
+        new_items, state = watch.diff_recent(window(1, 2, 3), {})
+        self.assertEqual(new_items, [])
+        self.assertEqual((state["last_id"], state["seen_ids"]), ("3", ["3", "2", "1"]))
+
+    def test_every_new_post_is_reported_oldest_first(self) -> None:
+        _, state = watch.diff_recent(window(1, 2, 3), {})
+        new_items, state = watch.diff_recent(window(2, 3, 4, 5), state)
+        self.assertEqual(ids(new_items), ["4", "5"])
+        self.assertEqual(state["seen_ids"], ["5", "4", "3", "2", "1"])
+        new_items, _ = watch.diff_recent(window(2, 3, 4, 5), state)
+        self.assertEqual(new_items, [])
+
+    def test_deleted_posts_dont_resurface(self) -> None:
+        _, state = watch.diff_recent(window(1, 2, 3), {})
+        # Post 3 was deleted: the window slides back to 1 and 2, both already seen.
+        new_items, state = watch.diff_recent(window(1, 2), state)
+        self.assertEqual(new_items, [])
+        self.assertEqual(state["last_id"], "2")
+
+    def test_legacy_last_id_state(self) -> None:
+        new_items, state = watch.diff_recent(window(1, 2, 3, 4), {"last_id": "2"})
+        self.assertEqual(ids(new_items), ["3", "4"])
+        self.assertEqual(state["seen_ids"], ["4", "3", "2", "1"])
+        # A last id that has scrolled out of the window: everything in it is new.
+        new_items, _ = watch.diff_recent(window(5, 6), {"last_id": "2"})
+        self.assertEqual(ids(new_items), ["5", "6"])
+
+    def test_seen_ids_are_capped(self) -> None:
+        state = {"seen_ids": [str(n) for n in range(watch.MAX_SEEN_IDS, 0, -1)]}
+        _, state = watch.diff_recent(window(watch.MAX_SEEN_IDS + 1), state)
+        self.assertEqual(len(state["seen_ids"]), watch.MAX_SEEN_IDS)
+        self.assertEqual(state["seen_ids"][0], str(watch.MAX_SEEN_IDS + 1))
+        self.assertNotIn("1", state["seen_ids"])
+
+    def test_empty_window_keeps_the_last_id(self) -> None:
+        new_items, state = watch.diff_recent([], {"last_id": "7", "seen_ids": ["7"]})
+        self.assertEqual((new_items, state["last_id"], state["seen_ids"]), ([], "7", ["7"]))
+
+
+class RecordSeenTest(unittest.TestCase):
+    def setUp(self) -> None:
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        self.state_path = Path(scratch.name) / "instagram" / "last_seen.json"
+        patch = mock.patch.object(watch, "STATE_PATH", self.state_path)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_pushes_are_news_even_without_state(self) -> None:
+        self.assertEqual(ids(watch.record_seen(window(1))), ["1"])
+        self.assertEqual(json.loads(self.state_path.read_text())["seen_ids"], ["1"])
+
+    def test_repeated_ids_are_dropped(self) -> None:
+        watch.record_seen(window(1))
+        self.assertEqual(watch.record_seen(window(1)), [])
+        self.assertEqual(ids(watch.record_seen(window(1, 2, 3))), ["2", "3"])
+        self.assertEqual(json.loads(self.state_path.read_text())["seen_ids"], ["3", "2", "1"])
+
+    def test_polled_state_is_shared(self) -> None:
+        watch.save_state(watch.diff_recent(window(1, 2), {})[1])
+        self.assertEqual(ids(watch.record_seen(window(2, 3))), ["3"])
+
+
+class CredentialsTest(unittest.TestCase):
+    def test_credentials_are_read_once_per_ttl(self) -> None:
+        reads = mock.Mock(return_value=("token", "1784"))
+        with mock.patch.object(watch, "get_token_and_ig_id", reads), mock.patch.object(watch.time, "monotonic") as clock:
+            credentials = watch.Credentials(ttl=60)
+            for now in (0, 30, 59):
+                clock.return_value = now
+                self.assertEqual(credentials.get(), ("token", "1784"))
+            self.assertEqual(reads.call_count, 1)
+            clock.return_value = 61
+            credentials.get()
+            credentials.invalidate()
+            credentials.get()
+            self.assertEqual(reads.call_count, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+"""instagram_webhook.py against a live receiver on a local port."""
+
+from __future__ import annotations
+
+import http.client
+import json
+from pathlib import Path
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import instagram_watch as watch
+import instagram_webhook as webhook
+
+SECRET = "app-secret"
+VERIFY_TOKEN = "verify-token"
+
+
+class WebhookTest(unittest.TestCase):
+    def setUp(self) -> None:
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        self.state_path = Path(scratch.name) / "last_seen.json"
+        patches = [
+            mock.patch.object(watch, "STATE_PATH", self.state_path),
+            # Payload lines would go to the test runner's stdout.
+            mock.patch.object(watch, "emit", lambda line, stream=None: self.emitted.append(line)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.emitted: list[dict] = []
+
+        receiver = webhook.Receiver(SECRET, VERIFY_TOKEN, None, False)
+        handler = type("Handler", (webhook.WebhookHandler,), {"receiver": receiver})
+        self.server = webhook.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def request(self, method: str, path: str, body: bytes | None = None, headers: dict[str, str] | None = None) -> tuple[int, bytes]:
+        conn = http.client.HTTPConnection(*self.server.server_address, timeout=5)
+        try:
+            # putrequest() rather than request(), so no Content-Length is added for us.
+            conn.putrequest(method, path)
+            for name, value in (headers or {}).items():
+                conn.putheader(name, value)
+            conn.endheaders(body)
+            response = conn.getresponse()
+            return response.status, response.read()
+        finally:
+            conn.close()
+
+    def post(self, body: bytes, signature: str | None = None, length: str | None = None) -> int:
+        headers = {"Content-Length": str(len(body)) if length is None else length}
+        headers[webhook.SIGNATURE_HEADER] = webhook.sign(SECRET, body) if signature is None else signature
+        return self.request("POST", webhook.WEBHOOK_PATH, body, headers)[0]
+
+    def test_challenge_is_echoed_for_the_verify_token(self) -> None:
+        query = f"hub.mode=subscribe&hub.verify_token={VERIFY_TOKEN}&hub.challenge=1158201444"
+        self.assertEqual(self.request("GET", f"{webhook.WEBHOOK_PATH}?{query}"), (200, b"1158201444"))
+        query = "hub.mode=subscribe&hub.verify_token=wrong&hub.challenge=1158201444"
+        self.assertEqual(self.request("GET", f"{webhook.WEBHOOK_PATH}?{query}")[0], 403)
+
+    def test_bad_signature_is_rejected(self) -> None:
+        body = json.dumps(webhook.sample_delivery("17890001")).encode()
+        self.assertEqual(self.post(body, signature=webhook.sign("other-secret", body)), 403)
+        self.assertEqual(self.post(body, signature=""), 403)
+        self.assertEqual(self.emitted, [])
+
+    def test_bad_content_length_is_rejected(self) -> None:
+        status, _ = self.request("POST", webhook.WEBHOOK_PATH, headers={webhook.SIGNATURE_HEADER: "sha256=0"})
+        self.assertEqual(status, 400)
+        for length in ("-1", "+2", "abc", "²"):
+            with self.subTest(length=length):
+                self.assertEqual(self.post(b"{}", length=length), 400)
+        self.assertEqual(self.post(b"{}", length=str(webhook.MAX_BODY_BYTES + 1)), 413)
+
+    def test_malformed_payload_is_rejected(self) -> None:
+        payloads = [
+            b"not json",
+            b"[1, 2]",
+            b'"entry"',
+            b'{"entry": {"id": 1}}',
+            b'{"entry": [1]}',
+            b'{"entry": [{"changes": 1}]}',
+            b'{"entry": [{"changes": [1]}]}',
+            b'{"entry": [{"changes": [{"value": "17890001"}]}]}',
+            b'{"entry": [{"changes": [{"value": {"media_id": ["17890001"]}}]}]}',
+            b'{"entry": [{"time": 1e300, "changes": [{"value": {"media_id": "17890001"}}]}]}',
+        ]
+        for body in payloads:
+            with self.subTest(body=body):
+                self.assertEqual(self.post(body), 400)
+        self.assertEqual(self.emitted, [])
+        # The handler threads survived: a good delivery still goes through.
+        self.assertEqual(self.post(json.dumps(webhook.sample_delivery("17890001")).encode()), 200)
+
+    def test_repeated_deliveries_are_reported_once(self) -> None:
+        first = json.dumps(webhook.sample_delivery("17890001")).encode()
+        second = json.dumps(webhook.sample_delivery("17890002")).encode()
+        for body in (first, first, second, first):
+            self.assertEqual(self.post(body), 200)
+        self.assertEqual([line["id"] for line in self.emitted], ["17890001", "17890002"])
+        self.assertTrue(all(line["new"] for line in self.emitted))
+        self.assertEqual(json.loads(self.state_path.read_text())["seen_ids"][:2], ["17890002", "17890001"])
+
+
+if __name__ == "__main__":
+    unittest.main()
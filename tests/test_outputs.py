@@ -0,0 +1,96 @@
+"""outputs.py write-if-changed and dry-run behaviour, in a scratch directory."""
+
+from __future__ import annotations
+
+import contextlib
+import io
+import os
+from pathlib import Path
+import tempfile
+import unittest
+from unittest import mock
+
+import outputs
+
+
+class OutputsTest(unittest.TestCase):
+    def setUp(self) -> None:
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        self.dir = Path(scratch.name)
+        patches = [
+            mock.patch.object(outputs, "ROOT", self.dir),
+            mock.patch.dict(outputs._pending, clear=True),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(outputs.take_changes)
+        self.addCleanup(outputs.set_dry_run, False)
+        self.page = self.dir / "posts" / "page.html"
+
+    def write(self, data: str) -> bool:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return outputs.write_output(self.page, data)
+
+    def report(self) -> str:
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            outputs.report()
+        return out.getvalue()
+
+    def test_unchanged_write_leaves_the_file_alone(self) -> None:
+        self.assertTrue(self.write("<p>one</p>"))
+        os.utime(self.page, ns=(1_000_000_000, 1_000_000_000))
+        inode = self.page.stat().st_ino
+        self.assertFalse(self.write("<p>one</p>"))
+        self.assertEqual((self.page.stat().st_mtime_ns, self.page.stat().st_ino), (1_000_000_000, inode))
+
+        self.assertTrue(self.write("<p>two</p>"))
+        self.assertEqual(self.page.read_text(), "<p>two</p>")
+        self.assertGreater(self.page.stat().st_mtime_ns, 1_000_000_000)
+        self.assertEqual(os.listdir(self.page.parent), ["page.html"])
+        # Real builds keep no change log.
+        self.assertEqual(outputs.changes(), [])
+
+    def test_dry_run_reports_without_writing(self) -> None:
+        self.write("<p>one</p>")
+        stale = self.dir / "posts" / "stale.html"
+        stale.write_text("old")
+        outputs.set_dry_run(True)
+
+        self.assertTrue(self.write("<p>longer</p>"))
+        self.assertTrue(self.write("<p>longer still</p>"))
+        added = self.dir / "posts" / "new.html"
+        self.assertTrue(outputs.write_output(added, "new"))
+        self.assertTrue(outputs.remove_output(stale))
+        # Later stages see the pending bytes; the disk doesn't.
+        self.assertEqual(outputs.read_output(self.page), b"<p>longer still</p>")
+        self.assertIsNone(outputs.read_output(stale))
+        self.assertEqual(self.page.read_text(), "<p>one</p>")
+        self.assertFalse(added.exists())
+        self.assertTrue(stale.exists())
+        self.assertEqual(outputs.list_outputs(self.dir / "posts", "*.html"), [added, self.page])
+
+        self.assertEqual(
+            self.report().splitlines(),
+            [
+                "3 file(s) would change:",
+                "  A posts/new.html  +3 bytes (0 -> 3)",
+                "  M posts/page.html  +9 bytes (10 -> 19)",
+                "  D posts/stale.html  -3 bytes (3 -> 0)",
+                "Net +9 bytes",
+            ],
+        )
+
+    def test_dry_run_with_nothing_to_do(self) -> None:
+        self.write("<p>one</p>")
+        outputs.set_dry_run(True)
+        self.assertFalse(self.write("<p>one</p>"))
+        created = self.dir / "posts" / "tmp.html"
+        outputs.write_output(created, "x")
+        outputs.remove_output(created)
+        self.assertEqual(self.report(), "No files would change\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
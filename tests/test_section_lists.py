@@ -0,0 +1,98 @@
+"""build_markdown.py home-page section lists and archive pages, in a scratch posts/ dir."""
+
+from __future__ import annotations
+
+from pathlib import Path
+import re
+import tempfile
+import unittest
+from unittest import mock
+
+import build_markdown as bm
+
+SECTION = "field-notes"
+SECTION_HTML = '<section id="field-notes">\n    <!-- md-posts:start -->\n    <!-- md-posts:end -->\n</section>\n'
+HREF_RE = re.compile(r'href="([^"]+\.html)"')
+
+
+def entries(count: int) -> list[bm.PostEntry]:
+    """`count` posts, oldest first."""
+    return [
+        bm.PostEntry(SECTION, f"2025-{n // 28 + 1:02}-{n % 28 + 1:02}", f"note-{n:03}.html", f"Note {n}", "Text", f"Summary {n}.")
+        for n in range(count)
+    ]
+
+
+class SectionPagesTest(unittest.TestCase):
+    def setUp(self) -> None:
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        self.pages_dir = Path(scratch.name) / SECTION / "page"
+        patches = [
+            mock.patch.object(bm, "OUTPUT_DIR", Path(scratch.name)),
+            mock.patch("builtins.print"),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def build(self, count: int) -> str:
+        return bm.write_section_pages(SECTION, SECTION_HTML, iter(entries(count)), count)
+
+    def pages(self) -> dict[str, str]:
+        return {path.name: path.read_text() for path in sorted(self.pages_dir.glob("*.html"))}
+
+    def listed(self, html: str) -> list[str]:
+        return [href.rsplit("/", 1)[-1] for href in HREF_RE.findall(html) if "note-" in href]
+
+    def test_page_boundaries(self) -> None:
+        for count, sizes in ((bm.HOME_LIST_LIMIT, []), (bm.HOME_LIST_LIMIT + 1, [6]), (20, [10, 10]), (21, [10, 10, 1])):
+            with self.subTest(count=count):
+                self.build(count)
+                pages = self.pages()
+                self.assertEqual(list(pages), [f"{n}.html" for n in range(1, len(sizes) + 1)])
+                self.assertEqual([len(self.listed(html)) for html in pages.values()], sizes)
+
+        pages = self.pages()
+        # Numbered from the oldest post, each page listed newest first.
+        self.assertEqual(self.listed(pages["1.html"]), [f"note-{n:03}.html" for n in range(9, -1, -1)])
+        self.assertEqual(self.listed(pages["3.html"]), ["note-020.html"])
+        self.assertIn('rel="next" href="2.html"', pages["1.html"])
+        self.assertNotIn('rel="prev"', pages["1.html"])
+        self.assertIn('rel="prev" href="2.html"', pages["3.html"])
+        self.assertNotIn('rel="next"', pages["3.html"])
+
+    def test_new_post_leaves_full_pages_alone(self) -> None:
+        self.build(21)
+        before = self.pages()
+        self.build(31)
+        after = self.pages()
+        self.assertEqual(after["1.html"], before["1.html"])
+        # The page that was newest gains its ninth post and a link to the new page.
+        self.assertNotEqual(after["3.html"], before["3.html"])
+        self.assertEqual(list(after), ["1.html", "2.html", "3.html", "4.html"])
+
+    def test_stale_pages_are_removed(self) -> None:
+        self.build(31)
+        self.build(12)
+        self.assertEqual(list(self.pages()), ["1.html", "2.html"])
+        self.build(bm.HOME_LIST_LIMIT)
+        self.assertEqual(self.pages(), {})
+
+    def test_home_list_is_capped(self) -> None:
+        html = self.build(21)
+        self.assertEqual(self.listed(html), [f"note-{n:03}.html" for n in range(20, 20 - bm.HOME_LIST_LIMIT, -1)])
+        self.assertIn(f'href="posts/{SECTION}/page/3.html">All 21 posts →', html)
+
+        with mock.patch.dict(bm.HOME_LIST_LIMITS, {SECTION: 2}):
+            html = self.build(3)
+        self.assertEqual(self.listed(html), ["note-002.html", "note-001.html"])
+        self.assertIn("All 3 posts", html)
+
+        html = self.build(bm.HOME_LIST_LIMIT)
+        self.assertEqual(len(self.listed(html)), bm.HOME_LIST_LIMIT)
+        self.assertNotIn("post-archive-link", html)
+
+
+if __name__ == "__main__":
+    unittest.main()